@@ -1,7 +1,37 @@
 import os;import shutil;import sys;import subprocess;import zipfile;import tarfile;import rarfile;from pathlib import Path
-import tkinter as tk; from tkinter import messagebox; import customtkinter as ctk; from win32com.client import Dispatch; import tempfile
+import tkinter as tk; from tkinter import messagebox; import customtkinter as ctk; import tempfile
 import threading; import datetime; import math; from watchdog.observers import Observer; from watchdog.events import FileSystemEventHandler
 import hashlib
+import heapq
+import errno
+import bz2
+import zlib
+import json
+import fnmatch
+import re
+import stat
+from array import array
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+import sqlite3
+import time
+import io
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+try:
+    from win32com.shell import shell as win_shell, shellcon
+except ImportError:
+    # SHFileOperation (lixeira em lote) só existe no Windows
+    win_shell = shellcon = None
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    # Sem Pillow, a visualização em miniaturas mostra só os ícones
+    Image = ImageOps = None
+try:
+    import fcntl
+except ImportError:
+    # Sem ioctl no Windows: reflink não é tentado
+    fcntl = None
 
 # Configuração do tema
 ctk.set_appearance_mode("system")
@@ -13,41 +43,3211 @@ ICONS = {
     'video': '🎬', 'executable': '⚙️', 'default': '📄'
 }
 
+# Acima deste número de mudanças agrupadas, a pasta é relida por inteiro
+MAX_INCREMENTAL_CHANGES = 500
+
+# Limite de resultados de uma pesquisa recursiva sem índice
+MAX_SEARCH_RESULTS = 50000
+
+# Arquivos até este tamanho são copiados em paralelo pelo pool de arquivos pequenos
+SMALL_FILE_SIZE = 256 * 1024
+
+# Pasta onde ficam os caches persistentes
+CACHE_DIR = Path.home() / ".geren"
+
 # Extensões de arquivo por tipo
 FILE_TYPES = {
-    'archive': ['.zip', '.rar', '.tar', '.gz', '.bz2', '.7z'],
+    'archive': ['.zip', '.rar', '.tar', '.gz', '.tgz', '.bz2', '.tbz2', '.7z'],
     'image': ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.svg', '.webp'],
     'audio': ['.mp3', '.wav', '.ogg', '.flac', '.m4a', '.aac'],
     'video': ['.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv'],
     'executable': ['.exe', '.msi', '.bat', '.cmd', '.ps1']
 }
 
+# Colunas da visualização em detalhes: (coluna de ordenação, título, largura em caracteres)
+DETAIL_COLUMNS = [
+    ('name', "Nome", 42), ('size', "Tamanho", 12), ('type', "Tipo", 14),
+    ('mtime', "Modificado em", 18), ('ctime', "Criado em", 18),
+]
+
+# Tipo de arquivo por extensão, para consulta direta
+EXTENSION_KINDS = {ext: file_type for file_type, extensions in FILE_TYPES.items() for ext in extensions}
+
+# Formatos de arquivo compactado navegáveis, pelo final do nome (sufixos compostos primeiro)
+ARCHIVE_FORMATS = [
+    ('.tar.gz', 'tar.gz'), ('.tgz', 'tar.gz'),
+    ('.tar.bz2', 'tar.bz2'), ('.tbz2', 'tar.bz2'), ('.tbz', 'tar.bz2'),
+    ('.tar', 'tar'), ('.zip', 'zip'), ('.rar', 'rar'),
+]
+
+# Modo do tarfile para cada formato tar
+TAR_MODES = {'tar': 'r', 'tar.gz': 'r:gz', 'tar.bz2': 'r:bz2'}
+
+
+def archive_format(path):
+    """Formato do arquivo compactado ('zip', 'rar', 'tar', 'tar.gz', 'tar.bz2') ou None"""
+    name = Path(path).name.lower()
+    for suffix, archive_type in ARCHIVE_FORMATS:
+        if name.endswith(suffix) and len(name) > len(suffix):
+            return archive_type
+    return None
+
+
+def archive_stem(path):
+    """Nome do arquivo compactado sem o sufixo do formato ('a.tar.gz' -> 'a')"""
+    name = Path(path).name
+    for suffix, _ in ARCHIVE_FORMATS:
+        if name.lower().endswith(suffix) and len(name) > len(suffix):
+            return name[:-len(suffix)]
+    return Path(path).stem
+
+class DirectoryModel:
+    """Listagem de uma pasta montada com uma única passada de os.scandir, sem depender do Tk"""
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = []
+
+    # Chave de cada coluna ordenável, montada só com os dados já lidos no scandir;
+    # o nome em minúsculas desempata e pastas ficam sempre antes dos arquivos
+    SORT_KEYS = {
+        'name': lambda entry: entry['lname'],
+        # O tamanho das pastas chega depois e muda; elas ficam ordenadas pelo nome
+        'size': lambda entry: (0 if entry['is_dir'] else entry['size'] or 0, entry['lname']),
+        'type': lambda entry: (entry['ext'], entry['lname']),
+        'mtime': lambda entry: (entry['mtime'] or 0, entry['lname']),
+        'ctime': lambda entry: (entry['ctime'] or 0, entry['lname']),
+    }
+
+    def scan(self):
+        """Lê a pasta e guarda as entradas ordenadas (pastas primeiro, depois por nome)"""
+        with os.scandir(self.path) as it:
+            entries = [self.make_entry(entry) for entry in it]
+        entries.sort(key=self.sort_key)
+        self.entries = entries
+        return entries
+
+    @staticmethod
+    def sort_entries(entries, column='name', descending=False):
+        """Nova lista ordenada pela coluna; pastas primeiro também na ordem decrescente"""
+        key = DirectoryModel.SORT_KEYS[column]
+        folders = [entry for entry in entries if entry['is_dir']]
+        files = [entry for entry in entries if not entry['is_dir']]
+        folders.sort(key=key, reverse=descending)
+        files.sort(key=key, reverse=descending)
+        return folders + files
+
+    @staticmethod
+    def make_entry(entry):
+        """Converte um DirEntry aproveitando o tipo e o stat que ele já tem em cache"""
+        try:
+            is_dir = entry.is_dir()
+            st = entry.stat()
+        except OSError:
+            # Links quebrados ou itens sem permissão aparecem sem metadados
+            is_dir, st = False, None
+        return DirectoryModel.build_entry(entry.name, entry.path, is_dir, st)
+
+    @staticmethod
+    def entry_for_path(path):
+        """Monta a entrada de um único caminho; retorna None se ele não existe mais"""
+        try:
+            st = os.stat(path)
+            is_dir = stat.S_ISDIR(st.st_mode)
+        except FileNotFoundError:
+            if not os.path.lexists(path):
+                return None
+            is_dir, st = False, None
+        except OSError:
+            is_dir, st = False, None
+        return DirectoryModel.build_entry(os.path.basename(path), path, is_dir, st)
+
+    @staticmethod
+    def build_entry(name, path, is_dir, st):
+        ext = os.path.splitext(name)[1].lower()
+        return {
+            'name': name,
+            # Chave de ordenação pronta: a listagem é reordenada sem recalcular nada
+            'lname': name.lower(),
+            'path': path,
+            'is_dir': is_dir,
+            # O tamanho de pastas é calculado depois pelo FolderSizeEngine
+            'size': None if is_dir or st is None else st.st_size,
+            'mtime': None if st is None else st.st_mtime,
+            'ctime': None if st is None else st.st_ctime,
+            'ext': ext,
+            'kind': 'folder' if is_dir else EXTENSION_KINDS.get(ext, 'default'),
+        }
+
+    @staticmethod
+    def sort_key(entry):
+        return (not entry['is_dir'], entry['lname'])
+
+class ListingSnapshotCache:
+    """Listagens já montadas das pastas do histórico, validadas pelo mtime e inode da pasta
+
+    Limitação: o mtime da pasta só muda quando entradas diretas são criadas,
+    removidas ou renomeadas. Um arquivo editado no lugar (novo tamanho ou
+    mtime) ou mudanças em subpastas mais fundas não invalidam o snapshot,
+    e o watchdog só observa a pasta exibida. Por isso um snapshot também
+    expira após max_age segundos sem ser revalidado; os tamanhos de pastas
+    são sempre pedidos de novo ao FolderSizeEngine ao reaproveitá-lo.
+    """
+    def __init__(self, max_snapshots=32, max_bytes=64 * 1024 * 1024, max_age=300):
+        self.max_snapshots = max_snapshots
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        # caminho -> (assinatura, linhas, bytes estimados, momento da última validação), do menos para o mais recente
+        self.snapshots = OrderedDict()
+        self.total_bytes = 0
+
+    @staticmethod
+    def signature(path):
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_ino)
+
+    @staticmethod
+    def estimate_bytes(rows):
+        # Estimativa grosseira: dicionário da linha + strings de caminho e texto
+        return sum(600 + 2 * (len(row.get('path') or '') + len(row.get('text') or '')) for row in rows)
+
+    def get(self, path):
+        """Retorna as linhas salvas se a pasta não mudou desde o snapshot"""
+        snapshot = self.snapshots.get(path)
+        if snapshot is None:
+            return None
+        try:
+            valid = (self.signature(path) == snapshot[0]
+                     and time.monotonic() - snapshot[3] <= self.max_age)
+        except OSError:
+            valid = False
+        if not valid:
+            self.discard(path)
+            return None
+        self.snapshots.move_to_end(path)
+        return snapshot[1]
+
+    def update_signature(self, path):
+        """Revalida um snapshot cujas linhas foram atualizadas no lugar"""
+        snapshot = self.snapshots.get(path)
+        if snapshot is not None:
+            try:
+                # Enquanto a pasta está exibida o watchdog a mantém em dia; o prazo recomeça
+                self.snapshots[path] = (self.signature(path),) + snapshot[1:3] + (time.monotonic(),)
+            except OSError:
+                self.discard(path)
+
+    def put(self, path, signature, rows):
+        self.discard(path)
+        nbytes = self.estimate_bytes(rows)
+        if nbytes > self.max_bytes:
+            return
+        self.snapshots[path] = (signature, rows, nbytes, time.monotonic())
+        self.total_bytes += nbytes
+        while len(self.snapshots) > self.max_snapshots or self.total_bytes > self.max_bytes:
+            oldest = next(iter(self.snapshots))
+            self.discard(oldest)
+
+    def discard(self, path):
+        snapshot = self.snapshots.pop(path, None)
+        if snapshot is not None:
+            self.total_bytes -= snapshot[2]
+
+    def prune(self, keep):
+        """Mantém apenas os snapshots de caminhos ainda presentes no histórico"""
+        keep = set(keep)
+        for path in [p for p in self.snapshots if p not in keep]:
+            self.discard(path)
+
+class WatchService:
+    """Observer único do watchdog para todo o programa; as pastas monitoradas são trocadas sem recriar a thread"""
+    def __init__(self):
+        self.observer = Observer()
+        self.observer.daemon = True
+        self.observer.start()
+        # Monitoramentos ativos por nome (ex.: 'listing')
+        self._watches = {}
+        # Caminho -> [operações ativas, instante em que a supressão expira]; o contador permite
+        # operações aninhadas ou simultâneas no mesmo caminho
+        self._suppressed = {}
+        self._lock = threading.Lock()
+        # unschedule espera a thread do emissor terminar, então a troca roda fora da interface
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="geren-watch")
+
+    def watch(self, key, handler, path, recursive=False):
+        """Aponta o monitoramento 'key' para outra pasta"""
+        self._executor.submit(self._retarget, key, handler, str(path), recursive)
+
+    def unwatch(self, key):
+        self._executor.submit(self._retarget, key, None, None, False)
+
+    def _retarget(self, key, handler, path, recursive):
+        old_watch = self._watches.pop(key, None)
+        if old_watch is not None:
+            try:
+                self.observer.unschedule(old_watch)
+            except Exception:
+                pass
+        if handler is not None:
+            try:
+                self._watches[key] = self.observer.schedule(handler, path, recursive=recursive)
+            except Exception as e:
+                print(f"Erro ao configurar observer: {e}")
+
+    @contextmanager
+    def suppressed(self, paths, grace=1.0):
+        """Ignora eventos dos caminhos durante uma operação do próprio programa e um pouco depois"""
+        paths = [str(p) for p in paths]
+        now = time.monotonic()
+        with self._lock:
+            # Aproveita para descartar supressões já expiradas e sem operação ativa
+            for expired in [p for p, (active, until) in self._suppressed.items() if not active and until < now]:
+                del self._suppressed[expired]
+            for path in paths:
+                self._suppressed.setdefault(path, [0, 0.0])[0] += 1
+        try:
+            yield
+        finally:
+            until = time.monotonic() + grace
+            with self._lock:
+                for path in paths:
+                    entry = self._suppressed.setdefault(path, [1, 0.0])
+                    entry[0] -= 1
+                    # Uma operação mais longa que termina depois não encurta a carência
+                    entry[1] = max(entry[1], until)
+
+    def is_suppressed(self, path):
+        with self._lock:
+            entry = self._suppressed.get(path)
+            return entry is not None and (entry[0] > 0 or entry[1] >= time.monotonic())
+
+    def stop(self, wait=False):
+        """Para o observer; com wait, só retorna depois que nenhum handler está mais rodando"""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        self.observer.stop()
+        if wait:
+            self.observer.join()
+
+def prefix_range(path):
+    """Limites [início, fim) que cobrem, em ordem de string, todos os descendentes de uma pasta"""
+    prefix = path if path.endswith(os.sep) else path + os.sep
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+class FilenameIndex:
+    """Índice persistente dos nomes de uma árvore de pastas (SQLite FTS5 com trigramas)"""
+    BATCH_SIZE = 5000
+
+    def __init__(self, root, db_path):
+        self.root = str(root)
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        # Eventos recebidos durante uma reconstrução, reaplicados no índice novo
+        self._replay = None
+        # Caminhos criados pelo watchdog durante uma ressincronização (não são removidos por ela)
+        self._created_during_reconcile = None
+        self.conn, self.has_fts = self._open(self.db_path)
+        self.complete = self._get_meta(self.conn, 'complete') == '1'
+
+    @staticmethod
+    def _open(db_path):
+        conn = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "id INTEGER PRIMARY KEY, path TEXT UNIQUE, name TEXT, is_dir INTEGER, ext TEXT)")
+        conn.execute("CREATE INDEX IF NOT EXISTS entries_ext ON entries(ext)")
+        try:
+            # Nomes em minúsculas; o tokenizador de trigramas acelera LIKE e GLOB
+            conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS names USING fts5(name, tokenize='trigram')")
+            has_fts = True
+        except sqlite3.OperationalError:
+            # SQLite sem FTS5 ou sem trigramas: as buscas percorrem a tabela de entradas
+            has_fts = False
+        return conn, has_fts
+
+    @staticmethod
+    def _get_meta(conn, key):
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _set_meta(conn, key, value):
+        conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+
+    @staticmethod
+    def read_root(db_path):
+        """Pasta raiz gravada num arquivo de índice (None se não for um índice válido)"""
+        try:
+            conn = sqlite3.connect(str(db_path))
+            try:
+                return FilenameIndex._get_meta(conn, 'root')
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return None
+
+    def _insert(self, conn, items):
+        for path, name, is_dir in items:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO entries (path, name, is_dir, ext) VALUES (?, ?, ?, ?)",
+                (path, name, int(is_dir), '' if is_dir else os.path.splitext(name)[1].lower()))
+            if cur.rowcount and self.has_fts:
+                conn.execute("INSERT INTO names (rowid, name) VALUES (?, ?)", (cur.lastrowid, name.lower()))
+
+    def _delete(self, conn, path):
+        start, end = prefix_range(path)
+        ids = conn.execute(
+            "SELECT id FROM entries WHERE path = ? OR (path >= ? AND path < ?)", (path, start, end)).fetchall()
+        if self.has_fts:
+            conn.executemany("DELETE FROM names WHERE rowid = ?", ids)
+        conn.executemany("DELETE FROM entries WHERE id = ?", ids)
+
+    @staticmethod
+    def walk(top, cancelled=None):
+        """Percorre a árvore sem seguir links de pastas, gerando (caminho, nome, é_pasta)"""
+        pending = [top]
+        while pending:
+            if cancelled is not None and cancelled():
+                return
+            current = pending.pop()
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        try:
+                            is_dir = entry.is_dir(follow_symlinks=False)
+                        except OSError:
+                            is_dir = False
+                        if is_dir:
+                            pending.append(entry.path)
+                        yield entry.path, entry.name, is_dir
+            except OSError:
+                pass
+
+    def build(self, cancelled=None):
+        """Reconstrói o índice num arquivo novo e troca pelo atual ao final"""
+        tmp_path = self.db_path.with_name(self.db_path.name + ".building")
+        for leftover in (tmp_path, Path(str(tmp_path) + "-wal"), Path(str(tmp_path) + "-shm")):
+            leftover.unlink(missing_ok=True)
+        conn, _ = self._open(tmp_path)
+        with self._lock:
+            self._replay = []
+        try:
+            batch = []
+            conn.execute("BEGIN")
+            for item in self.walk(self.root, cancelled):
+                batch.append(item)
+                if len(batch) >= self.BATCH_SIZE:
+                    self._insert(conn, batch)
+                    conn.execute("COMMIT")
+                    conn.execute("BEGIN")
+                    batch = []
+            self._insert(conn, batch)
+            self._set_meta(conn, 'root', self.root)
+            self._set_meta(conn, 'complete', '1')
+            conn.execute("COMMIT")
+            conn.close()
+            if cancelled is not None and cancelled():
+                tmp_path.unlink(missing_ok=True)
+                return False
+            with self._lock:
+                self.conn.close()
+                os.replace(tmp_path, self.db_path)
+                self.conn, self.has_fts = self._open(self.db_path)
+                for event in self._replay:
+                    self._apply_locked(*event)
+                self.complete = True
+            return True
+        finally:
+            with self._lock:
+                self._replay = None
+
+    def reconcile(self, cancelled=None):
+        """Ressincroniza no lugar um índice completo de uma sessão anterior
+
+        O índice continua respondendo durante a varredura: só o que foi criado
+        ou removido com o programa fechado é inserido ou apagado.
+        """
+        with self._lock:
+            self._created_during_reconcile = set()
+        try:
+            seen = set()
+            batch = []
+            for item in self.walk(self.root, cancelled):
+                seen.add(item[0])
+                batch.append(item)
+                if len(batch) >= self.BATCH_SIZE:
+                    self._insert_batch(batch)
+                    batch = []
+            self._insert_batch(batch)
+            if cancelled is not None and cancelled():
+                return False
+            with self._lock:
+                stale = [path for (path,) in self.conn.execute("SELECT path FROM entries")
+                         if path not in seen and path not in self._created_during_reconcile]
+                self.conn.execute("BEGIN")
+                for path in stale:
+                    self._delete(self.conn, path)
+                self.conn.execute("COMMIT")
+            return True
+        finally:
+            with self._lock:
+                self._created_during_reconcile = None
+
+    def _insert_batch(self, items):
+        with self._lock:
+            self.conn.execute("BEGIN")
+            self._insert(self.conn, items)
+            self.conn.execute("COMMIT")
+
+    def apply_event(self, event_type, src_path, dest_path=None):
+        """Mantém o índice atualizado com um evento do watchdog"""
+        with self._lock:
+            if self._replay is not None:
+                self._replay.append((event_type, src_path, dest_path))
+            if self._created_during_reconcile is not None and event_type in ('created', 'moved'):
+                self._created_during_reconcile.add(dest_path if event_type == 'moved' else src_path)
+            self._apply_locked(event_type, src_path, dest_path)
+
+    def _apply_locked(self, event_type, src_path, dest_path):
+        conn = self.conn
+        conn.execute("BEGIN")
+        try:
+            if event_type in ('deleted', 'moved'):
+                self._delete(conn, src_path)
+            added = dest_path if event_type == 'moved' else src_path
+            if event_type in ('created', 'moved') and added and os.path.lexists(added):
+                is_dir = os.path.isdir(added) and not os.path.islink(added)
+                self._insert(conn, [(added, os.path.basename(added), is_dir)])
+                if is_dir:
+                    # Pastas criadas ou movidas para dentro da árvore trazem seu conteúdo
+                    self._insert(conn, self.walk(added))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def search(self, term, scope=None, limit=2000):
+        """Busca por substring, glob (ex.: 'rel*2024*') ou extensão ('*.pdf') dentro de scope"""
+        sql, params = self._query(term, scope)
+        with self._lock:
+            return [(path, name, bool(is_dir))
+                    for path, name, is_dir in self.conn.execute(sql, params + [limit])]
+
+    def _query(self, term, scope):
+        """SQL e parâmetros da busca (sem o valor do LIMIT)"""
+        term = term.lower()
+        where, params = [], []
+        source = "entries e"
+        extension = re.fullmatch(r"\*(\.[^*?\[\]./\\]+)", term)
+        if extension:
+            where.append("e.ext = ?")
+            params.append(extension.group(1))
+        elif any(ch in term for ch in "*?["):
+            if self.has_fts:
+                source = "names n JOIN entries e ON e.id = n.rowid"
+                where.append("n.name GLOB ?")
+            else:
+                where.append("lower(e.name) GLOB ?")
+            params.append(term)
+        elif self.has_fts and len(term) >= 3:
+            # Frase entre aspas: o trigrama casa a substring literal, inclusive '%', '_' e '\'.
+            # (LIKE com ESCAPE não usa o índice FTS5 e percorreria a tabela inteira)
+            source = "names n JOIN entries e ON e.id = n.rowid"
+            where.append("n.name MATCH ?")
+            params.append('"' + term.replace('"', '""') + '"')
+        else:
+            escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            where.append("e.name LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+        if scope and scope != self.root:
+            start, end = prefix_range(scope)
+            where.append("e.path >= ? AND e.path < ?")
+            params += [start, end]
+        sql = (f"SELECT e.path, e.name, e.is_dir FROM {source} WHERE {' AND '.join(where)} "
+               f"ORDER BY e.is_dir DESC, e.name COLLATE NOCASE LIMIT ?")
+        return sql, params
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+class FilenameIndexEventHandler(FileSystemEventHandler):
+    def __init__(self, index):
+        self.index = index
+
+    def on_any_event(self, event):
+        if event.event_type not in ('created', 'deleted', 'moved'):
+            return
+        dest_path = os.fsdecode(event.dest_path) if event.event_type == 'moved' else None
+        try:
+            self.index.apply_event(event.event_type, os.fsdecode(event.src_path), dest_path)
+        except Exception as e:
+            print(f"Erro ao atualizar o índice de {self.index.root}: {e}")
+
+class FilenameIndexManager:
+    """Índices de nomes por pasta raiz, persistidos entre sessões e mantidos pelo watchdog"""
+    def __init__(self, watch_service, index_dir=None):
+        self.watch_service = watch_service
+        self.index_dir = Path(index_dir) if index_dir else CACHE_DIR / "index"
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.indexes = {}
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="geren-index")
+        self._closed = False
+        # Índices completos de sessões anteriores respondem na hora e são ressincronizados em segundo plano
+        for db_path in sorted(self.index_dir.glob("*.db")):
+            root = FilenameIndex.read_root(db_path)
+            if root and os.path.isdir(root):
+                self._start(root, db_path)
+
+    def db_path_for(self, root):
+        return self.index_dir / (hashlib.sha1(root.encode("utf-8", "surrogatepass")).hexdigest()[:16] + ".db")
+
+    def _start(self, root, db_path):
+        index = FilenameIndex(root, db_path)
+        self.indexes[root] = index
+        self.watch_service.watch(f"index:{root}", FilenameIndexEventHandler(index), root, recursive=True)
+        self.executor.submit(self._build, index)
+
+    def _build(self, index):
+        cancelled = lambda: self._closed or self.indexes.get(index.root) is not index
+        try:
+            if index.complete:
+                # O arquivo gravado é reaproveitado; o watchdog cuida do resto da sessão
+                index.reconcile(cancelled)
+            else:
+                index.build(cancelled)
+        except Exception as e:
+            print(f"Erro ao indexar {index.root}: {e}")
+
+    def add_root(self, root):
+        root = str(root)
+        if root not in self.indexes:
+            self._start(root, self.db_path_for(root))
+
+    def remove_root(self, root):
+        root = str(root)
+        index = self.indexes.pop(root, None)
+        if index is None:
+            return
+        self.watch_service.unwatch(f"index:{root}")
+        index.close()
+        for suffix in ("", "-wal", "-shm"):
+            Path(str(index.db_path) + suffix).unlink(missing_ok=True)
+
+    def index_for(self, path, include_incomplete=False):
+        """Índice completo cuja raiz contém o caminho (a raiz mais próxima), ou None
+
+        Enquanto a primeira indexação não termina, o índice daria resultados
+        parciais; a pesquisa usa a varredura em paralelo até lá.
+        """
+        path = str(path)
+        best = None
+        for root, index in self.indexes.items():
+            if not index.complete and not include_incomplete:
+                continue
+            if path == root or path.startswith(prefix_range(root)[0]):
+                if best is None or len(root) > len(best.root):
+                    best = index
+        return best
+
+    def close(self):
+        # A indexação em andamento percebe _closed; só então os bancos são fechados
+        self._closed = True
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        for index in self.indexes.values():
+            index.close()
+
+def name_matcher(search_term):
+    """Função que testa um nome em minúsculas: glob se houver curingas, senão substring"""
+    search_term = search_term.lower()
+    if any(ch in search_term for ch in "*?["):
+        return lambda name: fnmatch.fnmatchcase(name, search_term)
+    return lambda name: search_term in name
+
+class ParallelSearch:
+    """Pesquisa recursiva por nome em várias threads, com resultados entregues em lotes"""
+    def __init__(self, max_workers=None, batch_interval=0.15):
+        if max_workers is None:
+            max_workers = min(8, (os.cpu_count() or 1) + 2)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="geren-search")
+        self.batch_interval = batch_interval
+        self.generation = 0
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        """Interrompe a pesquisa em andamento; pastas ainda na fila são descartadas"""
+        self.generation += 1
+
+    def start(self, root, search_term, on_batch, on_done, limit=MAX_SEARCH_RESULTS):
+        """on_batch(geração, resultados) e on_done(geração, total, completa) rodam nas threads dos workers
+
+        Cada resultado é (caminho, nome, é_pasta).
+        """
+        self.cancel()
+        generation = self.generation
+        state = {
+            'matches': name_matcher(search_term), 'on_batch': on_batch, 'on_done': on_done,
+            'limit': limit, 'pending': 1, 'batch': [], 'found': 0, 'last_flush': time.monotonic(),
+            'stopped': False,
+        }
+        self.executor.submit(self._scan_dir, str(root), generation, state)
+        return generation
+
+    def _scan_dir(self, path, generation, state):
+        found, subdirs = [], []
+        if generation == self.generation and not state['stopped']:
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        try:
+                            is_dir = entry.is_dir(follow_symlinks=False)
+                        except OSError:
+                            is_dir = False
+                        if is_dir:
+                            subdirs.append(entry.path)
+                        if state['matches'](entry.name.lower()):
+                            found.append((entry.path, entry.name, is_dir))
+            except OSError:
+                pass
+
+        flush, done = None, False
+        with self._lock:
+            state['batch'].extend(found)
+            state['found'] += len(found)
+            if state['found'] >= state['limit']:
+                # Resultados demais: encerra a pesquisa sem descartar o que já foi achado
+                state['stopped'] = True
+            if generation == self.generation and not state['stopped']:
+                state['pending'] += len(subdirs)
+            else:
+                subdirs = []
+            state['pending'] -= 1
+            done = state['pending'] == 0
+            now = time.monotonic()
+            if state['batch'] and (done or now - state['last_flush'] >= self.batch_interval):
+                flush, state['batch'] = state['batch'], []
+                state['last_flush'] = now
+        for subdir in subdirs:
+            self.executor.submit(self._scan_dir, subdir, generation, state)
+        if flush:
+            state['on_batch'](generation, flush)
+        if done:
+            state['on_done'](generation, state['found'], generation == self.generation and not state['stopped'])
+
+    def shutdown(self, wait=False):
+        self.cancel()
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+
+class ArchiveIndexCache:
+    """Tabelas de membros de arquivos compactados já lidas, por (caminho, tamanho, mtime), com descarte LRU"""
+    # Ordem dos campos de cada membro no arquivo de cache em disco
+    FIELDS = ('path', 'is_dir', 'size', 'compressed_size', 'mtime', 'crc', 'offset')
+
+    def __init__(self, max_archives=16, max_members=1000000, cache_dir=None, max_disk_bytes=256 * 1024 * 1024):
+        self.max_archives = max_archives
+        self.max_members = max_members
+        # Sem cache_dir o cache fica só na memória
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_disk_bytes = max_disk_bytes
+        self.entries = OrderedDict()
+        self.total_members = 0
+        self._lock = threading.Lock()
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def signature(archive_path):
+        st = os.stat(archive_path)
+        return (st.st_size, st.st_mtime_ns)
+
+    def _disk_path(self, archive_path):
+        return self.cache_dir / (hashlib.sha1(str(archive_path).encode("utf-8", "surrogatepass")).hexdigest() + ".json")
+
+    def get(self, archive_path):
+        """Membros em cache, ou None se o arquivo compactado mudou ou nunca foi lido"""
+        archive_path = str(archive_path)
+        try:
+            signature = self.signature(archive_path)
+        except OSError:
+            return None
+        with self._lock:
+            cached = self.entries.get(archive_path)
+            if cached is not None:
+                if cached[0] == signature:
+                    self.entries.move_to_end(archive_path)
+                    return cached[1]
+                self._discard_locked(archive_path)
+        members = self._load(archive_path, signature)
+        if members is not None:
+            self._remember(archive_path, signature, members)
+        return members
+
+    def put(self, archive_path, signature, members):
+        archive_path = str(archive_path)
+        self._remember(archive_path, signature, members)
+        self._save(archive_path, signature, members)
+
+    def _remember(self, archive_path, signature, members):
+        with self._lock:
+            self._discard_locked(archive_path)
+            self.entries[archive_path] = (signature, members)
+            self.total_members += len(members)
+            while len(self.entries) > 1 and (len(self.entries) > self.max_archives
+                                             or self.total_members > self.max_members):
+                self._discard_locked(next(iter(self.entries)))
+
+    def _discard_locked(self, archive_path):
+        cached = self.entries.pop(archive_path, None)
+        if cached is not None:
+            self.total_members -= len(cached[1])
+
+    def _load(self, archive_path, signature):
+        if self.cache_dir is None:
+            return None
+        disk_path = self._disk_path(archive_path)
+        try:
+            with open(disk_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('archive') != archive_path or tuple(data.get('signature', ())) != signature:
+            disk_path.unlink(missing_ok=True)
+            return None
+        # Marca o arquivo como usado recentemente para o descarte LRU em disco
+        try:
+            os.utime(disk_path)
+        except OSError:
+            pass
+        members = []
+        for values in data['members']:
+            member = dict(zip(self.FIELDS, values))
+            member['name'] = Path(member['path']).name
+            members.append(member)
+        return members
+
+    def _save(self, archive_path, signature, members):
+        if self.cache_dir is None:
+            return
+        data = {
+            'archive': archive_path,
+            'signature': list(signature),
+            'members': [[member.get(field) for field in self.FIELDS] for member in members],
+        }
+        disk_path = self._disk_path(archive_path)
+        tmp_path = disk_path.with_suffix(".tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_path, disk_path)
+            self._evict_disk()
+        except OSError as e:
+            print(f"Erro ao salvar o índice de {archive_path}: {e}")
+
+    def _evict_disk(self):
+        files = []
+        for cache_file in self.cache_dir.glob("*.json"):
+            try:
+                st = cache_file.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, cache_file))
+        total = sum(size for _, size, _ in files)
+        for _, size, cache_file in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            cache_file.unlink(missing_ok=True)
+            total -= size
+
+class GzipSeekReader:
+    """Leitura sequencial de um .gz a partir de um ponto de retomada, registrando novos pontos
+
+    Cada ponto é (posição descompactada, posição compactada, cópia do
+    descompressor). Como o descompressor do zlib pode ser copiado, ler a
+    partir de um ponto evita descompactar o arquivo desde o início.
+    """
+    def __init__(self, path, checkpoints, spacing, upos=0, chunk_size=64 * 1024):
+        self.checkpoints = checkpoints
+        self.spacing = spacing
+        self.chunk_size = chunk_size
+        # Último ponto antes da posição pedida
+        index = 0
+        for i, point in enumerate(checkpoints):
+            if point[0] > upos:
+                break
+            index = i
+        self.pos, cpos, decompressor = checkpoints[index]
+        self.decompressor = decompressor.copy() if decompressor is not None else zlib.decompressobj(31)
+        self.file = open(path, 'rb')
+        self.file.seek(cpos)
+        # Dados descompactados ainda não lidos: buffer[buffer_pos:]
+        self.buffer = b''
+        self.buffer_pos = 0
+        self.eof = False
+        self.skip(upos - self.pos)
+
+    def _fill(self):
+        data = self.file.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            return
+        output = self.decompressor.decompress(data)
+        # gzip com vários membros concatenados: recomeça no que sobrou
+        while self.decompressor.eof and self.decompressor.unused_data:
+            rest = self.decompressor.unused_data
+            self.decompressor = zlib.decompressobj(31)
+            try:
+                output += self.decompressor.decompress(rest)
+            except zlib.error:
+                # Preenchimento após o último membro
+                self.eof = True
+                break
+        self.buffer = self.buffer[self.buffer_pos:] + output
+        self.buffer_pos = 0
+        upos = self.pos + len(self.buffer)
+        if upos - self.checkpoints[-1][0] >= self.spacing and not self.eof:
+            # Todo o compactado lido até aqui já foi consumido pelo descompressor
+            self.checkpoints.append((upos, self.file.tell(), self.decompressor.copy()))
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            while not self.eof:
+                self._fill()
+            size = len(self.buffer) - self.buffer_pos
+        while len(self.buffer) - self.buffer_pos < size and not self.eof:
+            self._fill()
+        # Fatiar a partir de um índice evita recopiar o restante do buffer a cada leitura
+        data = self.buffer[self.buffer_pos:self.buffer_pos + size]
+        self.buffer_pos += len(data)
+        self.pos += len(data)
+        return data
+
+    def skip(self, count):
+        while count > 0:
+            data = self.read(min(count, 1024 * 1024))
+            if not data:
+                break
+            count -= len(data)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class BoundedReader:
+    """Expõe apenas 'size' bytes de um stream, que é fechado junto"""
+    def __init__(self, stream, size):
+        self.stream = stream
+        self.remaining = size
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.stream.read(size) if size else b''
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TarSeekIndex:
+    """Acesso direto a membros de tar pelo deslocamento dos dados
+
+    O deslocamento de cada membro fica na tabela do ArchiveIndexCache; aqui
+    ficam só os pontos de retomada da descompressão dos .tar.gz, que vivem na
+    memória e são válidos enquanto o arquivo não muda (tamanho e mtime).
+    """
+    def __init__(self, max_archives=8, spacing=8 * 1024 * 1024):
+        self.max_archives = max_archives
+        self.spacing = spacing
+        self.entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _checkpoints(self, archive_path):
+        archive_path = str(archive_path)
+        signature = ArchiveIndexCache.signature(archive_path)
+        with self._lock:
+            cached = self.entries.get(archive_path)
+            if cached is None or cached[0] != signature:
+                cached = (signature, [(0, 0, None)])
+                self.entries[archive_path] = cached
+            self.entries.move_to_end(archive_path)
+            while len(self.entries) > self.max_archives:
+                self.entries.popitem(last=False)
+            return cached[1]
+
+    def open_stream(self, archive_path, archive_type):
+        """Stream descompactado do tar inteiro; para .tar.gz registra pontos de retomada"""
+        if archive_type == 'tar.gz':
+            return GzipSeekReader(archive_path, self._checkpoints(archive_path), self.spacing)
+        if archive_type == 'tar.bz2':
+            return bz2.open(archive_path, 'rb')
+        return open(archive_path, 'rb')
+
+    def open_member(self, archive_path, archive_type, offset, size):
+        """Stream dos dados de um membro, começando direto no deslocamento"""
+        if archive_type == 'tar.gz':
+            stream = GzipSeekReader(archive_path, self._checkpoints(archive_path), self.spacing, offset)
+        elif archive_type == 'tar.bz2':
+            # bz2 não permite copiar o descompressor; o seek descompacta até o deslocamento
+            stream = bz2.open(archive_path, 'rb')
+            stream.seek(offset)
+        else:
+            stream = open(archive_path, 'rb')
+            stream.seek(offset)
+        return BoundedReader(stream, size)
+
+
+class ArchiveTree:
+    """Árvore de pastas virtual de um arquivo compactado, montada uma vez a partir da tabela de membros"""
+    def __init__(self, members):
+        self.root = self._dir_node('', '')
+        for member in members:
+            self._add(member)
+        self._aggregate_sizes()
+
+    @staticmethod
+    def split(member_path):
+        # Aceita '\\', './' e '/' inicial, comuns em arquivos criados em outros sistemas
+        return [part for part in member_path.replace('\\', '/').split('/') if part not in ('', '.')]
+
+    @staticmethod
+    def _dir_node(name, path):
+        return {'name': name, 'path': path, 'is_dir': True, 'size': 0, 'children': {}, 'member_path': path}
+
+    def _add(self, member):
+        parts = self.split(member['path'])
+        if not parts:
+            return
+        node = self.root
+        # Pastas intermediárias podem não ter entrada própria no arquivo
+        for depth, part in enumerate(parts[:-1], 1):
+            child = node['children'].get(part)
+            if child is None or not child['is_dir']:
+                child = self._dir_node(part, '/'.join(parts[:depth]))
+                node['children'][part] = child
+            node = child
+        name = parts[-1]
+        if member['is_dir']:
+            if name not in node['children']:
+                node['children'][name] = self._dir_node(name, '/'.join(parts))
+        else:
+            node['children'][name] = {
+                'name': name, 'path': '/'.join(parts), 'is_dir': False,
+                'size': member.get('size') or 0, 'member_path': member['path'],
+                'offset': member.get('offset'),
+            }
+
+    def _aggregate_sizes(self):
+        # Ordem de visita em pré-ordem; somando de trás para frente cada pasta
+        # recebe o total dos filhos antes de ser somada ao pai
+        order = [(self.root, None)]
+        for node, _ in order:
+            if node['is_dir']:
+                order.extend((child, node) for child in node['children'].values())
+        for node, parent in reversed(order):
+            if parent is not None:
+                parent['size'] += node['size']
+
+    def find(self, inner_path):
+        """Nó da pasta com o caminho interno dado, ou None se não existir"""
+        node = self.root
+        for part in self.split(inner_path):
+            node = node['children'].get(part) if node['is_dir'] else None
+            if node is None:
+                return None
+        return node if node['is_dir'] else None
+
+    @staticmethod
+    def children(node):
+        """Filhos diretos ordenados: pastas primeiro, depois por nome"""
+        return sorted(node['children'].values(), key=lambda n: (not n['is_dir'], n['name'].lower()))
+
+    @staticmethod
+    def walk(node):
+        """Todos os descendentes de uma pasta"""
+        pending = list(node['children'].values())
+        while pending:
+            child = pending.pop()
+            yield child
+            if child['is_dir']:
+                pending.extend(child['children'].values())
+
+class OperationCancelled(Exception):
+    """Operação interrompida pelo usuário"""
+
+
+@contextmanager
+def open_archive_member(archive_path, member_path, offset=None, size=None, tar_index=None):
+    """Abre um membro do arquivo compactado como stream, sem carregá-lo na memória
+
+    Para tar, se o deslocamento do membro já for conhecido, a leitura vai
+    direto aos dados em vez de percorrer os cabeçalhos desde o início.
+    """
+    archive_type = archive_format(archive_path)
+    if archive_type in TAR_MODES and offset is not None and size is not None and tar_index is not None:
+        with tar_index.open_member(archive_path, archive_type, offset, size) as member_file:
+            yield member_file
+    elif archive_type == 'zip':
+        with zipfile.ZipFile(archive_path, 'r') as zip_ref:
+            with zip_ref.open(member_path) as member_file:
+                yield member_file
+    elif archive_type == 'rar':
+        with rarfile.RarFile(archive_path, 'r') as rar_ref:
+            with rar_ref.open(member_path) as member_file:
+                yield member_file
+    elif archive_type in TAR_MODES:
+        with tarfile.open(archive_path, TAR_MODES[archive_type]) as tar_ref:
+            member_file = tar_ref.extractfile(member_path)
+            if member_file is None:
+                raise IsADirectoryError(member_path)
+            with member_file:
+                yield member_file
+    else:
+        raise ValueError(f"Formato não suportado: {Path(archive_path).name}")
+
+
+def stream_to_file(source, dest_path, progress=None, cancelled=None, chunk_size=1024 * 1024):
+    """Copia um stream em blocos para '<destino>.part' e renomeia ao terminar.
+
+    Em caso de erro ou cancelamento o arquivo parcial é removido e o destino
+    original (se existir) fica intacto.
+    """
+    dest_path = Path(dest_path)
+    part_path = dest_path.with_name(dest_path.name + '.part')
+    done = 0
+    try:
+        with open(part_path, 'wb') as f:
+            while True:
+                if cancelled is not None and cancelled():
+                    raise OperationCancelled()
+                chunk = source.read(chunk_size)
+                if not chunk:
+                    break
+                f.write(chunk)
+                done += len(chunk)
+                if progress is not None:
+                    progress(done)
+        os.replace(part_path, dest_path)
+    except BaseException:
+        part_path.unlink(missing_ok=True)
+        raise
+    return done
+
+
+def safe_member_target(dest_dir, member_name):
+    """Destino de um membro dentro de dest_dir, recusando caminhos absolutos ou com '..'"""
+    parts = ArchiveTree.split(member_name)
+    absolute = member_name.replace('\\', '/').startswith('/')
+    if absolute or not parts or '..' in parts or ':' in parts[0]:
+        raise ValueError(f"Caminho inseguro no arquivo: {member_name}")
+    return Path(dest_dir).joinpath(*parts)
+
+
+class ArchiveExtractor:
+    """Extrai arquivos compactados inteiros com progresso em bytes e arquivos
+
+    Membros de zip são independentes, então são extraídos em paralelo, cada
+    thread com seu próprio ZipFile. Tar (compactado ou não) é lido em um único
+    stream sequencial, que é o único acesso eficiente a um .tar.gz.
+
+    Membros com caminhos inseguros (absolutos ou com '..') são pulados e
+    devolvidos na lista de ignorados, sem interromper o restante. Em tar,
+    links só são extraídos com o filtro 'data' do tarfile; sem ele, também
+    são pulados.
+    """
+    def __init__(self, max_workers=None, chunk_size=1024 * 1024):
+        if max_workers is None:
+            max_workers = min(8, (os.cpu_count() or 1) + 2)
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+
+    def extract(self, archive_path, dest_dir, progress=None, cancelled=None):
+        """Extrai tudo para dest_dir; retorna (bytes, arquivos, membros ignorados)
+
+        progress(bytes, arquivos) roda na thread do worker.
+        """
+        archive_type = archive_format(archive_path)
+        counters = {'bytes': 0, 'files': 0}
+        skipped = []
+        lock = threading.Lock()
+        def report(nbytes=0, nfiles=0):
+            with lock:
+                counters['bytes'] += nbytes
+                counters['files'] += nfiles
+                done = counters['bytes'], counters['files']
+            if progress is not None:
+                progress(*done)
+        if cancelled is None:
+            cancelled = lambda: False
+        if archive_type == 'zip':
+            self._extract_zip(archive_path, dest_dir, report, cancelled, skipped)
+        elif archive_type == 'rar':
+            self._extract_rar(archive_path, dest_dir, report, cancelled, skipped)
+        elif archive_type in TAR_MODES:
+            self._extract_tar(archive_path, dest_dir, report, cancelled, skipped)
+        else:
+            raise ValueError(f"Formato não suportado: {Path(archive_path).name}")
+        return counters['bytes'], counters['files'], skipped
+
+    @staticmethod
+    def _target(dest_dir, member_name, skipped):
+        """Destino seguro do membro, ou None (e o nome vai para skipped)"""
+        try:
+            return safe_member_target(dest_dir, member_name)
+        except ValueError:
+            skipped.append(member_name)
+            return None
+
+    def _copy(self, source, target, report, cancelled):
+        # Igual a stream_to_file, mas reportando só o incremento de cada bloco
+        last = [0]
+        def progress(done):
+            report(done - last[0])
+            last[0] = done
+        stream_to_file(source, target, progress, cancelled, self.chunk_size)
+        report(nfiles=1)
+
+    def _extract_zip(self, archive_path, dest_dir, report, cancelled, skipped):
+        with zipfile.ZipFile(archive_path, 'r') as zip_ref:
+            infos = zip_ref.infolist()
+        # Cria todas as pastas antes, para os workers não disputarem mkdir
+        files = []
+        created = set()
+        for info in infos:
+            target = self._target(dest_dir, info.filename, skipped)
+            if target is None:
+                continue
+            folder = target if info.is_dir() else target.parent
+            if folder not in created:
+                folder.mkdir(parents=True, exist_ok=True)
+                created.add(folder)
+            if not info.is_dir():
+                files.append((info, target))
+        # Os maiores primeiro, para que um arquivo grande não fique sozinho no fim
+        files.sort(key=lambda item: item[0].file_size, reverse=True)
+        local = threading.local()
+        handles = []
+        handles_lock = threading.Lock()
+        def extract_one(info, target):
+            if cancelled():
+                raise OperationCancelled()
+            zip_ref = getattr(local, 'zip_ref', None)
+            if zip_ref is None:
+                zip_ref = local.zip_ref = zipfile.ZipFile(archive_path, 'r')
+                with handles_lock:
+                    handles.append(zip_ref)
+            with zip_ref.open(info) as member_file:
+                if info.file_size <= self.chunk_size:
+                    # Membros pequenos cabem num único bloco: grava direto, sem o
+                    # '.part' intermediário, que domina o custo com milhares de arquivos
+                    data = member_file.read()
+                    with open(target, 'wb') as f:
+                        f.write(data)
+                    report(len(data), 1)
+                else:
+                    self._copy(member_file, target, report, cancelled)
+            mtime = time.mktime(info.date_time + (0, 0, -1))
+            os.utime(target, (mtime, mtime))
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="geren-extract")
+        try:
+            futures = [executor.submit(extract_one, info, target) for info, target in files]
+            for future in futures:
+                # Propaga o primeiro erro (ou cancelamento) e descarta o restante
+                future.result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            for zip_ref in handles:
+                zip_ref.close()
+
+    def _extract_rar(self, archive_path, dest_dir, report, cancelled, skipped):
+        # unrar não permite leitura paralela eficiente; extrai membro a membro
+        with rarfile.RarFile(archive_path, 'r') as rar_ref:
+            for info in rar_ref.infolist():
+                if cancelled():
+                    raise OperationCancelled()
+                target = self._target(dest_dir, info.filename, skipped)
+                if target is None:
+                    continue
+                if info.is_dir():
+                    target.mkdir(parents=True, exist_ok=True)
+                    continue
+                target.parent.mkdir(parents=True, exist_ok=True)
+                with rar_ref.open(info) as member_file:
+                    self._copy(member_file, target, report, cancelled)
+
+    def _extract_tar(self, archive_path, dest_dir, report, cancelled, skipped):
+        # Modo 'r|*' lê o arquivo uma única vez, sem buscas para trás
+        extract_kwargs = {'filter': 'data'} if hasattr(tarfile, 'data_filter') else {}
+        with tarfile.open(archive_path, 'r|*') as tar_ref:
+            for member in tar_ref:
+                if cancelled():
+                    raise OperationCancelled()
+                target = self._target(dest_dir, member.name, skipped)
+                if target is None:
+                    continue
+                if member.isdir():
+                    target.mkdir(parents=True, exist_ok=True)
+                elif member.isfile():
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    with tar_ref.extractfile(member) as member_file:
+                        self._copy(member_file, target, report, cancelled)
+                    os.chmod(target, (member.mode & 0o777) | stat.S_IWUSR)
+                    os.utime(target, (member.mtime, member.mtime))
+                elif not extract_kwargs:
+                    # Sem o filtro 'data' (Python antigo) nada impede um link de apontar para fora
+                    # de dest_dir, e um membro seguinte seria gravado através dele: links e tipos
+                    # especiais são recusados
+                    skipped.append(member.name)
+                else:
+                    # Links e outros tipos especiais ficam com o tarfile, que valida o destino
+                    try:
+                        tar_ref.extract(member, dest_dir, **extract_kwargs)
+                    except getattr(tarfile, 'FilterError', ValueError):
+                        skipped.append(member.name)
+
+
+# ioctl FICLONE do Linux: o destino passa a compartilhar os blocos da origem (btrfs, xfs)
+FICLONE = 0x40049409
+# Erros que indicam que o método não existe para aquele par de sistemas de arquivos
+COPY_UNSUPPORTED_ERRNOS = (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP,
+                           errno.ENOTSUP, errno.EBADF, errno.ENOTTY)
+# (método, dispositivo de origem, dispositivo de destino) já vistos sem suporte; não são sondados de novo
+_unsupported_copy = set()
+
+
+def _copy_range(src_fd, dst_fd, size, progress, cancelled, chunk_size, devices=()):
+    """Copia dentro do kernel com copy_file_range ou sendfile; False se nenhum estiver disponível"""
+    for method in ('copy_file_range', 'sendfile'):
+        copy = getattr(os, method, None)
+        if copy is None or (method,) + devices in _unsupported_copy:
+            continue
+        done = 0
+        try:
+            while done < size:
+                if cancelled is not None and cancelled():
+                    raise OperationCancelled()
+                if method == 'copy_file_range':
+                    sent = copy(src_fd, dst_fd, chunk_size)
+                else:
+                    sent = copy(dst_fd, src_fd, done, chunk_size)
+                if sent == 0:
+                    break
+                done += sent
+                if progress is not None:
+                    progress(done)
+            return True
+        except OSError as e:
+            # Sem suporte neste sistema de arquivos: tenta o próximo método, se nada foi copiado
+            if done or e.errno not in COPY_UNSUPPORTED_ERRNOS:
+                raise
+            _unsupported_copy.add((method,) + devices)
+    return False
+
+
+def copy_file_fast(source_path, dest_path, progress=None, cancelled=None, chunk_size=8 * 1024 * 1024, atomic=True, digest=None):
+    """Copia um arquivo sem passar os dados pelo Python
+
+    Tenta, nesta ordem: reflink (FICLONE), copy_file_range, sendfile e, por
+    fim, leitura e escrita com um buffer grande reaproveitado. Um método que
+    falha por falta de suporte não é tentado de novo entre os mesmos
+    dispositivos. Arquivos de até SMALL_FILE_SIZE são copiados com uma
+    leitura e uma escrita, sem sondar o kernel. Com atomic, a
+    cópia é feita em '<destino>.part' e renomeada ao terminar; sem, grava
+    direto no destino (para arquivos pequenos, onde a renomeação pesa).
+    Com digest (um objeto do hashlib), os dados passam pelo buffer e cada
+    bloco é somado ao digest enquanto é copiado, e o destino é gravado em
+    disco antes da renomeação.
+    """
+    dest_path = Path(dest_path)
+    part_path = dest_path.with_name(dest_path.name + '.part') if atomic else dest_path
+    try:
+        with open(source_path, 'rb') as src, open(part_path, 'wb') as dst:
+            src_st = os.fstat(src.fileno())
+            size = src_st.st_size
+            if size <= SMALL_FILE_SIZE:
+                # Um bloco só: as sondagens do kernel custariam mais que a própria cópia
+                if cancelled is not None and cancelled():
+                    raise OperationCancelled()
+                data = src.read()
+                if digest is not None:
+                    digest.update(data)
+                dst.write(data)
+                if progress is not None:
+                    progress(len(data))
+            else:
+                devices = (src_st.st_dev, os.fstat(dst.fileno()).st_dev)
+                copied = False
+                if fcntl is not None and digest is None and ('ficlone',) + devices not in _unsupported_copy:
+                    try:
+                        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+                        copied = True
+                        if progress is not None:
+                            progress(size)
+                    except OSError as e:
+                        if e.errno in COPY_UNSUPPORTED_ERRNOS:
+                            _unsupported_copy.add(('ficlone',) + devices)
+                if not copied and digest is None:
+                    copied = _copy_range(src.fileno(), dst.fileno(), size, progress, cancelled, chunk_size, devices)
+                if not copied:
+                    buffer = bytearray(min(chunk_size, size))
+                    view = memoryview(buffer)
+                    done = 0
+                    while True:
+                        if cancelled is not None and cancelled():
+                            raise OperationCancelled()
+                        count = src.readinto(buffer)
+                        if not count:
+                            break
+                        if digest is not None:
+                            digest.update(view[:count])
+                        dst.write(view[:count])
+                        done += count
+                        if progress is not None:
+                            progress(done)
+            if digest is not None:
+                # A releitura da verificação deve vir do disco, não do cache de páginas
+                dst.flush()
+                os.fsync(dst.fileno())
+                if hasattr(os, 'posix_fadvise'):
+                    os.posix_fadvise(dst.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+        if atomic:
+            os.replace(part_path, dest_path)
+    except BaseException:
+        part_path.unlink(missing_ok=True)
+        raise
+
+
+def file_digest(path, algorithm='sha256', cancelled=None, chunk_size=1024 * 1024):
+    """Hex do digest do arquivo lido em blocos"""
+    digest = hashlib.new(algorithm)
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(path, 'rb') as f:
+        while True:
+            if cancelled is not None and cancelled():
+                raise OperationCancelled()
+            count = f.readinto(buffer)
+            if not count:
+                break
+            digest.update(view[:count])
+    return digest.hexdigest()
+
+
+class ProgressDialog(ctk.CTkToplevel):
+    """Janela de progresso com barra, velocidade e botão de cancelar"""
+    def __init__(self, master, title, total=0):
+        super().__init__(master)
+        self.title(title)
+        self.geometry("420x170")
+        self.attributes('-topmost', True)
+        self.total = total
+        self.cancelled = threading.Event()
+        self.started = time.monotonic()
+        frame = ctk.CTkFrame(self)
+        frame.pack(pady=15, padx=15, fill="both", expand=True)
+        self.status_label = ctk.CTkLabel(frame, text=title, anchor="w")
+        self.status_label.pack(pady=(10, 5), padx=10, fill="x")
+        self.progress_bar = ctk.CTkProgressBar(frame)
+        self.progress_bar.pack(pady=5, padx=10, fill="x")
+        self.progress_bar.set(0)
+        self.speed_label = ctk.CTkLabel(frame, text="", anchor="w")
+        self.speed_label.pack(pady=5, padx=10, fill="x")
+        self.cancel_btn = ctk.CTkButton(frame, text="Cancelar", command=self.cancel)
+        self.cancel_btn.pack(pady=(5, 10))
+        self.protocol("WM_DELETE_WINDOW", self.cancel)
+
+    def cancel(self):
+        self.cancelled.set()
+        self.cancel_btn.configure(state="disabled", text="Cancelando...")
+
+    def set_total(self, total):
+        """Total conhecido só depois de aberta a janela (ex.: calculado no worker)"""
+        self.total = total
+
+    def update_progress(self, done, text=None):
+        if not self.winfo_exists():
+            return
+        if self.total:
+            self.progress_bar.set(min(done / self.total, 1.0))
+        self.speed_label.configure(text=progress_details(
+            self.master.convert_size, done, self.total, time.monotonic() - self.started))
+        if text is not None:
+            self.status_label.configure(text=text)
+
+
+def progress_details(convert_size, done, total, elapsed):
+    """Texto 'feito de total — velocidade — tempo restante' das janelas de progresso"""
+    speed = done / max(elapsed, 1e-6)
+    details = f"{convert_size(done)}"
+    if total:
+        details += f" de {convert_size(total)}"
+    details += f" — {convert_size(speed)}/s"
+    if total and speed > 0:
+        details += f" — {int(max(total - done, 0) / speed)}s restantes"
+    return details
+
+
+class FileOperationJob:
+    """Uma colagem (cópia ou movimentação) ou remoção de vários itens, executada fora da interface
+
+    Conflitos com itens já existentes no destino seguem conflict_policy:
+    'overwrite' mescla pastas e substitui arquivos, 'skip' mantém o que já
+    existe. ('Manter ambos' é resolvido antes, ao escolher os destinos.)
+
+    Com verify, cada arquivo é somado (sha256) durante a cópia, o destino é
+    relido e comparado, e um manifesto no formato do sha256sum é gravado em
+    manifest_path ao final. Itens movidos por renomeação na mesma unidade não
+    são copiados nem verificados; sem nenhuma cópia não há manifesto e
+    manifest_path volta a None.
+
+    Nas operações 'delete' (exclusão permanente) e 'trash' (lixeira) os
+    destinos dos pares são None.
+    """
+    STATES = {
+        'queued': "Na fila", 'running': "Em andamento", 'paused': "Pausado",
+        'cancelled': "Cancelado", 'done': "Concluído", 'failed': "Falhou",
+    }
+
+    def __init__(self, operation, pairs, conflict_policy='overwrite', chunk_size=8 * 1024 * 1024, verify=False):
+        self.operation = operation
+        # Lista de (origem, destino final)
+        self.pairs = [(Path(source), Path(destination) if destination is not None else None)
+                      for source, destination in pairs]
+        self.conflict_policy = conflict_policy
+        self.chunk_size = chunk_size
+        # Pool para arquivos pequenos, definido pela fila ao receber o job
+        self.executor = None
+        self.verify = verify
+        # (destino, sha256) de cada arquivo copiado e verificado
+        self.manifest = []
+        self.manifest_path = None
+        if verify and self.pairs:
+            stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+            self.manifest_path = self.pairs[0][1].parent / f"checksums-{stamp}.sha256"
+        self.state = 'queued'
+        self.error = None
+        self.total_bytes = 0
+        self.total_files = 0
+        self.done_bytes = 0
+        self.done_files = 0
+        self.started = None
+        self._lock = threading.Lock()
+        self._resume = threading.Event()
+        self._resume.set()
+        self._cancel = threading.Event()
+
+    @property
+    def title(self):
+        verb = {'copy': "Copiando", 'move': "Movendo", 'delete': "Excluindo",
+                'trash': "Movendo para a lixeira"}[self.operation]
+        if len(self.pairs) == 1:
+            return f"{verb} {self.pairs[0][0].name}"
+        return f"{verb} {len(self.pairs)} itens"
+
+    @property
+    def finished(self):
+        return self.state in ('cancelled', 'done', 'failed')
+
+    def pause(self):
+        if self.state == 'running':
+            self._resume.clear()
+            self.state = 'paused'
+
+    def resume(self):
+        if self.state == 'paused':
+            self.state = 'running'
+        self._resume.set()
+
+    def cancel(self):
+        self._cancel.set()
+        # Acorda um job pausado para que ele perceba o cancelamento
+        self._resume.set()
+        if self.state == 'queued':
+            self.state = 'cancelled'
+
+    def should_stop(self):
+        """Bloqueia enquanto pausado; True se o job foi cancelado"""
+        self._resume.wait()
+        return self._cancel.is_set()
+
+    def add_progress(self, nbytes=0, nfiles=0):
+        with self._lock:
+            self.done_bytes += nbytes
+            self.done_files += nfiles
+
+    def run(self):
+        if self._cancel.is_set():
+            self.state = 'cancelled'
+            return
+        self.state = 'running'
+        self.started = time.monotonic()
+        try:
+            if self.operation in ('delete', 'trash'):
+                self._remove_items()
+                self.state = 'done'
+                return
+            pending = []
+            for source, destination in self.pairs:
+                if self.should_stop():
+                    raise OperationCancelled()
+                # Movimentação na mesma unidade é só renomeação, inclusive ao mesclar pastas
+                if self.operation == 'move' and self._move_by_rename(source, destination):
+                    continue
+                pending.append((source, destination))
+            # Totais só do que precisa ser copiado de fato
+            for source, _ in pending:
+                nbytes, nfiles = self._measure(source)
+                self.total_bytes += nbytes
+                self.total_files += nfiles
+            for source, destination in pending:
+                self._copy_item(source, destination)
+            if self.manifest:
+                self._write_manifest()
+            else:
+                # Tudo foi movido por renomeação: nenhum byte copiado, nada a verificar
+                self.manifest_path = None
+            self.state = 'done'
+        except OperationCancelled:
+            self.state = 'cancelled'
+        except Exception as e:
+            self.error = e
+            self.state = 'failed'
+
+    def _move_by_rename(self, source, destination):
+        """Move renomeando; False se origem e destino estão em unidades diferentes"""
+        try:
+            if source.lstat().st_dev != destination.parent.stat().st_dev:
+                return False
+        except OSError:
+            return False
+        if not (destination.exists() or destination.is_symlink()):
+            os.rename(source, destination)
+            self.add_progress(nfiles=1)
+            return True
+        if source.is_dir() and not source.is_symlink() and destination.is_dir() and not destination.is_symlink():
+            # Mescla renomeando item a item; só o que conflita desce um nível
+            pending = [(source, destination)]
+            visited = []
+            while pending:
+                if self.should_stop():
+                    raise OperationCancelled()
+                current, target = pending.pop()
+                visited.append(current)
+                with os.scandir(current) as entries:
+                    for entry in list(entries):
+                        child_target = target / entry.name
+                        if entry.is_dir(follow_symlinks=False) and child_target.is_dir() and not child_target.is_symlink():
+                            pending.append((Path(entry.path), child_target))
+                        elif not (child_target.exists() or child_target.is_symlink()):
+                            os.rename(entry.path, child_target)
+                            self.add_progress(nfiles=1)
+                        elif self.conflict_policy == 'overwrite':
+                            if child_target.is_dir() and not child_target.is_symlink():
+                                shutil.rmtree(child_target)
+                            os.replace(entry.path, child_target)
+                            self.add_progress(nfiles=1)
+            # Pastas de origem que ficaram vazias (itens pulados permanecem)
+            for folder in reversed(visited):
+                try:
+                    folder.rmdir()
+                except OSError:
+                    pass
+            return True
+        if self.conflict_policy == 'skip':
+            return True
+        if destination.is_dir() and not destination.is_symlink():
+            shutil.rmtree(destination)
+        os.replace(source, destination)
+        self.add_progress(nfiles=1)
+        return True
+
+    @staticmethod
+    def _measure(source):
+        if not source.is_dir() or source.is_symlink():
+            return source.lstat().st_size, 1
+        total_bytes = total_files = 0
+        for root, _, files in os.walk(source):
+            for name in files:
+                try:
+                    total_bytes += os.lstat(os.path.join(root, name)).st_size
+                except OSError:
+                    pass
+                total_files += 1
+        return total_bytes, total_files
+
+    def _copy_item(self, source, destination):
+        if not source.is_dir() or source.is_symlink():
+            self._copy_file(source, destination)
+            return
+        # Arquivos pequenos vão para o pool, onde o custo é abrir/criar e não transferir;
+        # os grandes são copiados aqui mesmo, um por vez, pelo kernel
+        in_flight = deque()
+        def wait_oldest():
+            in_flight.popleft().result()
+        folders = []
+        pending = [(source, destination)]
+        try:
+            while pending:
+                current, target = pending.pop()
+                if target.exists() and not target.is_dir():
+                    if self.conflict_policy == 'skip':
+                        continue
+                    target.unlink()
+                target.mkdir(exist_ok=True)
+                folders.append((current, target))
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append((Path(entry.path), target / entry.name))
+                            continue
+                        entry_st = entry.stat(follow_symlinks=False)
+                        if entry_st.st_size > SMALL_FILE_SIZE:
+                            self._copy_file(Path(entry.path), target / entry.name)
+                        elif self.executor is None:
+                            self._copy_small_file(entry.path, os.path.join(target, entry.name), entry_st)
+                        else:
+                            # A pausa é respeitada aqui, na thread do job: o pool é compartilhado
+                            # com os outros jobs e suas threads nunca ficam esperando um resume
+                            if self.should_stop():
+                                raise OperationCancelled()
+                            in_flight.append(self.executor.submit(
+                                self._copy_small_file, entry.path, os.path.join(target, entry.name),
+                                entry_st, self._cancel.is_set))
+                            if len(in_flight) > 256:
+                                wait_oldest()
+            while in_flight:
+                wait_oldest()
+        finally:
+            if in_flight:
+                # Erro ou cancelamento: espera as cópias já iniciadas antes de sair
+                self._cancel.set()
+                self._resume.set()
+                for future in in_flight:
+                    future.exception()
+        # Datas das pastas só depois que nada mais será criado dentro delas
+        for current, target in reversed(folders):
+            shutil.copystat(current, target)
+            if self.operation == 'move':
+                try:
+                    current.rmdir()
+                except OSError:
+                    pass
+
+    def _copy_small_file(self, source, destination, source_st, stop=None):
+        """Cópia enxuta de um arquivo pequeno: caminhos em str, stat já lido pelo scandir e sem '.part'
+
+        Conflitos, links e a verificação ficam com _copy_file.
+        """
+        if stop is None:
+            stop = self.should_stop
+        if self.verify or stat.S_ISLNK(source_st.st_mode):
+            self._copy_file(Path(source), Path(destination), False, stop)
+            return
+        if stop():
+            raise OperationCancelled()
+        with open(source, 'rb') as src:
+            data = src.read()
+        try:
+            dst = open(destination, 'xb')
+        except OSError:
+            # Já existe algo no destino (ou outro erro): o caminho completo aplica a política ou relata o erro
+            self._copy_file(Path(source), Path(destination), False, stop)
+            return
+        with dst:
+            dst.write(data)
+        shutil.copystat(source, destination)
+        if self.operation == 'move':
+            os.unlink(source)
+        self.add_progress(len(data), 1)
+
+    def _copy_file(self, source, destination, atomic=True, stop=None):
+        # Nas threads do pool, stop só verifica o cancelamento (sem bloquear na pausa)
+        if stop is None:
+            stop = self.should_stop
+        if stop():
+            raise OperationCancelled()
+        source_st = source.lstat()
+        try:
+            destination_st = destination.lstat()
+        except FileNotFoundError:
+            destination_st = None
+        if destination_st is not None:
+            if self.conflict_policy == 'skip':
+                self.add_progress(source_st.st_size, 1)
+                return
+            if stat.S_ISDIR(destination_st.st_mode):
+                shutil.rmtree(destination)
+            elif not atomic:
+                # Sem '.part', o arquivo antigo é substituído no lugar
+                destination.unlink()
+        if stat.S_ISLNK(source_st.st_mode):
+            destination.unlink(missing_ok=True)
+            os.symlink(os.readlink(source), destination)
+            self.add_progress(source_st.st_size)
+        else:
+            last = [0]
+            def progress(done):
+                # copy_file_fast informa o total acumulado do arquivo; aqui soma só o incremento
+                self.add_progress(done - last[0])
+                last[0] = done
+            digest = hashlib.sha256() if self.verify else None
+            copy_file_fast(source, destination, progress, stop, self.chunk_size, atomic, digest)
+            shutil.copystat(source, destination)
+            if digest is not None:
+                # Só o destino é relido; a origem já foi somada durante a cópia
+                expected = digest.hexdigest()
+                if file_digest(destination, cancelled=stop) != expected:
+                    raise OSError(f"a verificação falhou para '{destination}': o conteúdo copiado difere da origem")
+                with self._lock:
+                    self.manifest.append((destination, expected))
+        if self.operation == 'move':
+            # Só o que foi copiado sai da origem; itens pulados ficam
+            source.unlink()
+        self.add_progress(nfiles=1)
+
+
+    def _remove_items(self):
+        sources = [source for source, _ in self.pairs]
+        if self.operation == 'trash':
+            if win_shell is None:
+                raise OSError("a lixeira só está disponível no Windows")
+            self.total_files = len(sources)
+            # Uma chamada da shell por lote, sem confirmação (já perguntada pela interface)
+            flags = shellcon.FOF_ALLOWUNDO | shellcon.FOF_NOCONFIRMATION | shellcon.FOF_SILENT | shellcon.FOF_NOERRORUI
+            for start in range(0, len(sources), 200):
+                if self.should_stop():
+                    raise OperationCancelled()
+                batch = sources[start:start + 200]
+                result, aborted = win_shell.SHFileOperation(
+                    (0, shellcon.FO_DELETE, "\0".join(str(p.absolute()) for p in batch), None, flags, None, None))
+                if result != 0 or aborted:
+                    raise OSError(f"a shell recusou mover para a lixeira (código {result})")
+                self.add_progress(nfiles=len(batch))
+            return
+        for source in sources:
+            nbytes, nfiles = self._measure(source)
+            self.total_bytes += nbytes
+            self.total_files += nfiles
+        for source in sources:
+            if not source.is_dir() or source.is_symlink():
+                if self.should_stop():
+                    raise OperationCancelled()
+                size = source.lstat().st_size
+                source.unlink()
+                self.add_progress(size, 1)
+                continue
+            # De baixo para cima, para poder parar entre um arquivo e outro
+            for root, dirs, files in os.walk(source, topdown=False):
+                for name in files:
+                    if self.should_stop():
+                        raise OperationCancelled()
+                    file_path = os.path.join(root, name)
+                    size = os.lstat(file_path).st_size
+                    os.unlink(file_path)
+                    self.add_progress(size, 1)
+                for name in dirs:
+                    dir_path = os.path.join(root, name)
+                    # Links para pastas aparecem em dirs, mas são removidos como arquivos
+                    if os.path.islink(dir_path):
+                        os.unlink(dir_path)
+                    else:
+                        os.rmdir(dir_path)
+            source.rmdir()
+
+    def _write_manifest(self):
+        base = self.manifest_path.parent
+        lines = []
+        for destination, hexdigest in sorted(self.manifest):
+            lines.append(f"{hexdigest}  {destination.relative_to(base).as_posix()}\n")
+        # Dois jobs que terminam no mesmo segundo no mesmo destino teriam o mesmo nome: ele é
+        # reservado com criação exclusiva e ganha um contador ('-2', '-3'...) se já existir
+        stem, counter = self.manifest_path.stem, 1
+        while True:
+            try:
+                with open(self.manifest_path, 'x'):
+                    pass
+                break
+            except FileExistsError:
+                counter += 1
+                self.manifest_path = base / f"{stem}-{counter}.sha256"
+        part_path = self.manifest_path.with_name(self.manifest_path.name + '.part')
+        try:
+            with open(part_path, 'w', encoding='utf-8', newline='\n') as f:
+                f.writelines(lines)
+            os.replace(part_path, self.manifest_path)
+        except BaseException:
+            part_path.unlink(missing_ok=True)
+            self.manifest_path.unlink(missing_ok=True)
+            raise
+
+
+class FileOperationQueue:
+    """Fila de jobs de arquivo; até max_workers jobs independentes rodam ao mesmo tempo"""
+    def __init__(self, max_workers=2, small_file_workers=None):
+        if small_file_workers is None:
+            # Com um só processador as threads do pool só disputariam o GIL com o job;
+            # os arquivos pequenos são então copiados pela própria thread do job
+            cpus = os.cpu_count() or 1
+            small_file_workers = min(8, cpus + 2) if cpus > 1 else 0
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="geren-fileop")
+        # Compartilhado pelos jobs para copiar arquivos pequenos em paralelo
+        self.small_files = None
+        if small_file_workers:
+            self.small_files = ThreadPoolExecutor(max_workers=small_file_workers, thread_name_prefix="geren-smallcopy")
+        self.jobs = []
+
+    def submit(self, job, on_done, context=None):
+        """Enfileira o job; on_done(job) roda na thread do worker, dentro de context se houver"""
+        job.executor = self.small_files
+        self.jobs.append(job)
+        self.executor.submit(self._run, job, on_done, context)
+
+    def _run(self, job, on_done, context):
+        try:
+            if context is not None:
+                with context:
+                    job.run()
+            else:
+                job.run()
+        finally:
+            on_done(job)
+
+    def active_jobs(self):
+        self.jobs = [job for job in self.jobs if not job.finished]
+        return list(self.jobs)
+
+    def shutdown(self):
+        for job in self.jobs:
+            job.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.small_files is not None:
+            self.small_files.shutdown(wait=False, cancel_futures=True)
+
+
+class FileOperationsWindow(ctk.CTkToplevel):
+    """Lista os jobs de arquivo com progresso, pausa e cancelamento"""
+    def __init__(self, master):
+        super().__init__(master)
+        self.title("Operações de Arquivo")
+        self.geometry("460x300")
+        self.rows = {}
+        self.jobs_frame = ctk.CTkScrollableFrame(self)
+        self.jobs_frame.pack(fill="both", expand=True, padx=10, pady=10)
+        self.protocol("WM_DELETE_WINDOW", self.withdraw)
+        self._poll()
+
+    def add_job(self, job):
+        frame = ctk.CTkFrame(self.jobs_frame)
+        frame.pack(fill="x", pady=5, padx=5)
+        title_label = ctk.CTkLabel(frame, text=job.title, anchor="w")
+        title_label.pack(fill="x", padx=10, pady=(5, 0))
+        progress_bar = ctk.CTkProgressBar(frame)
+        progress_bar.pack(fill="x", padx=10, pady=5)
+        progress_bar.set(0)
+        details_label = ctk.CTkLabel(frame, text=job.STATES[job.state], anchor="w")
+        details_label.pack(fill="x", padx=10)
+        btn_frame = ctk.CTkFrame(frame, fg_color="transparent")
+        btn_frame.pack(pady=(0, 5))
+        pause_btn = ctk.CTkButton(btn_frame, text="Pausar", width=90)
+        pause_btn.configure(command=lambda: self.toggle_pause(job, pause_btn))
+        pause_btn.pack(side="left", padx=5)
+        ctk.CTkButton(btn_frame, text="Cancelar", width=90, command=job.cancel).pack(side="left", padx=5)
+        self.rows[job] = (frame, progress_bar, details_label)
+        self.deiconify()
+        self.lift()
+
+    def toggle_pause(self, job, button):
+        if job.state == 'paused':
+            job.resume()
+            button.configure(text="Pausar")
+        elif job.state == 'running':
+            job.pause()
+            button.configure(text="Retomar")
+
+    def _poll(self):
+        for job, (frame, progress_bar, details_label) in list(self.rows.items()):
+            if job.total_bytes:
+                progress_bar.set(min(job.done_bytes / job.total_bytes, 1.0))
+            text = job.STATES[job.state]
+            if job.started is not None and not job.finished:
+                text += f" — {job.done_files} de {job.total_files} arquivos — "
+                text += progress_details(self.master.convert_size, job.done_bytes, job.total_bytes,
+                                         time.monotonic() - job.started)
+            elif job.error is not None:
+                text += f": {job.error}"
+            details_label.configure(text=text)
+            if job.finished and job.error is None:
+                # Jobs concluídos saem da lista depois de alguns segundos
+                del self.rows[job]
+                self.after(3000, frame.destroy)
+        self.after(250, self._poll)
+
+
 class FileManagerEventHandler(FileSystemEventHandler):
-    def __init__(self, file_manager):
+    def __init__(self, file_manager, coalesce_ms=300):
         self.file_manager = file_manager
+        self.coalesce_ms = coalesce_ms
+        # Caminhos alterados desde a última atualização, agrupados numa janela curta
+        self._pending = set()
+        self._scheduled = False
+        self._lock = threading.Lock()
     
     def on_any_event(self, event):
         # Atualiza a visualização quando ocorrer qualquer mudança no diretório
-        if (event.event_type == 'modified') or (getattr(event, 'is_synthetic', False) and event.event_type == 'modified'):
+        if event.event_type not in ('created', 'deleted', 'moved', 'modified'):
+            return
+        # 'modified' em pastas só indica que o mtime da própria pasta mudou
+        if event.event_type == 'modified' and event.is_directory:
             return
         
+        paths = [os.fsdecode(event.src_path)]
+        if event.event_type == 'moved':
+            paths.append(os.fsdecode(event.dest_path))
+        # Eventos causados pelas operações do próprio programa já foram aplicados
+        watch_service = self.file_manager.watch_service
+        if all(watch_service.is_suppressed(p) for p in paths):
+            return
+        with self._lock:
+            self._pending.update(paths)
+            if self._scheduled:
+                return
+            self._scheduled = True
         # Usa after para agendar a atualização na thread principal do Tkinter
-        self.file_manager.after(500, self.file_manager.refresh_current_directory)
+        self.file_manager.after(self.coalesce_ms, self.flush)
+    
+    def flush(self):
+        with self._lock:
+            changed, self._pending = self._pending, set()
+            self._scheduled = False
+        self.file_manager.apply_directory_changes(changed)
+    
+    def invalidate_sizes(self, event):
+        # Tamanhos em cache das pastas afetadas e de seus ancestrais ficam inválidos
+        cache = self.file_manager.size_cache
+        if cache is None:
+            return
+        for attr in ('src_path', 'dest_path'):
+            changed = getattr(event, attr, None)
+            if not changed:
+                continue
+            changed = os.fsdecode(changed)
+            cache.invalidate(os.path.dirname(changed))
+            if event.is_directory and event.event_type in ('deleted', 'moved'):
+                cache.invalidate_tree(changed)
+    
+    def dispatch(self, event):
+        # Invalida o cache antes do filtro de on_any_event (que ignora 'modified')
+        self.invalidate_sizes(event)
+        super().dispatch(event)
+
+class VirtualListView(ctk.CTkFrame):
+    """Lista virtualizada: só cria widgets para as linhas visíveis e os recicla ao rolar
+
+    Com cell_width definido (set_layout), as linhas viram células de uma grade
+    com tantas colunas quanto couberem na largura.
+    """
+    def __init__(self, master, row_height=32, **kwargs):
+        super().__init__(master, **kwargs)
+        self.row_height = row_height
+        self.cell_width = None
+        self.columns = 1
+        self.font = None
+        self.rows = []
+        self.first = 0
+        self.generation = 0
+        self._slots = []
+        self._click_generation = -1
+        # Chaves das linhas selecionadas (Ctrl/Shift + clique) e a linha âncora do Shift
+        self.selected = set()
+        self.anchor = None
+        self._modified_click = False
+
+        # Callbacks definidos pelo dono da lista; recebem (evento, linha)
+        self.on_click = None
+        self.on_double_click = None
+        self.on_context = None
+        # Callback do comando do botão; recebe apenas a linha
+        self.on_activate = None
+        self.formatter = lambda row: row['text']
+        # Imagem da linha (ou None); na grade, devolva um marcador em vez de None,
+        # pois o CTkButton não remove uma imagem já mostrada
+        self.image_for = None
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+
+        # Área das linhas (não cresce com os filhos) e barra de rolagem
+        self.body = ctk.CTkFrame(self, fg_color="transparent")
+        self.body.grid(row=0, column=0, sticky="nsew")
+        self.body.grid_columnconfigure(0, weight=1)
+        self.body.grid_propagate(False)
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+
+        self.body.bind("<Configure>", self._on_resize)
+        self._bind_wheel(self.body)
+
+    def bind(self, sequence=None, command=None, add=True):
+        # Eventos da área vazia ficam na área das linhas
+        return self.body.bind(sequence, command, add=add)
+
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_mousewheel)
+        widget.bind("<Button-4>", lambda e: self.scroll_by(-3))
+        widget.bind("<Button-5>", lambda e: self.scroll_by(3))
+
+    def _visible_rows(self):
+        return max(1, self.body.winfo_height() // self.row_height)
+
+    def _visible_count(self):
+        return self._visible_rows() * self.columns
+
+    def set_layout(self, row_height, cell_width=None, font=None):
+        """Troca entre lista (cell_width None) e grade; os widgets são recriados"""
+        self.row_height = row_height
+        self.cell_width = cell_width
+        self.font = font
+        for slot in self._slots:
+            slot.destroy()
+        self._slots = []
+        for column in range(1, self.columns):
+            self.body.grid_columnconfigure(column, weight=0, uniform="")
+        self.columns = 1
+        self.first = 0
+        self._on_resize()
+
+    def _on_resize(self, event=None):
+        if self.cell_width:
+            columns = max(1, self.body.winfo_width() // self.cell_width)
+            if columns != self.columns:
+                # Outra quantidade de colunas: as células são redistribuídas do zero
+                for slot in self._slots:
+                    slot.destroy()
+                self._slots = []
+                for column in range(max(columns, self.columns)):
+                    self.body.grid_columnconfigure(column, weight=1 if column < columns else 0,
+                                                   uniform="cells" if column < columns else "")
+                self.columns = columns
+                self.first -= self.first % columns
+        # Cria apenas os widgets necessários para preencher a altura atual
+        needed = (self._visible_rows() + 1) * self.columns
+        while len(self._slots) < needed:
+            self._slots.append(self._create_slot(len(self._slots)))
+        self.refresh()
+
+    def _create_slot(self, index):
+        slot = ctk.CTkButton(
+            self.body,
+            text="",
+            command=lambda s=index: self._activate(s),
+            anchor="w" if self.cell_width is None else "center",
+            compound="left" if self.cell_width is None else "top",
+            height=self.row_height - 4,
+            fg_color="#3A3A3A" if ctk.get_appearance_mode() == "Dark" else "#F0F0F0",
+            hover_color=("#DDD", "#444"))
+        if self.font is not None:
+            slot.configure(font=self.font)
+        slot.grid(row=index // self.columns, column=index % self.columns, sticky="ew", pady=2, padx=5)
+        slot.grid_remove()
+        slot.row_text = None
+        slot.row_image = None
+        slot.row_selected = False
+        slot.base_color = slot.cget("fg_color")
+        slot.bind("<Button-1>", lambda e, s=index: self._on_slot_click(e, s))
+        slot.bind("<Button-3>", lambda e, s=index: self._on_slot_context(e, s))
+        slot.bind("<Double-Button-1>", lambda e, s=index: self._on_slot_double_click(e, s))
+        self._bind_wheel(slot)
+        return slot
+
+    def _row_at(self, slot_index):
+        index = self.first + slot_index
+        if 0 <= index < len(self.rows):
+            return self.rows[index]
+        return None
+
+    def _dispatch(self, callback, event, slot_index):
+        row = self._row_at(slot_index)
+        if callback and row is not None:
+            callback(event, row)
+
+    def _on_slot_click(self, event, slot_index):
+        self._click_generation = self.generation
+        # Shift (0x1) estende a seleção a partir da âncora; Ctrl (0x4) alterna a linha
+        self._modified_click = bool(event.state & 0x5)
+        index = self.first + slot_index
+        if event.state & 0x1:
+            self.select_range(index)
+        elif event.state & 0x4:
+            self.toggle_selection(index)
+        else:
+            self.select_only(index)
+        self._dispatch(self.on_click, event, slot_index)
+
+    def _on_slot_context(self, event, slot_index):
+        # Clique direito fora da seleção passa a selecionar só a linha clicada
+        row = self._row_at(slot_index)
+        if row is not None and row.get('key') not in self.selected:
+            self.select_only(self.first + slot_index)
+        self._dispatch(self.on_context, event, slot_index)
+
+    def _on_slot_double_click(self, event, slot_index):
+        # Ignora o duplo clique se a lista mudou desde o primeiro clique
+        # (ex.: o primeiro clique navegou para uma pasta e o widget foi reciclado)
+        if self._click_generation != self.generation:
+            return
+        self._dispatch(self.on_double_click, event, slot_index)
+
+    def _activate(self, slot_index):
+        row = self._row_at(slot_index)
+        if self._modified_click:
+            # Ctrl/Shift + clique só mexe na seleção
+            self._modified_click = False
+            return
+        if self.on_activate and row is not None:
+            self.on_activate(row)
+
+    def set_rows(self, rows):
+        """Substitui todas as linhas e volta ao topo (a lista é usada sem cópia)"""
+        self.rows = rows
+        self.generation += 1
+        self.first = 0
+        self.anchor = None
+        if self.selected:
+            # Mantém selecionado só o que continua na lista (ex.: releitura da mesma pasta)
+            self.selected &= {row.get('key') for row in rows}
+        self.refresh()
+
+    def select_only(self, index):
+        row = self.rows[index] if 0 <= index < len(self.rows) else None
+        self.selected = {row['key']} if row is not None and row.get('key') is not None else set()
+        self.anchor = index
+        self.refresh()
+
+    def toggle_selection(self, index):
+        if not 0 <= index < len(self.rows) or self.rows[index].get('key') is None:
+            return
+        self.selected ^= {self.rows[index]['key']}
+        self.anchor = index
+        self.refresh()
+
+    def select_range(self, index):
+        """Seleciona da âncora até index (a âncora não muda)"""
+        if self.anchor is None or not 0 <= self.anchor < len(self.rows):
+            self.select_only(index)
+            return
+        start, end = sorted((self.anchor, min(max(index, 0), len(self.rows) - 1)))
+        self.selected = {row['key'] for row in self.rows[start:end + 1] if row.get('key') is not None}
+        self.refresh()
+
+    def select_all(self):
+        self.selected = {row['key'] for row in self.rows if row.get('key') is not None}
+        self.refresh()
+
+    def clear_selection(self):
+        self.selected = set()
+        self.anchor = None
+        self.refresh()
+
+    def selected_rows(self):
+        """Linhas selecionadas, na ordem da lista"""
+        if not self.selected:
+            return []
+        return [row for row in self.rows if row.get('key') in self.selected]
+
+    def insert_row(self, index, row):
+        """Insere uma linha mantendo as linhas visíveis no lugar"""
+        self.rows.insert(index, row)
+        if index < self.first:
+            self.first += 1
+        self.refresh()
+
+    def remove_row(self, index):
+        """Remove uma linha mantendo as linhas visíveis no lugar"""
+        del self.rows[index]
+        if index < self.first:
+            self.first -= 1
+        self.refresh()
+
+    def append_rows(self, rows):
+        """Adiciona linhas ao final sem mexer na posição de rolagem"""
+        self.rows.extend(rows)
+        self.refresh()
+
+    def clear(self):
+        self.set_rows([])
+
+    def scroll_to(self, index):
+        # Na grade, a primeira linha visível sempre começa na primeira coluna
+        total_rows = -(-len(self.rows) // self.columns)
+        max_first = max(0, total_rows - self._visible_rows()) * self.columns
+        index = min(max(0, int(index)), max_first)
+        self.first = index - index % self.columns
+        self.refresh()
+
+    def scroll_by(self, delta):
+        """Rola delta linhas visuais (na grade, delta fileiras de células)"""
+        self.scroll_to(self.first + delta * self.columns)
+
+    def _on_mousewheel(self, event):
+        # Windows envia múltiplos de 120; macOS envia valores pequenos
+        steps = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        self.scroll_by(-3 * steps)
+
+    def _on_scrollbar(self, *args):
+        if not args:
+            return
+        if args[0] == "moveto":
+            self.scroll_to(round(float(args[1]) * len(self.rows)))
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            if len(args) > 2 and args[2] == "pages":
+                amount *= self._visible_rows()
+            self.scroll_by(amount)
+
+    def refresh(self):
+        """Redesenha apenas as linhas visíveis"""
+        for slot_index, slot in enumerate(self._slots):
+            row = self._row_at(slot_index)
+            if row is None:
+                if slot.row_text is not None:
+                    slot.grid_remove()
+                    slot.row_text = None
+                if slot.row_selected:
+                    slot.configure(fg_color=slot.base_color)
+                    slot.row_selected = False
+                continue
+            text = self.formatter(row)
+            if slot.row_text != text:
+                if slot.row_text is None:
+                    slot.grid()
+                slot.configure(text=text)
+                slot.row_text = text
+            image = self.image_for(row) if self.image_for is not None else None
+            if slot.row_image is not image:
+                slot.configure(image=image)
+                slot.row_image = image
+            selected = row.get('key') is not None and row['key'] in self.selected
+            if slot.row_selected != selected:
+                slot.configure(fg_color=("#A9CCE3", "#1F538D") if selected else slot.base_color)
+                slot.row_selected = selected
+
+        total = len(self.rows)
+        if total:
+            visible = self._visible_count()
+            self.scrollbar.set(self.first / total, min(1.0, (self.first + visible) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+class FolderSizeCache:
+    """Cache persistente (SQLite) de tamanhos de pastas, validado pelo mtime e com descarte LRU
+
+    O total de uma pasta inclui toda a subárvore, mas o mtime de uma pasta só
+    muda com as suas entradas diretas. Por isso um total só é reaproveitado
+    se o mtime de cada subpasta gravada ainda confere, e expira após max_age
+    segundos: arquivos que crescem no lugar não mudam mtime de pasta alguma.
+    """
+    def __init__(self, db_path=None, max_entries=200000, max_age=600):
+        if db_path is None:
+            db_path = CACHE_DIR / "folder_sizes.db"
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        # Versão 2: contagem de subpastas e instante da varredura; totais antigos são descartados
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] < 2:
+            self.conn.execute("DROP TABLE IF EXISTS folder_sizes")
+            self.conn.execute("PRAGMA user_version = 2")
+        # dirs conta a própria pasta e todas as subpastas; verified é quando a
+        # parte mais antiga da subárvore foi lida do disco
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS folder_sizes ("
+            "path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, dirs INTEGER, "
+            "verified REAL, last_used REAL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS folder_sizes_lru ON folder_sizes(last_used)")
+
+    def get(self, path, mtime_ns):
+        """Retorna o tamanho em cache ou None se não existir ou a subárvore mudou"""
+        found = self.lookup(path, mtime_ns)
+        return found[0] if found is not None else None
+
+    def lookup(self, path, mtime_ns):
+        """Retorna (tamanho, pastas, verificado em) se o total ainda vale, ou None"""
+        path = str(path)
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT mtime_ns, size, dirs, verified FROM folder_sizes WHERE path = ?", (path,)).fetchone()
+            if row is None:
+                return None
+            if row[0] != mtime_ns:
+                # A pasta mudou: os totais dos ancestrais também estão desatualizados
+                self._invalidate_locked(path)
+                return None
+            if time.time() - row[3] > self.max_age:
+                return None
+            descendants = self.conn.execute(
+                "SELECT path, mtime_ns FROM folder_sizes WHERE path >= ? AND path < ?",
+                prefix_range(path)).fetchall()
+        # Os stats rodam fora do lock; mudanças em qualquer nível alteram o mtime de alguma subpasta
+        live = 0
+        for child, child_mtime in descendants:
+            try:
+                current = os.stat(child).st_mtime_ns
+            except OSError:
+                # Pasta que já não existe: a pasta-mãe mudou de mtime (e é verificada aqui)
+                # ou o registro sobrou de uma varredura anterior à remoção
+                with self._lock:
+                    self.conn.execute("DELETE FROM folder_sizes WHERE path = ?", (child,))
+                continue
+            if current != child_mtime:
+                self.invalidate(child)
+                return None
+            live += 1
+        if live != row[2] - 1:
+            # Alguma subpasta saiu do cache (LRU) ou foi criada depois: não há como validar
+            return None
+        now = time.time()
+        with self._lock:
+            self.conn.execute("UPDATE folder_sizes SET last_used = ? WHERE path = ?", (now, path))
+            self.conn.execute(
+                "UPDATE folder_sizes SET last_used = ? WHERE path >= ? AND path < ?",
+                (now,) + prefix_range(path))
+        return row[1], row[2], row[3]
+
+    def put_many(self, items):
+        """Grava vários (path, mtime_ns, size, dirs, verified) de uma vez e aplica o limite LRU"""
+        now = time.time()
+        with self._lock:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO folder_sizes VALUES (?, ?, ?, ?, ?, ?)",
+                [(str(path), mtime_ns, size, dirs, verified, now)
+                 for path, mtime_ns, size, dirs, verified in items])
+            self.conn.execute("COMMIT")
+            count = self.conn.execute("SELECT COUNT(*) FROM folder_sizes").fetchone()[0]
+            if count > self.max_entries:
+                # Remove os menos usados, deixando uma folga de 10%
+                excess = count - int(self.max_entries * 0.9)
+                self.conn.execute(
+                    "DELETE FROM folder_sizes WHERE path IN ("
+                    "SELECT path FROM folder_sizes ORDER BY last_used LIMIT ?)", (excess,))
+
+    def _invalidate_locked(self, path):
+        paths = [str(path)] + [str(parent) for parent in Path(path).parents]
+        self.conn.executemany("DELETE FROM folder_sizes WHERE path = ?", [(p,) for p in paths])
+
+    def invalidate(self, path):
+        """Invalida a pasta e todos os seus ancestrais"""
+        with self._lock:
+            self._invalidate_locked(path)
+
+    def invalidate_tree(self, path):
+        """Invalida a pasta, seus ancestrais e tudo abaixo dela"""
+        path = str(path).rstrip(os.sep) or os.sep
+        with self._lock:
+            self._invalidate_locked(path)
+            # A faixa de prefixo cobre todos os descendentes usando o índice
+            self.conn.execute(
+                "DELETE FROM folder_sizes WHERE path >= ? AND path < ?", prefix_range(path))
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+class FolderSizeEngine:
+    """Calcula o tamanho de pastas em segundo plano com um pool de threads"""
+    def __init__(self, max_workers=None, cache=None):
+        if max_workers is None:
+            max_workers = min(8, (os.cpu_count() or 1) + 2)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="geren-size")
+        self.generation = 0
+        self.cache = cache
+
+    def cancel(self):
+        """Descarta todo o trabalho pendente ou em andamento"""
+        self.generation += 1
+
+    def submit(self, paths, callback):
+        """Agenda o cálculo de cada pasta; callback(path, size) roda na thread do worker"""
+        generation = self.generation
+        for path in paths:
+            self.executor.submit(self._run, path, generation, callback)
+
+    def _run(self, path, generation, callback):
+        size = self.folder_size(path, lambda: generation != self.generation)
+        if size is not None:
+            callback(path, size)
+
+    def folder_size(self, folder_path, cancelled=None):
+        """Soma os tamanhos com scandir iterativo; retorna None se for cancelado
+
+        Subpastas com tamanho válido no cache não são percorridas, e os totais
+        de todas as pastas percorridas são gravados no cache ao final.
+        """
+        try:
+            root_mtime = os.stat(folder_path).st_mtime_ns
+        except OSError:
+            return 0
+        if self.cache is not None:
+            cached = self.cache.get(folder_path, root_mtime)
+            if cached is not None:
+                return cached
+
+        started = time.time()
+        # Cada nó é [caminho, mtime_ns, total, índice do pai, percorrido, pastas, verificado em];
+        # os filhos sempre vêm depois do pai na lista
+        nodes = []
+        pending = [(str(folder_path), root_mtime, -1)]
+        while pending:
+            if cancelled is not None and cancelled():
+                return None
+            current, mtime_ns, parent = pending.pop()
+            if parent >= 0 and self.cache is not None:
+                cached = self.cache.lookup(current, mtime_ns)
+                if cached is not None:
+                    size, dirs, verified = cached
+                    nodes.append([current, mtime_ns, size, parent, False, dirs, verified])
+                    continue
+            index = len(nodes)
+            node = [current, mtime_ns, 0, parent, True, 1, started]
+            nodes.append(node)
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        try:
+                            # Links não são seguidos: um link para uma pasta acima causaria um ciclo
+                            if entry.is_file(follow_symlinks=False):
+                                node[2] += entry.stat(follow_symlinks=False).st_size
+                            elif entry.is_dir(follow_symlinks=False):
+                                pending.append((entry.path, entry.stat(follow_symlinks=False).st_mtime_ns, index))
+                        except OSError:
+                            pass
+            except OSError:
+                # Pastas sem permissão são ignoradas, como no cálculo síncrono
+                pass
+
+        # Soma de baixo para cima: percorre a lista de trás para frente. Uma pasta
+        # vale só até a parte mais antiga da sua subárvore expirar
+        for node in reversed(nodes):
+            if node[3] >= 0:
+                parent = nodes[node[3]]
+                parent[2] += node[2]
+                parent[5] += node[5]
+                parent[6] = min(parent[6], node[6])
+        if self.cache is not None:
+            self.cache.put_many([(n[0], n[1], n[2], n[5], n[6]) for n in nodes if n[4]])
+        return nodes[0][2]
+
+    def shutdown(self, wait=False):
+        self.cancel()
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+
+class DiskUsageTree:
+    """Uso de disco de uma pasta inteira, lido numa única varredura e agregado por subpasta
+
+    Cada pasta é um índice em arrays paralelas (nome, pai, bytes, arquivos,
+    pastas, mtime mais recente), então descer para uma subpasta já varrida
+    não lê o disco de novo. São somados dois tamanhos: o aparente (st_size)
+    e o alocado em disco (st_blocks), que difere em arquivos esparsos,
+    compactados ou pequenos. Links para pastas nunca são seguidos, arquivos
+    com vários hardlinks contam uma vez só e, com one_filesystem, a varredura
+    não entra em outros sistemas de arquivos montados dentro da raiz.
+    """
+    METRICS = ('apparent', 'allocated')
+
+    def __init__(self, root, top_files=1000, one_filesystem=False):
+        self.root = str(root)
+        self.max_top_files = top_files
+        self.one_filesystem = one_filesystem
+        self.names = []
+        self.parents = array('i')
+        self.sizes = {metric: array('q') for metric in self.METRICS}
+        self.files = array('q')
+        self.dirs = array('q')
+        self.newest = array('q')
+        self.children = []
+        # Heap mínimo de (tamanho, caminho) com os maiores arquivos, por métrica
+        self.top_files = {metric: [] for metric in self.METRICS}
+        self.scanned_at = None
+
+    @property
+    def bytes(self):
+        return self.sizes['apparent']
+
+    def _add_node(self, name, parent, mtime_ns):
+        index = len(self.names)
+        self.names.append(name)
+        self.parents.append(parent)
+        for sizes in self.sizes.values():
+            sizes.append(0)
+        self.files.append(0)
+        self.dirs.append(0)
+        self.newest.append(mtime_ns)
+        self.children.append([])
+        if parent >= 0:
+            self.children[parent].append(index)
+        return index
+
+    def _push_top(self, metric, size, path):
+        heap = self.top_files[metric]
+        if len(heap) < self.max_top_files:
+            heapq.heappush(heap, (size, path))
+        elif (size, path) > heap[0]:
+            heapq.heapreplace(heap, (size, path))
+
+    def scan(self, cancelled=None, progress=None):
+        """Varre a raiz uma vez; links são contados pelo próprio tamanho, sem seguir o destino"""
+        root_st = os.stat(self.root)
+        self._add_node(self.root, -1, root_st.st_mtime_ns)
+        apparent = self.sizes['apparent']
+        allocated = self.sizes['allocated']
+        # Inodes já contados, só dos arquivos com mais de um hardlink: {dispositivo: {inode}}
+        seen_inodes = {}
+        # Caminhos só existem durante a varredura; a árvore guarda apenas nomes
+        paths = [self.root]
+        pending = [0]
+        files_seen = 0
+        last_report = time.monotonic()
+        while pending:
+            if cancelled is not None and cancelled():
+                raise OperationCancelled()
+            index = pending.pop()
+            current = paths[index]
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        try:
+                            # Links para pastas não são seguidos
+                            if entry.is_dir(follow_symlinks=False):
+                                st = entry.stat(follow_symlinks=False)
+                                if self.one_filesystem:
+                                    if not st.st_ino:
+                                        # No Windows o DirEntry não traz dispositivo nem inode; os.lstat traz
+                                        st = os.lstat(entry.path)
+                                    if st.st_dev != root_st.st_dev:
+                                        continue
+                                child = self._add_node(entry.name, index, st.st_mtime_ns)
+                                paths.append(entry.path)
+                                pending.append(child)
+                                continue
+                            st = entry.stat(follow_symlinks=False)
+                            if not st.st_ino:
+                                # No Windows o DirEntry não traz inode nem número de links; os.lstat traz
+                                st = os.lstat(entry.path)
+                            if st.st_nlink > 1:
+                                inodes = seen_inodes.setdefault(st.st_dev, set())
+                                if st.st_ino in inodes:
+                                    continue
+                                inodes.add(st.st_ino)
+                            # st_blocks não existe no Windows: lá o alocado é o aparente
+                            on_disk = getattr(st, 'st_blocks', None)
+                            on_disk = on_disk * 512 if on_disk is not None else st.st_size
+                            apparent[index] += st.st_size
+                            allocated[index] += on_disk
+                            self.files[index] += 1
+                            files_seen += 1
+                            if st.st_mtime_ns > self.newest[index]:
+                                self.newest[index] = st.st_mtime_ns
+                            self._push_top('apparent', st.st_size, entry.path)
+                            self._push_top('allocated', on_disk, entry.path)
+                        except OSError:
+                            pass
+            except OSError:
+                pass
+            if progress is not None and time.monotonic() - last_report >= 0.25:
+                last_report = time.monotonic()
+                progress(len(self.names), files_seen)
+        # Os filhos sempre têm índice maior que o pai: somar de trás para frente agrega de baixo para cima
+        for index in range(len(self.names) - 1, 0, -1):
+            parent = self.parents[index]
+            apparent[parent] += apparent[index]
+            allocated[parent] += allocated[index]
+            self.files[parent] += self.files[index]
+            self.dirs[parent] += self.dirs[index] + 1
+            if self.newest[index] > self.newest[parent]:
+                self.newest[parent] = self.newest[index]
+        self.scanned_at = time.time()
+
+    def path_of(self, node):
+        parts = []
+        while node > 0:
+            parts.append(self.names[node])
+            node = self.parents[node]
+        return os.path.join(self.root, *reversed(parts))
+
+    def find(self, path):
+        """Índice da pasta com o caminho dado, ou None se estiver fora da raiz"""
+        try:
+            relative = os.path.relpath(str(path), self.root)
+        except ValueError:
+            return None
+        if relative == '.':
+            return 0
+        if relative.startswith('..'):
+            return None
+        node = 0
+        for part in relative.split(os.sep):
+            node = next((child for child in self.children[node] if self.names[child] == part), None)
+            if node is None:
+                return None
+        return node
+
+    def stats(self, node, metric='apparent'):
+        return {'bytes': self.sizes[metric][node], 'files': self.files[node],
+                'dirs': self.dirs[node], 'newest': self.newest[node] / 1e9}
+
+    def sorted_children(self, node, metric='apparent'):
+        """Subpastas diretas, das maiores para as menores"""
+        sizes = self.sizes[metric]
+        return sorted(self.children[node], key=lambda child: sizes[child], reverse=True)
+
+    def largest_dirs(self, node, k=20, metric='apparent'):
+        """As k maiores pastas abaixo do nó, em qualquer profundidade"""
+        descendants = []
+        pending = list(self.children[node])
+        while pending:
+            child = pending.pop()
+            descendants.append(child)
+            pending.extend(self.children[child])
+        sizes = self.sizes[metric]
+        return heapq.nlargest(k, descendants, key=lambda child: sizes[child])
+
+    def largest_files(self, node, k=20, metric='apparent'):
+        """Os k maiores arquivos abaixo do nó (entre os guardados na varredura)"""
+        prefix = self.path_of(node).rstrip(os.sep) + os.sep
+        return heapq.nlargest(k, (item for item in self.top_files[metric] if item[1].startswith(prefix)))
+
+
+class TreeStats:
+    """Estatísticas agregadas de um ou mais itens, coletadas em segundo plano e publicadas aos poucos"""
+    def __init__(self, paths, report_interval=0.2):
+        self.paths = [str(p) for p in paths]
+        self.report_interval = report_interval
+        self.cancelled = threading.Event()
+
+    def start(self, report):
+        """report(snapshot, terminado) roda na thread de trabalho; snapshot é um dict novo a cada chamada"""
+        threading.Thread(target=self._run, args=(report,), daemon=True).start()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def _run(self, report):
+        totals = {'files': 0, 'dirs': 0, 'bytes': 0, 'allocated': 0,
+                  'oldest': None, 'newest': None, 'extensions': {}, 'errors': 0}
+        seen_inodes = {}
+        last_report = time.monotonic()
+        pending = []
+
+        def add_file(st, name):
+            if st.st_nlink > 1:
+                inodes = seen_inodes.setdefault(st.st_dev, set())
+                if st.st_ino in inodes:
+                    return
+                inodes.add(st.st_ino)
+            on_disk = getattr(st, 'st_blocks', None)
+            totals['files'] += 1
+            totals['bytes'] += st.st_size
+            totals['allocated'] += on_disk * 512 if on_disk is not None else st.st_size
+            mtime = st.st_mtime
+            if totals['oldest'] is None or mtime < totals['oldest']:
+                totals['oldest'] = mtime
+            if totals['newest'] is None or mtime > totals['newest']:
+                totals['newest'] = mtime
+            ext = os.path.splitext(name)[1].lower() or "(sem extensão)"
+            count_bytes = totals['extensions'].setdefault(ext, [0, 0])
+            count_bytes[0] += 1
+            count_bytes[1] += st.st_size
+
+        for path in self.paths:
+            try:
+                st = os.lstat(path)
+            except OSError:
+                totals['errors'] += 1
+                continue
+            if stat.S_ISDIR(st.st_mode):
+                pending.append(path)
+            else:
+                add_file(st, os.path.basename(path))
+        while pending:
+            if self.cancelled.is_set():
+                return
+            current = pending.pop()
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        try:
+                            # Links para pastas não são seguidos
+                            if entry.is_dir(follow_symlinks=False):
+                                totals['dirs'] += 1
+                                pending.append(entry.path)
+                            else:
+                                st = entry.stat(follow_symlinks=False)
+                                if not st.st_ino:
+                                    # No Windows o DirEntry não traz inode nem número de links; os.lstat traz
+                                    st = os.lstat(entry.path)
+                                add_file(st, entry.name)
+                        except OSError:
+                            totals['errors'] += 1
+            except OSError:
+                totals['errors'] += 1
+            if time.monotonic() - last_report >= self.report_interval:
+                last_report = time.monotonic()
+                report(self._snapshot(totals), False)
+        if not self.cancelled.is_set():
+            report(self._snapshot(totals), True)
+
+    @staticmethod
+    def _snapshot(totals):
+        snapshot = dict(totals)
+        snapshot['extensions'] = {ext: tuple(values) for ext, values in totals['extensions'].items()}
+        return snapshot
+
+
+class HashCache:
+    """Cache persistente (SQLite) de digests, pela identidade do arquivo (dispositivo, inode, tamanho, mtime)"""
+    def __init__(self, db_path=None, max_entries=500000):
+        if db_path is None:
+            db_path = CACHE_DIR / "hashes.db"
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            "dev INTEGER, ino INTEGER, size INTEGER, mtime_ns INTEGER, algorithm TEXT, digest TEXT, last_used REAL, "
+            "PRIMARY KEY (dev, ino, size, mtime_ns, algorithm))")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS hashes_lru ON hashes(last_used)")
+
+    @staticmethod
+    def key(st):
+        return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def get(self, key, algorithms):
+        """Digests em cache para a identidade dada, só dos algoritmos pedidos"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT algorithm, digest FROM hashes WHERE dev = ? AND ino = ? AND size = ? AND mtime_ns = ?",
+                key).fetchall()
+            if rows:
+                self.conn.execute(
+                    "UPDATE hashes SET last_used = ? WHERE dev = ? AND ino = ? AND size = ? AND mtime_ns = ?",
+                    (time.time(),) + tuple(key))
+        return {algorithm: digest for algorithm, digest in rows if algorithm in algorithms}
+
+    def put(self, key, digests):
+        now = time.time()
+        with self._lock:
+            self.conn.execute("BEGIN")
+            # Outra versão do mesmo arquivo (mesmo inode) não serve mais
+            self.conn.execute(
+                "DELETE FROM hashes WHERE dev = ? AND ino = ? AND (size != ? OR mtime_ns != ?)", key)
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [tuple(key) + (algorithm, digest, now) for algorithm, digest in digests.items()])
+            self.conn.execute("COMMIT")
+            count = self.conn.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+            if count > self.max_entries:
+                # Remove os menos usados, deixando uma folga de 10%
+                excess = count - int(self.max_entries * 0.9)
+                self.conn.execute(
+                    "DELETE FROM hashes WHERE rowid IN ("
+                    "SELECT rowid FROM hashes ORDER BY last_used LIMIT ?)", (excess,))
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+class HashService:
+    """Calcula digests de arquivos em segundo plano, vários algoritmos numa única leitura"""
+    ALGORITHMS = ('md5', 'sha256', 'blake2b')
+
+    def __init__(self, max_workers=2, cache=None, chunk_size=4 * 1024 * 1024):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="geren-hash")
+        self.cache = cache
+        self.chunk_size = chunk_size
+        # Um buffer grande por thread, reaproveitado entre arquivos
+        self._local = threading.local()
+        # Interrompe as leituras em andamento ao fechar o programa
+        self._closed = threading.Event()
+
+    def digests(self, path, algorithms=ALGORITHMS, cancelled=None):
+        """{algoritmo: hex} do arquivo; o que já estiver em cache não é relido"""
+        st = os.stat(path)
+        key = HashCache.key(st)
+        result = self.cache.get(key, algorithms) if self.cache is not None else {}
+        missing = [algorithm for algorithm in algorithms if algorithm not in result]
+        if not missing:
+            return result
+        hashers = [hashlib.new(algorithm) for algorithm in missing]
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            buffer = self._local.buffer = bytearray(self.chunk_size)
+        view = memoryview(buffer)
+        with open(path, 'rb') as f:
+            while True:
+                if self._closed.is_set() or (cancelled is not None and cancelled()):
+                    raise OperationCancelled()
+                count = f.readinto(buffer)
+                if not count:
+                    break
+                chunk = view[:count]
+                for hasher in hashers:
+                    hasher.update(chunk)
+            # Se o arquivo mudou durante a leitura, o resultado não vai para o cache
+            unchanged = HashCache.key(os.fstat(f.fileno())) == key
+        computed = {algorithm: hasher.hexdigest() for algorithm, hasher in zip(missing, hashers)}
+        if self.cache is not None and unchanged:
+            self.cache.put(key, computed)
+        result.update(computed)
+        return result
+
+    def submit(self, paths, callback, algorithms=ALGORITHMS, cancelled=None):
+        """Agenda cada arquivo; callback(path, digests, erro) roda na thread do worker"""
+        for path in paths:
+            self.executor.submit(self._run, path, callback, algorithms, cancelled)
+
+    def _run(self, path, callback, algorithms, cancelled):
+        if cancelled is not None and cancelled():
+            return
+        try:
+            result = self.digests(path, algorithms, cancelled)
+        except OperationCancelled:
+            return
+        except Exception as e:
+            callback(path, None, e)
+            return
+        callback(path, result, None)
+
+    def shutdown(self, wait=False):
+        self._closed.set()
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+
+
+class DuplicateFinder:
+    """Localiza arquivos duplicados lendo o mínimo possível
+
+    Etapas: agrupa por tamanho; nos grupos com colisão soma só o primeiro e o
+    último bloco; e só o que ainda colide é lido por inteiro (pelo
+    HashService, que reaproveita o cache de hashes). Hardlinks para o mesmo
+    inode contam como um único arquivo, pois não ocupam espaço extra.
+    """
+    def __init__(self, hash_service, max_workers=None, block_size=64 * 1024):
+        if max_workers is None:
+            max_workers = min(8, (os.cpu_count() or 1) + 2)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="geren-dupes")
+        self.hash_service = hash_service
+        self.block_size = block_size
+        self.generation = 0
+        self._thread = None
+
+    def cancel(self):
+        self.generation += 1
+
+    def start(self, root, on_progress, on_done):
+        """on_progress(gen, texto) e on_done(gen, grupos, erro) rodam na thread de trabalho"""
+        self.generation += 1
+        generation = self.generation
+        self._thread = threading.Thread(target=self._run, args=(str(root), generation, on_progress, on_done), daemon=True)
+        self._thread.start()
+        return generation
+
+    def _run(self, root, generation, on_progress, on_done):
+        cancelled = lambda: generation != self.generation
+        try:
+            groups = self.find(root, lambda text: on_progress(generation, text), cancelled)
+        except OperationCancelled:
+            return
+        except Exception as e:
+            on_done(generation, None, e)
+            return
+        on_done(generation, groups, None)
+
+    def find(self, root, progress, cancelled):
+        """Lista de grupos {'size', 'files': [[caminho, hardlinks...], ...], 'reclaimable'}, maiores primeiro"""
+        # Etapa 1: tamanho, com um representante por inode; as pastas são lidas em paralelo
+        by_size = {}
+        inodes = {}
+        scanned = 0
+        last_report = time.monotonic()
+        running = {self.executor.submit(self._scan_folder, root)}
+        try:
+            while running:
+                if cancelled():
+                    raise OperationCancelled()
+                finished, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    folders, files = future.result()
+                    running.update(self.executor.submit(self._scan_folder, folder) for folder in folders)
+                    for path, size, identity in files:
+                        if identity in inodes:
+                            inodes[identity].append(path)
+                            continue
+                        inodes[identity] = [path]
+                        by_size.setdefault(size, []).append(identity)
+                        scanned += 1
+                if time.monotonic() - last_report >= 0.25:
+                    last_report = time.monotonic()
+                    progress(f"Etapa 1 de 3: {scanned} arquivos por tamanho...")
+        finally:
+            for future in running:
+                future.cancel()
+        candidates = [(size, identities) for size, identities in by_size.items() if len(identities) > 1]
+
+        # Etapa 2: primeiro e último bloco
+        jobs = [(size, identity) for size, identities in candidates for identity in identities]
+        progress(f"Etapa 2 de 3: {len(jobs)} arquivos com tamanho repetido...")
+        by_partial = {}
+        for (size, identity), partial in zip(jobs, self.executor.map(
+                lambda job: self._partial_hash(inodes[job[1]][0], job[0], cancelled), jobs)):
+            if partial is not None:
+                by_partial.setdefault((size, partial), []).append(identity)
+        candidates = [(key, identities) for key, identities in by_partial.items() if len(identities) > 1]
+
+        # Etapa 3: conteúdo completo, só se os blocos lidos não cobrirem o arquivo
+        jobs = [(key, identity) for key, identities in candidates for identity in identities
+                if key[0] > 2 * self.block_size]
+        progress(f"Etapa 3 de 3: {len(jobs)} arquivos lidos por inteiro...")
+        full = dict(zip([identity for _, identity in jobs], self.executor.map(
+            lambda job: self._full_hash(inodes[job[1]][0], cancelled), jobs)))
+        by_content = {}
+        for (size, partial), identities in candidates:
+            for identity in identities:
+                digest = full.get(identity, partial) if size > 2 * self.block_size else partial
+                if digest is not None:
+                    by_content.setdefault((size, digest), []).append(identity)
+        if cancelled():
+            raise OperationCancelled()
+
+        groups = []
+        for (size, _), identities in by_content.items():
+            if len(identities) > 1:
+                groups.append({
+                    'size': size,
+                    'files': [sorted(inodes[identity]) for identity in identities],
+                    'reclaimable': size * (len(identities) - 1),
+                })
+        groups.sort(key=lambda group: group['reclaimable'], reverse=True)
+        return groups
+
+    @staticmethod
+    def _scan_folder(folder):
+        """(subpastas, [(caminho, tamanho, (dispositivo, inode))]) de uma pasta, sem seguir links"""
+        folders, files = [], []
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            folders.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            st = entry.stat(follow_symlinks=False)
+                            if st.st_size == 0:
+                                continue
+                            if not st.st_ino:
+                                # No Windows o stat do DirEntry vem sem dispositivo e inode
+                                st = os.lstat(entry.path)
+                            files.append((entry.path, st.st_size, (st.st_dev, st.st_ino)))
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return folders, files
+
+    def _partial_hash(self, path, size, cancelled):
+        if cancelled():
+            return None
+        digest = hashlib.blake2b()
+        try:
+            with open(path, 'rb') as f:
+                digest.update(f.read(self.block_size))
+                if size > self.block_size:
+                    f.seek(max(size - self.block_size, self.block_size))
+                    digest.update(f.read(self.block_size))
+        except OSError:
+            return None
+        return digest.hexdigest()
+
+    def _full_hash(self, path, cancelled):
+        try:
+            return self.hash_service.digests(path, ('blake2b',), cancelled)['blake2b']
+        except (OSError, OperationCancelled):
+            return None
+
+    def shutdown(self, wait=False):
+        self.cancel()
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+        if wait and self._thread is not None:
+            self._thread.join()
+
+
+class ThumbnailCache:
+    """Cache persistente (SQLite) de miniaturas endereçadas por (caminho, tamanho, mtime), com limite de bytes e descarte LRU"""
+    def __init__(self, db_path=None, max_bytes=256 * 1024 * 1024):
+        if db_path is None:
+            db_path = CACHE_DIR / "thumbnails.db"
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS thumbnails ("
+            "key TEXT PRIMARY KEY, data BLOB, bytes INTEGER, last_used REAL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS thumbnails_lru ON thumbnails(last_used)")
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM thumbnails").fetchone()[0]
+
+    @staticmethod
+    def key(path, size, mtime, thumbnail_size):
+        # Arquivo alterado (tamanho ou mtime) gera outra chave; a entrada antiga sai pelo LRU
+        identity = f"{path}\0{size}\0{mtime}\0{thumbnail_size[0]}x{thumbnail_size[1]}"
+        return hashlib.sha1(identity.encode('utf-8', 'surrogateescape')).hexdigest()
+
+    def get(self, key):
+        """Bytes da miniatura (b'' se a imagem não pôde ser lida) ou None se não estiver em cache"""
+        with self._lock:
+            row = self.conn.execute("SELECT data FROM thumbnails WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE thumbnails SET last_used = ? WHERE key = ?", (time.time(), key))
+            return bytes(row[0])
+
+    def put(self, key, data):
+        with self._lock:
+            old = self.conn.execute("SELECT bytes FROM thumbnails WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO thumbnails VALUES (?, ?, ?, ?)", (key, data, len(data), time.time()))
+            self.total_bytes += len(data) - (old[0] if old else 0)
+            if self.total_bytes > self.max_bytes:
+                # Remove as menos usadas até sobrar uma folga de 10%
+                excess = self.total_bytes - int(self.max_bytes * 0.9)
+                victims = []
+                for victim, nbytes in self.conn.execute("SELECT key, bytes FROM thumbnails ORDER BY last_used"):
+                    victims.append((victim,))
+                    excess -= nbytes
+                    self.total_bytes -= nbytes
+                    if excess <= 0:
+                        break
+                self.conn.execute("BEGIN")
+                self.conn.executemany("DELETE FROM thumbnails WHERE key = ?", victims)
+                self.conn.execute("COMMIT")
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+class ThumbnailService:
+    """Gera miniaturas num pool de threads; o pedido mais recente (as células visíveis agora) é atendido primeiro"""
+    def __init__(self, cache=None, size=(128, 128), max_workers=None):
+        if max_workers is None:
+            max_workers = min(4, os.cpu_count() or 1)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="geren-thumb")
+        self.cache = cache
+        self.size = size
+        self.generation = 0
+        self._lock = threading.Lock()
+        # (-ordem do pedido, caminho, tamanho, mtime, geração, callback): pilha de prioridade
+        self._pending = []
+        self._counter = 0
+
+    def cancel(self):
+        """Descarta os pedidos ainda não atendidos (ex.: ao sair da pasta)"""
+        with self._lock:
+            self.generation += 1
+            self._pending.clear()
+
+    def request(self, path, size, mtime, callback):
+        """callback(path, imagem PIL ou None) roda na thread do worker"""
+        with self._lock:
+            self._counter += 1
+            heapq.heappush(self._pending, (-self._counter, path, size, mtime, self.generation, callback))
+        self.executor.submit(self._work)
+
+    def _work(self):
+        # Cada tarefa do pool atende o pedido mais prioritário do momento, não o que a criou
+        with self._lock:
+            if not self._pending:
+                return
+            _, path, size, mtime, generation, callback = heapq.heappop(self._pending)
+        if generation != self.generation:
+            return
+        image = self.thumbnail(path, size, mtime)
+        if generation == self.generation:
+            callback(path, image)
+
+    def thumbnail(self, path, size, mtime):
+        key = ThumbnailCache.key(path, size, mtime, self.size)
+        data = self.cache.get(key) if self.cache is not None else None
+        if data is None:
+            data = self._render(path)
+            if self.cache is not None:
+                self.cache.put(key, data)
+        if not data:
+            return None
+        image = Image.open(io.BytesIO(data))
+        image.load()
+        return image
+
+    def _render(self, path):
+        try:
+            with Image.open(path) as image:
+                # JPEG já é decodificado em escala reduzida; os demais são reduzidos depois de lidos
+                image.draft('RGB', self.size)
+                image.thumbnail(self.size)
+                image = ImageOps.exif_transpose(image)
+            out = io.BytesIO()
+            if image.mode in ('RGBA', 'LA', 'P'):
+                image.convert('RGBA').save(out, 'PNG')
+            else:
+                image.convert('RGB').save(out, 'JPEG', quality=85)
+            return out.getvalue()
+        except Exception as e:
+            print(f"Erro ao gerar miniatura de {path}: {e}")
+            # Cacheado vazio para não tentar decodificar de novo a cada visita
+            return b''
+
+    def shutdown(self, wait=False):
+        self.cancel()
+        self.executor.shutdown(wait=wait, cancel_futures=True)
 
 class FileManager(ctk.CTk):
     def __init__(self, initial_path=None):
         super().__init__()
 
-        # Configurações do watchdog
-        self.observer = None
-        self.event_handler = None
+        # Configurações do watchdog: um único observer e um único handler
+        self.watch_service = WatchService()
+        self.event_handler = FileManagerEventHandler(self)
         self.current_watched_path = None
         
         self.title("Gerenciador de Arquivos")
         self.geometry("900x600")
-        # Histórico de navegação
+        # Pasta exibida na listagem atual (None em pesquisas e arquivos compactados)
+        # e suas linhas indexadas pelo caminho, para atualizações incrementais
+        self.current_listing_path = None
+        self._listing_rows = {}
+        
+        # Histórico de navegação, com um snapshot da listagem de cada pasta
         self.history = []
         self.history_index = -1
+        self.listing_snapshots = ListingSnapshotCache()
         
         # Variáveis para o menu de contexto
         self.context_menu = None
@@ -58,6 +3258,79 @@ class FileManager(ctk.CTk):
         
         # Arquivos compactados abertos
         self.open_archives = {}
+        # Árvores de pastas virtuais dos últimos arquivos compactados abertos
+        self._archive_trees = OrderedDict()
+        # Tabelas de membros já lidas, também guardadas em disco entre sessões
+        try:
+            self.archive_index = ArchiveIndexCache(cache_dir=CACHE_DIR / "archives")
+        except OSError as e:
+            print(f"Erro ao abrir o cache de arquivos compactados: {e}")
+            self.archive_index = ArchiveIndexCache()
+        
+        # Tamanhos de pastas calculados em segundo plano, com cache persistente
+        try:
+            self.size_cache = FolderSizeCache()
+        except Exception as e:
+            print(f"Erro ao abrir o cache de tamanhos: {e}")
+            self.size_cache = None
+        self.size_engine = FolderSizeEngine(cache=self.size_cache)
+        
+        # Hashes de arquivos calculados em segundo plano, com cache persistente
+        try:
+            self.hash_cache = HashCache()
+        except Exception as e:
+            print(f"Erro ao abrir o cache de hashes: {e}")
+            self.hash_cache = None
+        self.hash_service = HashService(cache=self.hash_cache)
+        self.duplicate_finder = DuplicateFinder(self.hash_service)
+        
+        # Miniaturas da visualização em grade, geradas em segundo plano e guardadas em disco
+        try:
+            self.thumbnail_cache = ThumbnailCache()
+        except Exception as e:
+            print(f"Erro ao abrir o cache de miniaturas: {e}")
+            self.thumbnail_cache = None
+        self.thumbnail_service = ThumbnailService(cache=self.thumbnail_cache)
+        # 'list', 'grid' ou 'details'
+        self.view_mode = 'list'
+        # Coluna e direção da ordenação das listagens de pastas
+        self.sort_column = 'name'
+        self.sort_descending = False
+        # Ordem em que a listagem exibida está (None se desconhecida)
+        self._listing_sorted_by = None
+        # (caminho, tamanho, mtime) -> CTkImage (ou None se a imagem não pôde ser lida), das mais recentes
+        self._thumbnail_images = OrderedDict()
+        self._thumbnail_requested = set()
+        self._thumbnail_placeholder = None
+        self._thumbnail_refresh_scheduled = False
+        
+        # Última análise de uso de disco; descer nas subpastas dela não relê o disco
+        self.disk_usage_tree = None
+        self.disk_usage_generation = 0
+        # 'apparent' (st_size) ou 'allocated' (blocos em disco)
+        self.disk_usage_metric = 'apparent'
+        self.disk_usage_one_filesystem = False
+        
+        # Pesquisa recursiva em segundo plano (quando não há índice)
+        self.search_engine = ParallelSearch()
+        # Extração de arquivos compactados inteiros
+        self.archive_extractor = ArchiveExtractor()
+        # Acesso direto a membros de tar e pontos de retomada de .tar.gz
+        self.tar_index = TarSeekIndex()
+        # Colagens em segundo plano e a janela que mostra o progresso delas
+        self.file_operations = FileOperationQueue()
+        self.operations_window = None
+        self._search_after_id = None
+        self._last_search_term = ""
+        
+        # Índices de nomes para pesquisa recursiva instantânea
+        try:
+            self.filename_indexes = FilenameIndexManager(self.watch_service)
+        except Exception as e:
+            print(f"Erro ao abrir os índices de pesquisa: {e}")
+            self.filename_indexes = None
+        # Linhas de pastas aguardando o tamanho, indexadas pelo caminho
+        self._size_labels = {}
         
         # Configurar layout
         self.grid_columnconfigure(1, weight=1)
@@ -73,14 +3346,16 @@ class FileManager(ctk.CTk):
             self.navigate_to(Path.home())
         
         # Configurar eventos de teclado
-        self.bind("<Control-c>", lambda e: self.copy_selected_item())
-        self.bind("<Control-x>", lambda e: self.cut_selected_item())
-        self.bind("<Control-v>", lambda e: self.paste_item())
+        # Atalhos da seleção não valem enquanto se digita na barra de endereço ou de pesquisa
+        self.bind("<Control-c>", lambda e: None if self.typing(e) else self.copy_selected_item())
+        self.bind("<Control-x>", lambda e: None if self.typing(e) else self.cut_selected_item())
+        self.bind("<Control-v>", lambda e: None if self.typing(e) else self.paste_item())
+        self.bind("<Control-V>", lambda e: None if self.typing(e) else self.paste_item(verify=True))  # Ctrl+Shift+V
+        self.bind("<Control-a>", lambda e: None if self.typing(e) else self.content_frame.select_all())
+        self.bind("<Delete>", lambda e: None if self.typing(e) else self.move_to_trash(self.selected_paths()))
+        self.bind("<Shift-Delete>", lambda e: None if self.typing(e) else self.delete_items(self.selected_paths()))
         
         self.last_folder_before_archive = None  # Guarda a última pasta antes de abrir um arquivo compactado
-        
-        # Dictionary to store size labels for updating from threads
-        self._size_labels = {}
     
     def get_file_icon(self, path):
         if isinstance(path, str):
@@ -96,30 +3371,15 @@ class FileManager(ctk.CTk):
         return ICONS['default']
     
     def setup_watchdog(self, path):
-        """Configura o watchdog para monitorar o diretório atual"""
-        # Para o observer atual se existir
-        if self.observer is not None:
-            try:
-                if self.observer.is_alive():
-                    self.observer.unschedule_all()
-                    self.observer.stop()
-                    self.observer.join()
-            except:
-                pass
-        
+        """Aponta o watchdog para o diretório atual, sem recriar o observer"""
         # Só monitora se for um diretório real (não arquivo compactado)
         if path.is_dir():
-            try:
+            if path != self.current_watched_path:
                 self.current_watched_path = path
-                self.event_handler = FileManagerEventHandler(self)
-                self.observer = Observer()
-                self.observer.schedule(self.event_handler, str(path), recursive=False)
-                self.observer.start()
-            except Exception as e:
-                print(f"Erro ao configurar observer: {e}")
-                self.observer = None
-        else:
+                self.watch_service.watch('listing', self.event_handler, path)
+        elif self.current_watched_path is not None:
             self.current_watched_path = None
+            self.watch_service.unwatch('listing')
     
     def refresh_current_directory(self):
         """Atualiza a visualização do diretório atual"""
@@ -127,21 +3387,73 @@ class FileManager(ctk.CTk):
         if current_path.exists():
             self.navigate_to(current_path)
     
-    def safe_refresh(self):
-        """Atualização segura que verifica se o caminho ainda existe"""
-        try:
-            current_path = Path(self.address_bar.get())
-            if current_path.exists():
-                self.navigate_to(current_path)
-        except Exception as e:
-            print(f"Erro durante atualização: {e}")
-
-    def reactivate_observer(self):
-        """Reativa o observer após operações críticas"""
-        current_path = Path(self.address_bar.get())
-        if current_path.exists():
-            self.setup_watchdog(current_path)
-        self.safe_refresh()
+    def apply_directory_changes(self, changed):
+        """Aplica na listagem atual só as mudanças vistas pelo watchdog"""
+        listing_path = self.current_listing_path
+        if listing_path is None:
+            # Pesquisa, duplicados ou uso de disco: recarregar descartaria a visualização e
+            # cancelaria a varredura em andamento. Só os snapshots afetados são esquecidos,
+            # para que a pasta seja lida de novo ao voltar a ela
+            for item_path in changed:
+                self.listing_snapshots.discard(os.path.dirname(item_path))
+            return
+        changed = [p for p in changed if os.path.dirname(p) == listing_path]
+        if not changed:
+            return
+        if len(changed) > MAX_INCREMENTAL_CHANGES:
+            # Mudanças demais: uma nova leitura completa sai mais barato
+            self.listing_snapshots.discard(listing_path)
+            self.refresh_current_directory()
+            return
+        
+        new_folders = []
+        for item_path in changed:
+            old_row = self._listing_rows.pop(item_path, None)
+            if old_row is not None:
+                self.content_frame.remove_row(self.listing_index(old_row))
+                self._size_labels.pop(item_path, None)
+            entry = DirectoryModel.entry_for_path(item_path)
+            if entry is None:
+                continue
+            if entry['is_dir']:
+                # Mantém o tamanho anterior visível até o novo cálculo chegar
+                size = old_row.get('size') if old_row is not None and old_row['is_dir'] else None
+                entry['size'] = size
+                self.entry_row(entry, "Calculando..." if size is None else self.convert_size(size))
+                self._size_labels[item_path] = entry
+                new_folders.append(item_path)
+            else:
+                self.entry_row(entry, self.convert_size(entry['size']))
+            self.content_frame.insert_row(self.listing_index(entry, insert=True), entry)
+            self._listing_rows[item_path] = entry
+        
+        self.listing_snapshots.update_signature(listing_path)
+        if new_folders:
+            self.request_folder_sizes(new_folders)
+    
+    def listing_index(self, row, insert=False):
+        """Posição da linha na listagem ordenada pela coluna atual (busca binária; ".." fica sempre no topo)"""
+        rows = self.content_frame.rows
+        column_key = DirectoryModel.SORT_KEYS[self.sort_column]
+        folder_first, key = not row['is_dir'], column_key(row)
+        lo, hi = 1, len(rows)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            other_first, other = not rows[mid]['is_dir'], column_key(rows[mid])
+            if other_first != folder_first:
+                before = other_first < folder_first
+            else:
+                before = other > key if self.sort_descending else other < key
+            if before:
+                lo = mid + 1
+            else:
+                hi = mid
+        if insert:
+            return lo
+        # Nomes iguais sem diferenciar maiúsculas: procura a própria linha
+        while rows[lo] is not row:
+            lo += 1
+        return lo
     
     def create_widgets(self):
         # Barra de navegação superior
@@ -174,6 +3486,7 @@ class FileManager(ctk.CTk):
         self.search_bar = ctk.CTkEntry(nav_frame, placeholder_text="Pesquisar na pasta...")
         self.search_bar.grid(row=0, column=4, sticky="nsew", padx=5, pady=5)
         self.search_bar.bind("<Return>", self.search_in_current_folder)
+        self.search_bar.bind("<KeyRelease>", self.on_search_key)
         
         # Botão de extrair (será mostrado apenas para arquivos compactados)
         self.extract_btn = ctk.CTkButton(
@@ -182,20 +3495,45 @@ class FileManager(ctk.CTk):
         self.extract_btn.grid(row=0, column=5, sticky="e", padx=(0, 5))
         self.extract_btn.grid_remove()  # Escondido inicialmente
         
+        # Modo de visualização da listagem
+        self.view_mode_btn = ctk.CTkSegmentedButton(
+            nav_frame, values=["Lista", "Miniaturas", "Detalhes"], command=self.set_view_mode)
+        self.view_mode_btn.set("Lista")
+        self.view_mode_btn.grid(row=0, column=3, padx=5, pady=5)
+        
         # Frame principal
         main_frame = ctk.CTkFrame(self)
         main_frame.grid(row=1, column=0, columnspan=2, sticky="nsew", padx=5, pady=(0, 5))
         main_frame.grid_columnconfigure(1, weight=1)
-        main_frame.grid_rowconfigure(0, weight=1)
+        main_frame.grid_rowconfigure(1, weight=1)
         
         # Frame de pastas especiais (esquerda)
         self.special_folders_frame = ctk.CTkScrollableFrame(main_frame, width=150, label_text="Favoritos")
-        self.special_folders_frame.grid(row=0, column=0, sticky="nsew", padx=(5, 2), pady=5)
+        self.special_folders_frame.grid(row=0, column=0, rowspan=2, sticky="nsew", padx=(5, 2), pady=5)
+        
+        # Cabeçalho das colunas da visualização em detalhes (clique ordena)
+        self.details_font = ctk.CTkFont(family="Courier New", size=12)
+        self.details_header = ctk.CTkFrame(main_frame, fg_color="transparent")
+        self.details_header.grid(row=0, column=1, sticky="ew", padx=(2, 5), pady=(5, 0))
+        self.sort_buttons = {}
+        for column, label, width in DETAIL_COLUMNS:
+            button = ctk.CTkButton(
+                self.details_header, text=label, anchor="w", font=self.details_font,
+                width=self.details_font.measure("0" * (width + 1)),
+                fg_color="transparent", hover_color=("#DDD", "#444"), text_color=("#000", "#FFF"),
+                command=lambda c=column: self.sort_listing(c))
+            button.pack(side="left", padx=(5 if not self.sort_buttons else 0, 0))
+            self.sort_buttons[column] = (button, label)
+        self.details_header.grid_remove()
+        self.update_sort_header()
         
-        # Frame de conteúdo (direita)
-        self.content_frame = ctk.CTkScrollableFrame(main_frame)
-        self.content_frame.grid(row=0, column=1, sticky="nsew", padx=(2, 5), pady=5)
-        self.content_frame.grid_columnconfigure(0, weight=1)
+        # Frame de conteúdo (direita), com linhas virtualizadas
+        self.content_frame = VirtualListView(main_frame)
+        self.content_frame.grid(row=1, column=1, sticky="nsew", padx=(2, 5), pady=5)
+        self.content_frame.on_click = self.on_row_click
+        self.content_frame.on_double_click = self.on_row_double_click
+        self.content_frame.on_context = self.on_row_context_menu
+        self.content_frame.on_activate = self.on_row_activate
         
         # Configurar eventos de mouse
         self.content_frame.bind("<Button-3>", self.show_context_menu)
@@ -247,8 +3585,9 @@ class FileManager(ctk.CTk):
     def navigate_to(self, path):
         try:
             path = path.resolve()  # Obtém o caminho absoluto
-            # Verifica se é um diretório válido ou arquivo compactado
-            if not path.is_dir() and not self.is_supported_archive(path):
+            # Verifica se é um diretório válido ou (uma pasta dentro de) um arquivo compactado
+            archive = self.split_archive_path(path)
+            if not path.is_dir() and archive is None:
                 messagebox.showerror("Erro", f"{path} não é um diretório válido ou arquivo compactado suportado.")
                 return
             
@@ -265,38 +3604,42 @@ class FileManager(ctk.CTk):
                 
                 self.history.append(str(path))
                 self.history_index += 1
+                self.listing_snapshots.prune(self.history)
             
             # Atualiza a barra de endereço
             self.address_bar.delete(0, tk.END)
             self.address_bar.insert(0, str(path))
             
             # Salva a última pasta antes de abrir um arquivo compactado
-            if self.is_supported_archive(path):
+            if archive is not None:
                 # Só atualiza se não está vindo de outro arquivo compactado
-                if self.last_folder_before_archive is None or not self.is_supported_archive(Path(self.history[self.history_index-1])):
-                    self.last_folder_before_archive = path.parent
+                if self.last_folder_before_archive is None or self.split_archive_path(Path(self.history[self.history_index-1])) is None:
+                    self.last_folder_before_archive = archive[0].parent
             else:
                 self.last_folder_before_archive = None
             
             # Mostra ou esconde o botão de extrair
-            if self.is_supported_archive(path):
+            if archive is not None:
                 self.extract_btn.grid()
             else:
-                self.extract_btn.grid_remove()
-            
-            # Limpa o frame de conteúdo e reseta o scroll
-            for widget in self.content_frame.winfo_children():
-                widget.destroy()
-            
-            # Força a atualização do frame de conteúdo
-            self.content_frame.update_idletasks()
+                self.extract_btn.grid_remove()
             
-            # Reseta a posição do scroll
-            self.content_frame._parent_canvas.yview_moveto(0)
+            # Limpa o frame de conteúdo (set_rows também reseta o scroll)
+            # e descarta os cálculos de tamanho da pasta anterior
+            self.size_engine.cancel()
+            self.search_engine.cancel()
+            self.duplicate_finder.cancel()
+            self.thumbnail_service.cancel()
+            self._thumbnail_requested.clear()
+            self.disk_usage_generation += 1
+            self._size_labels.clear()
+            self.current_listing_path = None
+            self._listing_rows = {}
+            self.content_frame.clear()
             
             # Verifica se é um arquivo compactado
-            if self.is_supported_archive(path):
-                self.show_archive_contents(path)
+            if archive is not None:
+                self.show_archive_contents(*archive)
             else:
                 # Navegação normal para pastas
                 self.show_folder_contents(path)
@@ -315,205 +3658,407 @@ class FileManager(ctk.CTk):
     def is_supported_archive(self, path):
         if not path.is_file():
             return False
-        return path.suffix.lower() in FILE_TYPES['archive']
+        return archive_format(path) is not None
+    
+    def split_archive_path(self, path):
+        """Separa '.../arquivo.zip/sub/pasta' em (arquivo.zip, 'sub/pasta'); None se não estiver num arquivo compactado"""
+        path = Path(path)
+        for candidate in (path, *path.parents):
+            if candidate.exists():
+                if self.is_supported_archive(candidate):
+                    inner = path.relative_to(candidate).as_posix()
+                    return candidate, '' if inner == '.' else inner
+                return None
+        return None
     
+    def parent_row(self, path):
+        """Linha ".." para navegar para a pasta pai (sempre presente)"""
+        return {'key': '..', 'path': str(path.parent), 'is_dir': True,
+                'text': f"{ICONS['folder']} .. [ Pasta ]"}
+
+    def entry_text(self, entry, size_str=None, truncate=True):
+        item_name = entry['name']
+        if entry['is_dir']:
+            # Truncate long folder names
+            display_name = item_name if not truncate or len(item_name) <= 40 else item_name[:37] + '...'
+            text = f"{ICONS['folder']} {display_name} [ Pasta ]"
+        else:
+            # Truncate long file names
+            display_name = item_name if not truncate or len(item_name) <= 30 else item_name[:27] + '...'
+            text = f"{ICONS[entry['kind']]} {display_name} [ Arquivo ]"
+        if size_str is not None:
+            text += f" [{size_str}]"
+        return text
+
+    def entry_row(self, entry, size_str=None, truncate=True):
+        """Usa a própria entrada do DirectoryModel como linha da listagem"""
+        entry['key'] = entry['path']
+        entry['text'] = self.entry_text(entry, size_str, truncate)
+        return entry
+
+    def archive_member_row(self, archive_path, node, truncate=True):
+        """Linha de um nó da ArchiveTree; pastas levam o tamanho descompactado somado"""
+        name = node['name']
+        if node['is_dir']:
+            icon = ICONS['folder']
+        else:
+            icon = ICONS[EXTENSION_KINDS.get(os.path.splitext(name)[1].lower(), 'default')]
+        # Truncate long archive member names
+        display_name = name if not truncate or len(name) <= 40 else name[:37] + '...'
+        row = {
+            'key': node['path'],
+            'text': f"{icon} {display_name} [ {'Pasta' if node['is_dir'] else 'Arquivo'} ] [{self.convert_size(node['size'])}]",
+            'member_info': {
+                'archive_path': str(archive_path),
+                'member_path': node['member_path'],
+                'is_dir': node['is_dir'],
+                'size': node['size'],
+                'offset': node.get('offset')
+            }
+        }
+        if node['is_dir']:
+            # Pastas internas navegam com um clique, como pastas comuns
+            row['is_dir'] = True
+            row['path'] = str(Path(archive_path) / node['path'])
+        return row
+
+    def set_view_mode(self, label):
+        """Alterna a listagem entre lista, grade de miniaturas e detalhes sem reler a pasta"""
+        mode = {"Lista": 'list', "Miniaturas": 'grid', "Detalhes": 'details'}[label]
+        if mode == self.view_mode:
+            return
+        self.view_mode = mode
+        if mode == 'details':
+            self.details_header.grid()
+        else:
+            self.details_header.grid_remove()
+        if mode == 'grid':
+            self.content_frame.formatter = self.grid_text
+            self.content_frame.image_for = self.thumbnail_for if Image is not None else None
+            self.content_frame.set_layout(row_height=172, cell_width=150)
+        elif mode == 'details':
+            self.content_frame.formatter = self.detail_text
+            self.content_frame.image_for = None
+            self.content_frame.set_layout(row_height=28, font=self.details_font)
+        else:
+            self.content_frame.formatter = lambda row: row['text']
+            self.content_frame.image_for = None
+            self.content_frame.set_layout(row_height=32)
+
+    def detail_text(self, row):
+        """Linha em colunas de largura fixa (fonte monoespaçada), formatada só quando visível"""
+        name = row.get('name')
+        if name is None:
+            # Linhas que não vêm do DirectoryModel (arquivos compactados, "..", avisos)
+            return row['text']
+        widths = [width for _, _, width in DETAIL_COLUMNS]
+        if len(name) > widths[0] - 2:
+            name = name[:widths[0] - 5] + '...'
+        name = f"{ICONS[row['kind']]} {name}"
+        if row['size'] is not None:
+            size = self.convert_size(row['size'])
+        else:
+            size = "..." if row['is_dir'] and row['path'] in self._size_labels else ""
+        if row['is_dir']:
+            kind = "Pasta"
+        else:
+            kind = f"Arquivo {row['ext'][1:].upper()}" if row['ext'] else "Arquivo"
+        dates = [datetime.datetime.fromtimestamp(row[field]).strftime('%d/%m/%Y %H:%M') if row[field] else ""
+                 for field in ('mtime', 'ctime')]
+        # O seletor de variação de alguns ícones (ex.: ⚙️) não ocupa espaço na tela
+        cells = [name.ljust(widths[0] + name.count('\ufe0f')), size.rjust(widths[1]),
+                 kind[:widths[2]].ljust(widths[2]), dates[0].ljust(widths[3]), dates[1].ljust(widths[4])]
+        return " ".join(cells)
+
+    def sort_listing(self, column):
+        """Ordena a listagem da pasta pela coluna (de novo na mesma coluna inverte a direção)"""
+        if column == self.sort_column:
+            self.sort_descending = not self.sort_descending
+        else:
+            self.sort_column, self.sort_descending = column, False
+        self.update_sort_header()
+        if self.current_listing_path is None:
+            # Pesquisas e outras visões mantêm a ordem; vale para a próxima listagem de pasta
+            return
+        rows = self.content_frame.rows
+        self.apply_listing_sort(rows)
+        # Mesmos widgets, só com as linhas em outra ordem
+        self.content_frame.set_rows(rows)
+
+    def apply_listing_sort(self, rows, sorted_by=None):
+        """Reordena rows[1:] no lugar (a mesma lista fica no snapshot do histórico)
+
+        sorted_by é a ordem (coluna, decrescente) em que rows já está, se conhecida.
+        """
+        if sorted_by is None:
+            sorted_by = self._listing_sorted_by
+        wanted = (self.sort_column, self.sort_descending)
+        if sorted_by == wanted:
+            pass
+        elif sorted_by == (self.sort_column, not self.sort_descending):
+            # Só a direção mudou: inverter pastas e arquivos em separado é O(n)
+            folders = sum(1 for row in rows[1:] if row['is_dir'])
+            rows[1:folders + 1] = rows[folders:0:-1]
+            rows[folders + 1:] = rows[:folders:-1]
+        else:
+            rows[1:] = DirectoryModel.sort_entries(rows[1:], self.sort_column, self.sort_descending)
+        self._listing_sorted_by = wanted
+
+    def update_sort_header(self):
+        for column, (button, label) in self.sort_buttons.items():
+            marker = (" ▼" if self.sort_descending else " ▲") if column == self.sort_column else ""
+            button.configure(text=label + marker)
+
+    def grid_text(self, row):
+        """Legenda curta da célula da grade"""
+        name = row.get('name')
+        if name is None:
+            # Linhas que não vêm do DirectoryModel (pesquisa, arquivos compactados, "..")
+            return row['text'] if len(row['text']) <= 22 else row['text'][:19] + '...'
+        display_name = name if len(name) <= 18 else name[:15] + '...'
+        return f"{ICONS[row['kind']]} {display_name}"
+
+    def thumbnail_for(self, row):
+        """Miniatura da célula; pede a geração em segundo plano quando ainda não existe"""
+        if self._thumbnail_placeholder is None:
+            blank = Image.new('RGBA', self.thumbnail_service.size, (0, 0, 0, 0))
+            self._thumbnail_placeholder = ctk.CTkImage(light_image=blank, size=blank.size)
+        if row.get('kind') != 'image' or row.get('size') is None:
+            return self._thumbnail_placeholder
+        key = (row['path'], row['size'], row['mtime'])
+        if key in self._thumbnail_images:
+            self._thumbnail_images.move_to_end(key)
+            return self._thumbnail_images[key] or self._thumbnail_placeholder
+        if key not in self._thumbnail_requested:
+            # Só as células visíveis pedem miniaturas; a última pedida é gerada primeiro
+            self._thumbnail_requested.add(key)
+            self.thumbnail_service.request(
+                row['path'], row['size'], row['mtime'],
+                lambda path, image: self.after(0, self.show_thumbnail, key, image))
+        return self._thumbnail_placeholder
+
+    def show_thumbnail(self, key, image):
+        # A PhotoImage precisa ser criada na thread do Tk; a decodificação já foi feita no worker
+        self._thumbnail_images[key] = ctk.CTkImage(light_image=image, size=image.size) if image is not None else None
+        while len(self._thumbnail_images) > 1000:
+            evicted, _ = self._thumbnail_images.popitem(last=False)
+            self._thumbnail_requested.discard(evicted)
+        # Várias miniaturas chegando juntas viram um único redesenho
+        if not self._thumbnail_refresh_scheduled:
+            self._thumbnail_refresh_scheduled = True
+            self.after(30, self.refresh_thumbnails)
+
+    def refresh_thumbnails(self):
+        self._thumbnail_refresh_scheduled = False
+        if self.view_mode == 'grid':
+            self.content_frame.refresh()
+
+    def get_archive_tree(self, archive_path):
+        """ArchiveTree do arquivo, reconstruída só quando a tabela de membros muda (thread do Tkinter)"""
+        members = self.get_archive_members(archive_path)
+        tree = self.build_archive_tree(members, self._archive_trees.get(str(archive_path)))
+        self.remember_archive_tree(archive_path, members, tree)
+        return tree
+
+    @staticmethod
+    def build_archive_tree(members, cached):
+        """Reaproveita a árvore de cached = (membros, árvore) se a tabela for a mesma; pode rodar num worker"""
+        if cached is not None and cached[0] is members:
+            return cached[1]
+        return ArchiveTree(members)
+
+    def remember_archive_tree(self, archive_path, members, tree):
+        # _archive_trees só é alterado na thread do Tkinter
+        self._archive_trees[str(archive_path)] = (members, tree)
+        self._archive_trees.move_to_end(str(archive_path))
+        while len(self._archive_trees) > 4:
+            self._archive_trees.popitem(last=False)
+
     def show_folder_contents(self, path):
-        # Limpa o frame de conteúdo
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
-        # Add ".." to navigate to the parent folder (always present)
-        parent_btn = ctk.CTkButton(
-            self.content_frame,
-            text=f"{ICONS['folder']} .. [ Pasta ]",
-            command=lambda: self.navigate_to(path.parent),
-            anchor="w",
-            fg_color="#3A3A3A" if ctk.get_appearance_mode() == "Dark" else "#F0F0F0",
-            hover_color=("#DDD", "#444"))
-        parent_btn.grid(row=0, column=0, sticky="ew", pady=2, padx=5)
-        parent_btn.bind("<Button-3>", lambda e, p=str(path.parent): self.show_context_menu(e, p))
-        # Lista os itens no diretório
-        row = 1
+        # Reaproveita a listagem do histórico se a pasta não mudou
+        rows = self.listing_snapshots.get(str(path))
+        if rows is not None:
+            for row in rows[1:]:
+                if row['is_dir']:
+                    # Tamanhos são revalidados em segundo plano (o cache torna isso barato)
+                    self._size_labels[row['path']] = row
+            self.current_listing_path = str(path)
+            self._listing_rows = {row['path']: row for row in rows[1:]}
+            # O snapshot pode ter sido ordenado por outra coluna (timsort é linear se já estiver em ordem)
+            self.apply_listing_sort(rows, sorted_by=())
+            self.content_frame.set_rows(rows)
+            self.request_folder_sizes(list(self._size_labels))
+            return
+
+        rows = [self.parent_row(path)]
         try:
-            # Usa scandir para melhor performance
-            with os.scandir(path) as entries:
-                # Primeiro ordena as pastas, depois os arquivos
-                dirs = []
-                files = []
-                for entry in entries:
-                    if entry.is_dir():
-                        dirs.append(entry)
-                    else:
-                        files.append(entry)
-
-                # Ordena as pastas e arquivos por nome
-                dirs.sort(key=lambda x: x.name.lower())
-                files.sort(key=lambda x: x.name.lower())
-
-                # Add folders first
-                for entry in dirs:
-                    item_path = Path(entry.path)
-                    item_name = entry.name
-                    icon = ICONS['folder']
-
-                    # Truncate long folder names
-                    display_name = item_name if len(item_name) <= 40 else item_name[:37] + '...'
-
-                    # Calculate folder size using the existing method
-                    size = self.calculate_folder_size_sync(item_path)
-                    size_str = self.convert_size(size)
-
-                    # Display folders with size information
-                    btn_text = f"{icon} {display_name} [ Pasta ] [{size_str}]"
-
-                    btn = ctk.CTkButton(
-                        self.content_frame,
-                        text=btn_text,
-                        command=lambda p=str(item_path): self.navigate_to(Path(p)),
-                        anchor="w",
-                        fg_color="#3A3A3A" if ctk.get_appearance_mode() == "Dark" else "#F0F0F0",
-                        hover_color=("#DDD", "#444"))
-                    btn.grid(row=row, column=0, sticky="ew", pady=2, padx=5)
-                    btn.bind("<Button-1>", lambda e, p=str(item_path): self.select_item(e, p))
-                    btn.bind("<Button-3>", lambda e, p=str(item_path): self.show_context_menu(e, p))
-                    btn.bind("<Double-Button-1>", lambda e, p=str(item_path): self.on_double_click(e, p))
-                    row += 1
-
-                # Add files after
-                for entry in files:
-                    item_path = Path(entry.path)
-                    item_name = entry.name
-                    icon = self.get_file_icon(item_path)
-
-                    # Truncate long file names
-                    display_name = item_name if len(item_name) <= 30 else item_name[:27] + '...'
-
-                    # Get file size using Windows API
-                    shell = Dispatch("Shell.Application")
-                    file = shell.Namespace(0).ParseName(str(item_path.absolute()))
-                    size = file.Size if file else 0
-                    size_str = self.convert_size(size)
-
-                    btn = ctk.CTkButton(
-                        self.content_frame,
-                        text=f"{icon} {display_name} [ Arquivo ] [{size_str}]",
-                        anchor="w",
-                        fg_color="#3A3A3A" if ctk.get_appearance_mode() == "Dark" else "#F0F0F0",
-                        hover_color=("#DDD", "#444"))
-
-                    btn.grid(row=row, column=0, sticky="ew", pady=2, padx=5)
-                    btn.bind("<Button-1>", lambda e, p=str(item_path): self.select_item(e, p))
-                    btn.bind("<Button-3>", lambda e, p=str(item_path): self.show_context_menu(e, p))
-                    btn.bind("<Double-Button-1>", lambda e, p=str(item_path): self.on_double_click(e, p))
-                    row += 1
+            # Assinatura lida antes da listagem: mudanças durante a leitura invalidam o snapshot
+            signature = ListingSnapshotCache.signature(path)
+            model = DirectoryModel(path)
+            for entry in model.scan():
+                if entry['is_dir']:
+                    # Folder sizes arrive later from the size engine
+                    self._size_labels[entry['path']] = self.entry_row(entry, "Calculando...")
+                    rows.append(entry)
+                else:
+                    rows.append(self.entry_row(entry, self.convert_size(entry['size'])))
+            # scan() entrega em ordem de nome; outra coluna é aplicada sobre os dados já lidos
+            self.apply_listing_sort(rows, sorted_by=('name', False))
+            self.listing_snapshots.put(str(path), signature, rows)
+            self.current_listing_path = str(path)
+            self._listing_rows = {row['path']: row for row in rows[1:]}
         except Exception as e:
             # print(f"Error listing directory {path}: {e}") # Keep for debugging
             pass # Keep the pass for the outer try/except
+        self.content_frame.set_rows(rows)
+        self.request_folder_sizes(list(self._size_labels))
     
-    def show_archive_contents(self, archive_path):
-        # Limpa o frame de conteúdo
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
-        # Adiciona ".." para navegar para a pasta pai
-        parent_btn = ctk.CTkButton(
-            self.content_frame, 
-            text=f"{ICONS['folder']} .. [ Pasta ]", 
-            command=lambda: self.navigate_to(archive_path.parent),
-            anchor="w",
-            fg_color="#3A3A3A" if ctk.get_appearance_mode() == "Dark" else "#F0F0F0",
-            hover_color=("#DDD", "#444"))
-        parent_btn.grid(row=0, column=0, sticky="ew", pady=2, padx=5)
-        parent_btn.bind("<Button-3>", lambda e, p=str(archive_path.parent): self.show_context_menu(e, p))
-        # Mostra indicador de carregamento
-        loading_label = ctk.CTkLabel(self.content_frame, text="Carregando...")
-        loading_label.grid(row=1, column=0, pady=10)
+    def request_folder_sizes(self, paths):
+        """Calcula os tamanhos das pastas em segundo plano e atualiza as linhas"""
+        generation = self.size_engine.generation
+        def on_size(path, size):
+            # Chamado na thread do worker; a atualização roda na thread do Tkinter
+            self.after(0, self.update_folder_size, generation, path, size)
+        self.size_engine.submit(paths, on_size)
+    
+    def update_folder_size(self, generation, path, size):
+        # Ignora resultados de uma pasta que já não está sendo exibida
+        if generation != self.size_engine.generation:
+            return
+        row = self._size_labels.pop(path, None)
+        if row is None:
+            return
+        row['size'] = size
+        row['text'] = self.entry_text(row, self.convert_size(size))
+        self.content_frame.refresh()
+    
+    def show_archive_contents(self, archive_path, inner_path=''):
+        # Adiciona ".." para navegar para a pasta pai e o indicador de carregamento
+        parent_row = self.parent_row(archive_path / inner_path)
+        loading_row = {'key': None, 'text': "Carregando..."}
+        self.content_frame.set_rows([parent_row, loading_row])
+        generation = self.content_frame.generation
+        # O cache de árvores só é lido e alterado aqui, na thread do Tkinter; o worker recebe uma cópia da entrada
+        cached = self._archive_trees.get(str(archive_path))
         def load_members():
             try:
-                archive_members = self.get_archive_members(archive_path)
-                sorted_members = sorted(archive_members, key=lambda x: (not x['is_dir'], x['name'].lower()))
-                def display():
-                    loading_label.destroy()
-                    row = 1
-                    for member in sorted_members:
-                        icon = ICONS['folder'] if member['is_dir'] else self.get_file_icon(Path(member['name']))
-
-                        # Truncate long archive member names
-                        display_name = member['name'] if len(member['name']) <= 40 else member['name'][:37] + '...'
-
-                        btn = ctk.CTkButton(
-                            self.content_frame,
-                            text=f"{icon} {display_name}", # Use icon and truncated name
-                            anchor="w",
-                            fg_color="#3A3A3A" if ctk.get_appearance_mode() == "Dark" else "#F0F0F0",
-                            hover_color=("#DDD", "#444"))
-                        btn.grid(row=row, column=0, sticky="ew", pady=2, padx=5)
-                        btn.member_info = {
-                            'archive_path': str(archive_path),
-                            'member_path': member['path'],
-                            'is_dir': member['is_dir']
-                        }
-                        btn.bind("<Button-1>", lambda e, b=btn: self.select_archive_item(e, b))
-                        btn.bind("<Button-3>", lambda e, b=btn: self.show_archive_context_menu(e, b))
-                        btn.bind("<Double-Button-1>", lambda e, b=btn: self.on_archive_double_click(e, b))
-                        row += 1
-                self.content_frame.after(0, display)
+                members = self.read_archive_members(archive_path)
+            except Exception as e:
+                def show_read_error(message=str(e)):
+                    loading_row['text'] = f"Erro: {message}"
+                    self.content_frame.refresh()
+                    messagebox.showerror("Erro", f"Erro ao ler arquivo compactado: {message}")
+                self.after(0, show_read_error)
+                return
+            try:
+                tree = self.build_archive_tree(members, cached)
+                node = tree.find(inner_path)
+                if node is None:
+                    raise FileNotFoundError(f"pasta '{inner_path}' não encontrada no arquivo")
+                # Só os filhos diretos da pasta são listados
+                rows = [parent_row]
+                for child in ArchiveTree.children(node):
+                    rows.append(self.archive_member_row(archive_path, child))
             except Exception as e:
-                self.content_frame.after(0, lambda: loading_label.configure(text=f"Erro: {str(e)}"))
-        threading.Thread(target=load_members).start()
+                def show_error(message=str(e)):
+                    loading_row['text'] = f"Erro: {message}"
+                    self.content_frame.refresh()
+                self.after(0, show_error)
+                return
+            def display():
+                self.remember_archive_tree(archive_path, members, tree)
+                # Descarta o resultado se o usuário já navegou para outro lugar
+                if self.content_frame.generation == generation:
+                    self.content_frame.set_rows(rows)
+            self.after(0, display)
+        threading.Thread(target=load_members, daemon=True).start()
     
     def get_archive_members(self, archive_path):
-        ext = archive_path.suffix.lower()
+        """Tabela de membros para a thread do Tkinter; erros viram um aviso e a parte já lida"""
         members = []
         try:
-            if ext == '.zip':
-                with zipfile.ZipFile(archive_path, 'r') as zip_ref:
-                    for member in zip_ref.infolist():
-                        is_dir = member.is_dir() or member.filename.endswith('/')
-                        members.append({
-                            'name': Path(member.filename).name,
-                            'path': member.filename,
-                            'is_dir': is_dir
-                        })
-            
-            elif ext == '.rar':
-                with rarfile.RarFile(archive_path, 'r') as rar_ref:
-                    for member in rar_ref.infolist():
-                        is_dir = member.isdir()
-                        members.append({
-                            'name': Path(member.filename).name,
-                            'path': member.filename,
-                            'is_dir': is_dir
-                        })
-            
-            elif ext in ['.tar', '.tar.gz', '.tar.bz2']:
-                mode = 'r'
-                if ext == '.tar.gz':
-                    mode = 'r:gz'
-                elif ext == '.tar.bz2':
-                    mode = 'r:bz2'
-                
-                with tarfile.open(archive_path, mode) as tar_ref:
-                    for member in tar_ref.getmembers():
+            members = self.read_archive_members(archive_path, members)
+        except Exception as e:
+            messagebox.showerror("Erro", f"Erro ao ler arquivo compactado: {str(e)}")
+        return members
+    
+    def read_archive_members(self, archive_path, members=None):
+        """Lê a tabela de membros (ou a reaproveita do cache); levanta a exceção em caso de erro
+
+        Não toca na interface, então pode rodar num worker. Em caso de erro,
+        members (se dado) fica com o que foi lido até ali.
+        """
+        # Reaproveita a tabela de membros se o arquivo não mudou (tamanho e mtime)
+        cached = self.archive_index.get(archive_path)
+        if cached is not None:
+            return cached
+        
+        archive_type = archive_format(archive_path)
+        if members is None:
+            members = []
+        # Assinatura lida antes da leitura: mudanças durante a leitura invalidam o cache
+        signature = ArchiveIndexCache.signature(archive_path)
+        if archive_type == 'zip':
+            with zipfile.ZipFile(archive_path, 'r') as zip_ref:
+                for member in zip_ref.infolist():
+                    is_dir = member.is_dir() or member.filename.endswith('/')
+                    members.append({
+                        'name': Path(member.filename).name,
+                        'path': member.filename,
+                        'is_dir': is_dir,
+                        'size': member.file_size,
+                        'compressed_size': member.compress_size,
+                        'mtime': time.mktime(member.date_time + (0, 0, -1)),
+                        'crc': member.CRC
+                    })
+        
+        elif archive_type == 'rar':
+            with rarfile.RarFile(archive_path, 'r') as rar_ref:
+                for member in rar_ref.infolist():
+                    is_dir = member.isdir()
+                    members.append({
+                        'name': Path(member.filename).name,
+                        'path': member.filename,
+                        'is_dir': is_dir,
+                        'size': member.file_size,
+                        'compressed_size': member.compress_size,
+                        'mtime': (member.mtime.timestamp() if getattr(member, 'mtime', None)
+                                  else time.mktime(member.date_time + (0, 0, -1))),
+                        'crc': member.CRC
+                    })
+        
+        elif archive_type in TAR_MODES:
+            # Uma única passada sequencial grava o deslocamento dos dados de
+            # cada membro (e, para .tar.gz, os pontos de retomada), para que
+            # leituras seguintes vão direto ao membro
+            with self.tar_index.open_stream(archive_path, archive_type) as stream:
+                with tarfile.open(fileobj=stream, mode='r|') as tar_ref:
+                    for member in tar_ref:
                         is_dir = member.isdir()
                         members.append({
                             'name': Path(member.name).name,
                             'path': member.name,
-                            'is_dir': is_dir
+                            'is_dir': is_dir,
+                            'size': member.size,
+                            # O tar é comprimido como um todo, não membro a membro
+                            'compressed_size': None,
+                            'mtime': member.mtime,
+                            'crc': None,
+                            'offset': member.offset_data if member.isfile() and not member.issparse() else None
                         })
         
-        except Exception as e:
-            messagebox.showerror("Erro", f"Erro ao ler arquivo compactado: {str(e)}")
+        self.archive_index.put(archive_path, signature, members)
         return members
     
-    def select_archive_item(self, event, button):
+    def select_archive_item(self, event, member_info):
         # Define o item selecionado
-        self.selected_item = button
+        self.selected_item = member_info
     
-    def show_archive_context_menu(self, event, button):
+    def show_archive_context_menu(self, event, member_info):
         # Destrói o menu de contexto anterior se existir
         if self.context_menu:
             self.context_menu.destroy()
         
-        member_info = button.member_info
         current_path = Path(self.address_bar.get())
         
         # Cria um novo menu de contexto
@@ -522,70 +4067,73 @@ class FileManager(ctk.CTk):
                                   fg="#FFF" if ctk.get_appearance_mode() == "Dark" else "#000")
         
         # Define o item selecionado
-        self.selected_item = button
+        self.selected_item = member_info
         # Itens do menu para arquivos/pastas dentro do arquivo compactado
         self.context_menu.add_command(
             label="Copiar", 
-            command=lambda: self.copy_archive_item(button))
+            command=lambda: self.copy_archive_item(member_info))
         
         if not member_info['is_dir']:
             self.context_menu.add_command(
                 label="Extrair este arquivo", 
-                command=lambda: self.extract_single_file(button))
+                command=lambda: self.extract_single_file(member_info))
         
         # Adiciona opção de propriedades
         self.context_menu.add_separator()
         self.context_menu.add_command(
             label="Propriedades", 
-            command=lambda: self.show_properties(button.member_info['archive_path'], 
+            command=lambda: self.show_properties(member_info['archive_path'], 
                                                is_archive_member=True, 
-                                               member_info=button.member_info))
+                                               member_info=member_info))
         
         # Mostra o menu na posição do clique
         self.context_menu.tk_popup(event.x_root, event.y_root)
     
-    def copy_archive_item(self, button):
-        member_info = button.member_info
-        self.clipboard_clear()
-        # Cria um arquivo temporário com o conteúdo do item do arquivo compactado
-        try:
-            with tempfile.NamedTemporaryFile(delete=False, prefix='temp_', suffix=Path(member_info['path']).suffix) as temp_file:
-                temp_path = Path(temp_file.name)
-                
-                ext = Path(member_info['archive_path']).suffix.lower()
-                
-                if ext == '.zip':
-                    with zipfile.ZipFile(member_info['archive_path'], 'r') as zip_ref:
-                        with zip_ref.open(member_info['member_path']) as member_file:
-                            temp_file.write(member_file.read())
-                
-                elif ext == '.rar':
-                    with rarfile.RarFile(member_info['archive_path'], 'r') as rar_ref:
-                        with rar_ref.open(member_info['member_path']) as member_file:
-                            temp_file.write(member_file.read())
-                
-                elif ext in ['.tar', '.tar.gz', '.tar.bz2']:
-                    mode = 'r'
-                    if ext == '.tar.gz':
-                        mode = 'r:gz'
-                    elif ext == '.tar.bz2':
-                        mode = 'r:bz2'
-                    
-                    with tarfile.open(member_info['archive_path'], mode) as tar_ref:
-                        with tar_ref.extractfile(member_info['member_path']) as member_file:
-                            temp_file.write(member_file.read())
-                
-                # Copia o caminho do arquivo temporário para a área de transferência
-                self.clipboard_append(str(temp_path.absolute()))
-                self.update()
-                
-                # Agenda a exclusão do arquivo temporário após 5 minutos
-                threading.Timer(300, lambda: temp_path.unlink(missing_ok=True)).start()
-        except Exception as e:
-            messagebox.showerror("Erro", f"Não foi possível copiar o item: {str(e)}")
+    def copy_archive_item(self, member_info):
+        # Extrai o item para um arquivo temporário e copia o caminho para a área de transferência
+        fd, temp_name = tempfile.mkstemp(prefix='temp_', suffix=Path(member_info['member_path']).suffix)
+        os.close(fd)
+        temp_path = Path(temp_name)
+        def on_done():
+            self.clipboard_clear()
+            self.clipboard_append(str(temp_path.absolute()))
+            self.update()
+            # Agenda a exclusão do arquivo temporário após 5 minutos
+            threading.Timer(300, lambda: temp_path.unlink(missing_ok=True)).start()
+        def on_error():
+            temp_path.unlink(missing_ok=True)
+        self.extract_member_in_background(member_info, temp_path, on_done, on_error, "Não foi possível copiar o item")
+    
+    def extract_member_in_background(self, member_info, dest_path, on_done, on_error=None, error_message="Não foi possível extrair o arquivo"):
+        """Extrai um membro em blocos numa thread, com janela de progresso e cancelamento"""
+        dialog = ProgressDialog(self, f"Extraindo {Path(member_info['member_path']).name}", member_info.get('size') or 0)
+        last_update = [0.0]
+        def progress(done):
+            # Limita as atualizações da interface a ~10 por segundo
+            now = time.monotonic()
+            if now - last_update[0] >= 0.1:
+                last_update[0] = now
+                self.after(0, lambda: dialog.update_progress(done))
+        def finish(callback, message=None):
+            if dialog.winfo_exists():
+                dialog.destroy()
+            if message:
+                messagebox.showerror("Erro", message)
+            if callback:
+                callback()
+        def worker():
+            try:
+                with open_archive_member(member_info['archive_path'], member_info['member_path'],
+                                         member_info.get('offset'), member_info.get('size'), self.tar_index) as member_file:
+                    stream_to_file(member_file, dest_path, progress, dialog.cancelled.is_set)
+                self.after(0, lambda: finish(on_done))
+            except OperationCancelled:
+                self.after(0, lambda: finish(on_error))
+            except Exception as e:
+                self.after(0, lambda e=e: finish(on_error, f"{error_message}: {str(e)}"))
+        threading.Thread(target=worker, daemon=True).start()
     
-    def extract_single_file(self, button):
-        member_info = button.member_info
+    def extract_single_file(self, member_info):
         dialog = ctk.CTkToplevel(self)
         dialog.title("Extrair Arquivo")
         dialog.geometry("400x250")
@@ -613,31 +4161,13 @@ class FileManager(ctk.CTk):
             try:
                 dest_path = Path(dest_path) / file_name
                 dest_path.parent.mkdir(parents=True, exist_ok=True)
-                ext = Path(member_info['archive_path']).suffix.lower()
-                if ext == '.zip':
-                    with zipfile.ZipFile(member_info['archive_path'], 'r') as zip_ref:
-                        with zip_ref.open(member_info['member_path']) as member_file:
-                            with open(dest_path, 'wb') as f:
-                                f.write(member_file.read())
-                elif ext == '.rar':
-                    with rarfile.RarFile(member_info['archive_path'], 'r') as rar_ref:
-                        with rar_ref.open(member_info['member_path']) as member_file:
-                            with open(dest_path, 'wb') as f:
-                                f.write(member_file.read())
-                elif ext in ['.tar', '.tar.gz', '.tar.bz2']:
-                    mode = 'r'
-                    if ext == '.tar.gz':
-                        mode = 'r:gz'
-                    elif ext == '.tar.bz2':
-                        mode = 'r:bz2'
-                    with tarfile.open(member_info['archive_path'], mode) as tar_ref:
-                        with tar_ref.extractfile(member_info['member_path']) as member_file:
-                            with open(dest_path, 'wb') as f:
-                                f.write(member_file.read())
-                messagebox.showinfo("Sucesso", f"Arquivo extraído para {dest_path}")
-                dialog.destroy()
             except Exception as e:
                 messagebox.showerror("Erro", f"Não foi possível extrair o arquivo: {str(e)}")
+                return
+            dialog.destroy()
+            self.extract_member_in_background(
+                member_info, dest_path,
+                lambda: messagebox.showinfo("Sucesso", f"Arquivo extraído para {dest_path}"))
         btn_frame = ctk.CTkFrame(frame, fg_color="transparent")
         btn_frame.pack(pady=10)
         extract_btn = ctk.CTkButton(
@@ -649,17 +4179,16 @@ class FileManager(ctk.CTk):
         name_entry.bind("<Return>", lambda e: perform_extraction())
         path_entry.bind("<Return>", lambda e: perform_extraction())
     
-    def on_archive_double_click(self, event, button):
-        member_info = button.member_info
+    def on_archive_double_click(self, event, member_info):
         if member_info['is_dir']:
             # Navega para a "pasta" dentro do arquivo compactado
-            new_path = f"{member_info['archive_path']}/{member_info['member_path']}"
-            self.navigate_to(Path(new_path))
+            self.navigate_to(Path(member_info['archive_path']) / member_info['member_path'])
     
     def extract_archive(self):
-        archive_path = Path(self.address_bar.get())
-        if not self.is_supported_archive(archive_path):
+        archive = self.split_archive_path(Path(self.address_bar.get()))
+        if archive is None:
             return
+        archive_path = archive[0]
         dialog = ctk.CTkToplevel(self)
         dialog.title("Extrair Arquivo Compactado")
         dialog.geometry("400x300")
@@ -669,7 +4198,7 @@ class FileManager(ctk.CTk):
         ctk.CTkLabel(frame, text="Nome da pasta (deixe em branco para usar nome do arquivo):").pack(pady=(10, 0))
         name_entry = ctk.CTkEntry(frame)
         name_entry.pack(pady=(0, 10), padx=20, fill="x")
-        name_entry.insert(0, archive_path.stem)
+        name_entry.insert(0, archive_stem(archive_path))
         ctk.CTkLabel(frame, text="Caminho de destino (deixe em branco para pasta atual):").pack(pady=(10, 0))
         path_entry = ctk.CTkEntry(frame)
         path_entry.pack(pady=(0, 20), padx=20, fill="x")
@@ -677,7 +4206,7 @@ class FileManager(ctk.CTk):
             folder_name = name_entry.get().strip()
             dest_path = path_entry.get().strip()
             if not folder_name:
-                folder_name = archive_path.stem
+                folder_name = archive_stem(archive_path)
             if not dest_path:
                 # Usa a última pasta antes de abrir o arquivo compactado, se disponível
                 if self.last_folder_before_archive:
@@ -687,26 +4216,11 @@ class FileManager(ctk.CTk):
             try:
                 full_dest_path = Path(dest_path) / folder_name
                 full_dest_path.mkdir(parents=True, exist_ok=True)
-                ext = archive_path.suffix.lower()
-                if ext == '.zip':
-                    with zipfile.ZipFile(archive_path, 'r') as zip_ref:
-                        zip_ref.extractall(full_dest_path)
-                elif ext == '.rar':
-                    with rarfile.RarFile(archive_path, 'r') as rar_ref:
-                        rar_ref.extractall(full_dest_path)
-                elif ext in ['.tar', '.tar.gz', '.tar.bz2']:
-                    mode = 'r'
-                    if ext == '.tar.gz':
-                        mode = 'r:gz'
-                    elif ext == '.tar.bz2':
-                        mode = 'r:bz2'
-                    with tarfile.open(archive_path, mode) as tar_ref:
-                        tar_ref.extractall(full_dest_path)
-                messagebox.showinfo("Sucesso", f"Arquivo extraído para {full_dest_path}")
-                dialog.destroy()
-                self.navigate_to(full_dest_path)
             except Exception as e:
                 messagebox.showerror("Erro", f"Não foi possível extrair o arquivo: {str(e)}")
+                return
+            dialog.destroy()
+            self.extract_archive_in_background(archive_path, full_dest_path)
         btn_frame = ctk.CTkFrame(frame, fg_color="transparent")
         btn_frame.pack(pady=10)
         extract_btn = ctk.CTkButton(
@@ -718,6 +4232,61 @@ class FileManager(ctk.CTk):
         name_entry.bind("<Return>", lambda e: perform_extraction())
         path_entry.bind("<Return>", lambda e: perform_extraction())
     
+    def archive_total_size(self, archive_path):
+        """Bytes descompactados dos arquivos do pacote, sem descompactar nada (0 se desconhecido)"""
+        try:
+            members = self.archive_index.get(archive_path)
+            if members is not None:
+                return sum(m.get('size') or 0 for m in members if not m['is_dir'])
+            archive_type = archive_format(archive_path)
+            if archive_type == 'zip':
+                with zipfile.ZipFile(archive_path, 'r') as zip_ref:
+                    return sum(info.file_size for info in zip_ref.infolist() if not info.is_dir())
+            if archive_type == 'rar':
+                with rarfile.RarFile(archive_path, 'r') as rar_ref:
+                    return sum(info.file_size for info in rar_ref.infolist() if not info.isdir())
+        except Exception as e:
+            print(f"Erro ao ler o tamanho de {archive_path}: {e}")
+        return 0
+    
+    def extract_archive_in_background(self, archive_path, dest_path):
+        """Extrai o arquivo inteiro com o ArchiveExtractor, mostrando progresso"""
+        progress_dialog = ProgressDialog(self, f"Extraindo {archive_path.name}")
+        last_update = [0.0]
+        def progress(done_bytes, done_files):
+            now = time.monotonic()
+            if now - last_update[0] >= 0.1:
+                last_update[0] = now
+                self.after(0, lambda: progress_dialog.update_progress(done_bytes, f"Extraindo {archive_path.name} — {done_files} arquivos"))
+        def finish(message=None, success=False, skipped=()):
+            if progress_dialog.winfo_exists():
+                progress_dialog.destroy()
+            if message:
+                messagebox.showerror("Erro", message)
+            if success:
+                text = f"Arquivo extraído para {dest_path}"
+                if skipped:
+                    listed = ", ".join(skipped[:5]) + (f" e mais {len(skipped) - 5}" if len(skipped) > 5 else "")
+                    text += f"\n\n{len(skipped)} item(ns) com caminho inseguro foram ignorados: {listed}"
+                messagebox.showinfo("Sucesso", text)
+                self.navigate_to(dest_path)
+        def worker():
+            try:
+                # O total é calculado aqui, fora da interface: vem da tabela de membros em cache
+                # ou, em zip/rar, do diretório central; um tar sem cache fica sem total
+                # (lê-lo só para somar seria descompactar tudo duas vezes)
+                total = self.archive_total_size(archive_path)
+                if total:
+                    self.after(0, progress_dialog.set_total, total)
+                _, _, skipped = self.archive_extractor.extract(
+                    archive_path, dest_path, progress, progress_dialog.cancelled.is_set)
+                self.after(0, lambda: finish(success=True, skipped=skipped))
+            except OperationCancelled:
+                self.after(0, finish)
+            except Exception as e:
+                self.after(0, lambda e=e: finish(f"Não foi possível extrair o arquivo: {str(e)}"))
+        threading.Thread(target=worker, daemon=True).start()
+    
     def on_double_click(self, event, item_path=None):
         if item_path:
             self.open_item(item_path)
@@ -732,84 +4301,272 @@ class FileManager(ctk.CTk):
         except Exception as e:
             messagebox.showerror("Erro de Navegação", f"Não foi possível navegar para {path}: {e}")
     
-    def search_in_current_folder(self, event=None):
+    def on_search_key(self, event=None):
+        """Pesquisa enquanto o usuário digita, cancelando a pesquisa anterior na hora"""
+        search_term = self.search_bar.get().strip().lower()
+        if search_term == self._last_search_term:
+            return
+        self.search_engine.cancel()
+        if self._search_after_id is not None:
+            self.after_cancel(self._search_after_id)
+        self._search_after_id = self.after(400, lambda: self.search_in_current_folder(focus=False))
+    
+    def search_in_current_folder(self, event=None, focus=True):
+        if self._search_after_id is not None:
+            self.after_cancel(self._search_after_id)
+            self._search_after_id = None
         search_term = self.search_bar.get().strip().lower()
         current_path = Path(self.address_bar.get())
+        self._last_search_term = search_term
     
         if not search_term:
             # Se a pesquisa estiver vazia, mostra todos os itens
             self.navigate_to(current_path)
+            return
     
         try:
-            # Limpa o frame de conteúdo
-            for widget in self.content_frame.winfo_children():
-                widget.destroy()
-        
+            # Os tamanhos pendentes da listagem anterior não serão mais exibidos
+            self.size_engine.cancel()
+            self.search_engine.cancel()
+            self.duplicate_finder.cancel()
+            self.thumbnail_service.cancel()
+            self._thumbnail_requested.clear()
+            self.disk_usage_generation += 1
+            self._size_labels.clear()
+            self.current_listing_path = None
+            self._listing_rows = {}
+            rows = []
             # Adiciona ".." para navegar para a pasta pai
             if current_path.parent != current_path:
-                parent_btn = ctk.CTkButton(
-                    self.content_frame, 
-                    text=f"{ICONS['folder']} .. [ Pasta ]", 
-                    command=lambda: self.navigate_to(current_path.parent),
-                    anchor="w",
-                    fg_color="#3A3A3A" if ctk.get_appearance_mode() == "Dark" else "#F0F0F0",
-                    hover_color=("#DDD", "#444"))
-                parent_btn.grid(row=0, column=0, sticky="ew", pady=2, padx=5)
-        
-            row = 1
-            if self.is_supported_archive(current_path):
-                # Pesquisa dentro do arquivo compactado
-                archive_members = self.get_archive_members(current_path)
-                for member in sorted(archive_members, key=lambda x: (not x['is_dir'], x['name'].lower())):
-                    if search_term in member['name'].lower():
-                        icon = ICONS['folder'] if member['is_dir'] else self.get_file_icon(Path(member['name']))
-                        btn = ctk.CTkButton(
-                            self.content_frame, 
-                            text=f"{icon} {member['name']}", 
-                            anchor="w",
-                            fg_color="#3A3A3A" if ctk.get_appearance_mode() == "Dark" else "#F0F0F0",
-                            hover_color=("#DDD", "#444"))
-                        btn.grid(row=row, column=0, sticky="ew", pady=2, padx=5)
-                        btn.member_info = {
-                            'archive_path': str(current_path),
-                            'member_path': member['path'],
-                            'is_dir': member['is_dir']
-                        }
-                        btn.bind("<Button-1>", lambda e, b=btn: self.select_archive_item(e, b))
-                        btn.bind("<Button-3>", lambda e, b=btn: self.show_archive_context_menu(e, b))
-                        btn.bind("<Double-Button-1>", lambda e, b=btn: self.on_archive_double_click(e, b))
-                        row += 1
+                rows.append(self.parent_row(current_path))
+        
+            archive = self.split_archive_path(current_path)
+            if archive is not None:
+                # Pesquisa recursiva dentro da pasta atual do arquivo compactado
+                archive_path, inner_path = archive
+                node = self.get_archive_tree(archive_path).find(inner_path)
+                matches = name_matcher(search_term)
+                found = [child for child in ArchiveTree.walk(node) if matches(child['name'].lower())] if node else []
+                for child in sorted(found, key=lambda n: (not n['is_dir'], n['name'].lower())):
+                    row = self.archive_member_row(archive_path, child, truncate=False)
+                    location = child['path'].rpartition('/')[0]
+                    if location != node['path']:
+                        row['text'] += f"  em {location[len(node['path']):].lstrip('/')}"
+                    rows.append(row)
+                self.content_frame.set_rows(rows)
             else:
-                # Pesquisa em pastas normal
-                for item in sorted(current_path.iterdir(), key=lambda x: (not x.is_dir(), x.name.lower())):
-                    if search_term in item.name.lower():
-                        item_name = item.name
-                        item_path = str(item)
-                        icon = self.get_file_icon(item)
-                        if item.is_dir():
-                            btn = ctk.CTkButton(
-                                self.content_frame, 
-                                text=f"{icon} {item_name} [ Pasta ]", 
-                                command=lambda p=item_path: self.navigate_to(Path(p)),
-                                anchor="w",
-                                fg_color="#3A3A3A" if ctk.get_appearance_mode() == "Dark" else "#F0F0F0",
-                                hover_color=("#DDD", "#444"))
-                        else:
-                            btn = ctk.CTkButton(
-                                self.content_frame, 
-                                text=f"{icon} {item_name} [ Arquivo ]", 
-                                anchor="w",
-                                fg_color="#3A3A3A" if ctk.get_appearance_mode() == "Dark" else "#F0F0F0",
-                                hover_color=("#DDD", "#444"))
-                        btn.grid(row=row, column=0, sticky="ew", pady=2, padx=5)
-                        btn.bind("<Button-1>", lambda e, p=item_path: self.select_item(e, p))
-                        btn.bind("<Button-3>", lambda e, p=item_path: self.show_context_menu(e, p))
-                        btn.bind("<Double-Button-1>", lambda e, p=item_path: self.on_double_click(e, p))
-                        row += 1
+                index = self.filename_indexes.index_for(current_path) if self.filename_indexes else None
+                if index is not None:
+                    # Pesquisa recursiva pelo índice de nomes (aceita glob e '*.ext')
+                    for item_path, name, is_dir in index.search(search_term, scope=str(current_path)):
+                        entry = DirectoryModel.build_entry(name, item_path, is_dir, None)
+                        rows.append(self.search_result_row(entry, current_path))
+                    self.content_frame.set_rows(rows)
+                else:
+                    # Sem índice: pesquisa recursiva em paralelo, com resultados chegando aos poucos
+                    self.start_streaming_search(current_path, search_term, rows)
         except Exception as e:
             messagebox.showerror("Erro", f"Ocorreu um erro durante a pesquisa: {str(e)}")
         # Ensure focus is set to content frame after the search operation, regardless of outcome
-        self.after(10, self.content_frame.focus_set) # Set focus to content frame
+        if focus:
+            self.after(10, self.content_frame.focus_set) # Set focus to content frame
+    
+    def start_streaming_search(self, current_path, search_term, rows):
+        status_row = {'key': None, 'text': "🔎 Pesquisando..."}
+        rows.append(status_row)
+        self.content_frame.set_rows(rows)
+        
+        def on_batch(generation, results):
+            # Chamado na thread do worker; as linhas são criadas na thread do Tkinter
+            self.after(0, self.add_search_results, generation, current_path, results)
+        
+        def on_done(generation, total, complete):
+            self.after(0, self.finish_search, generation, status_row, total, complete)
+        
+        self.search_engine.start(current_path, search_term, on_batch, on_done)
+    
+    def add_search_results(self, generation, current_path, results):
+        if generation != self.search_engine.generation:
+            return
+        rows = []
+        for item_path, name, is_dir in results:
+            entry = DirectoryModel.build_entry(name, item_path, is_dir, None)
+            rows.append(self.search_result_row(entry, current_path))
+        self.content_frame.append_rows(rows)
+    
+    def finish_search(self, generation, status_row, total, complete):
+        if generation != self.search_engine.generation:
+            return
+        status_row['text'] = f"🔎 {total} resultado(s)" if complete else f"🔎 {total} resultado(s) (pesquisa interrompida)"
+        self.content_frame.refresh()
+    
+    def find_duplicates(self, folder_path):
+        """Mostra na listagem os grupos de arquivos duplicados da pasta, com o espaço recuperável"""
+        folder_path = Path(folder_path)
+        self.size_engine.cancel()
+        self.search_engine.cancel()
+        self._size_labels.clear()
+        self.current_listing_path = None
+        self._listing_rows = {}
+        rows = []
+        if folder_path.parent != folder_path:
+            rows.append(self.parent_row(folder_path))
+        status_row = {'key': None, 'text': "🔍 Procurando duplicados..."}
+        rows.append(status_row)
+        self.content_frame.set_rows(rows)
+        
+        def on_progress(generation, text):
+            def show():
+                if generation == self.duplicate_finder.generation:
+                    status_row['text'] = f"🔍 {text}"
+                    self.content_frame.refresh()
+            self.after(0, show)
+        
+        def on_done(generation, groups, error):
+            self.after(0, self.show_duplicates, generation, folder_path, status_row, groups, error)
+        
+        self.duplicate_finder.start(folder_path, on_progress, on_done)
+    
+    def show_duplicates(self, generation, folder_path, status_row, groups, error):
+        if generation != self.duplicate_finder.generation:
+            return
+        if error is not None:
+            status_row['text'] = f"Erro ao procurar duplicados: {error}"
+            self.content_frame.refresh()
+            return
+        total = sum(group['reclaimable'] for group in groups)
+        status_row['text'] = f"🔍 {len(groups)} grupo(s) de duplicados — {self.convert_size(total)} recuperáveis"
+        rows = []
+        for number, group in enumerate(groups, 1):
+            rows.append({'key': None, 'text': (
+                f"── Grupo {number}: {len(group['files'])} cópias de {self.convert_size(group['size'])}"
+                f" — {self.convert_size(group['reclaimable'])} recuperáveis")})
+            for paths in group['files']:
+                entry = DirectoryModel.entry_for_path(paths[0])
+                if entry is None:
+                    continue
+                self.search_result_row(entry, folder_path)
+                if len(paths) > 1:
+                    entry['text'] += f"  (+{len(paths) - 1} hardlink(s))"
+                rows.append(entry)
+        self.content_frame.append_rows(rows)
+        self.content_frame.refresh()
+    
+    def analyze_disk_usage(self, folder_path):
+        """Varre a pasta uma vez em segundo plano e abre a visão de uso de disco"""
+        folder_path = Path(folder_path)
+        self.size_engine.cancel()
+        self.search_engine.cancel()
+        self.duplicate_finder.cancel()
+        self.disk_usage_generation += 1
+        generation = self.disk_usage_generation
+        self._size_labels.clear()
+        self.current_listing_path = None
+        self._listing_rows = {}
+        status_row = {'key': None, 'text': "📊 Analisando uso de disco..."}
+        self.content_frame.set_rows([self.parent_row(folder_path), status_row])
+        tree = DiskUsageTree(folder_path, one_filesystem=self.disk_usage_one_filesystem)
+        
+        def progress(folders, files):
+            def show():
+                if generation == self.disk_usage_generation:
+                    status_row['text'] = f"📊 Analisando uso de disco... {folders} pastas, {files} arquivos"
+                    self.content_frame.refresh()
+            self.after(0, show)
+        
+        def worker():
+            try:
+                tree.scan(lambda: generation != self.disk_usage_generation, progress)
+            except OperationCancelled:
+                return
+            except Exception as e:
+                def show_error(message=str(e)):
+                    if generation == self.disk_usage_generation:
+                        status_row['text'] = f"Erro ao analisar uso de disco: {message}"
+                        self.content_frame.refresh()
+                self.after(0, show_error)
+                return
+            def done():
+                if generation == self.disk_usage_generation:
+                    self.disk_usage_tree = tree
+                    self.show_disk_usage(str(folder_path))
+            self.after(0, done)
+        threading.Thread(target=worker, daemon=True).start()
+    
+    def show_disk_usage(self, path, view='size'):
+        """Mostra uma pasta da última análise: subpastas por tamanho, maiores pastas ou maiores arquivos"""
+        tree = self.disk_usage_tree
+        node = tree.find(path) if tree is not None else None
+        if node is None:
+            self.analyze_disk_usage(path)
+            return
+        self.disk_usage_generation += 1
+        self.address_bar.delete(0, tk.END)
+        self.address_bar.insert(0, path)
+        metric = self.disk_usage_metric
+        sizes = tree.sizes[metric]
+        stats = tree.stats(node, metric)
+        total = stats['bytes'] or 1
+        
+        rows = []
+        if node == 0:
+            # Acima da raiz analisada volta à navegação normal
+            rows.append(self.parent_row(Path(path)))
+        else:
+            rows.append({'key': '..', 'usage_path': tree.path_of(tree.parents[node]),
+                         'text': f"{ICONS['folder']} .. [ Pasta ]"})
+        newest = datetime.datetime.fromtimestamp(stats['newest']).strftime('%d/%m/%Y %H:%M')
+        rows.append({'key': None, 'text': (
+            f"📊 {self.convert_size(stats['bytes'])} — {stats['files']} arquivos, {stats['dirs']} pastas"
+            f" — modificado por último em {newest}")})
+        for label, option in (("Por tamanho", 'size'), ("Maiores pastas", 'dirs'), ("Maiores arquivos", 'files')):
+            marker = "▶" if option == view else "  "
+            rows.append({'key': f"view:{option}", 'usage_path': path, 'usage_view': option, 'text': f"{marker} {label}"})
+        metric_label = "em disco (alocado)" if metric == 'allocated' else "aparente"
+        rows.append({'key': "toggle:metric", 'usage_path': path, 'usage_view': view, 'usage_toggle': 'metric',
+                     'text': f"⚙ Tamanho: {metric_label} (clique para alternar)"})
+        rows.append({'key': "toggle:fs", 'usage_path': path, 'usage_view': view, 'usage_toggle': 'one_filesystem',
+                     'text': (f"⚙ Outros sistemas de arquivos: {'ignorados' if tree.one_filesystem else 'incluídos'}"
+                              " (clique para alternar e reanalisar)")})
+        
+        def bar(nbytes):
+            filled = round(10 * nbytes / total)
+            return "█" * filled + "░" * (10 - filled)
+        
+        if view == 'files':
+            for size, file_path in tree.largest_files(node, metric=metric):
+                rows.append({'key': file_path, 'path': file_path, 'is_dir': False, 'text': (
+                    f"{bar(size)} {self.convert_size(size)}  {os.path.relpath(file_path, path)}")})
+        else:
+            folders = tree.largest_dirs(node, metric=metric) if view == 'dirs' else tree.sorted_children(node, metric)
+            for child in folders:
+                child_path = tree.path_of(child)
+                name = os.path.relpath(child_path, path) if view == 'dirs' else tree.names[child]
+                rows.append({'key': child_path, 'path': child_path, 'is_dir': True, 'usage_path': child_path,
+                             'text': (f"{bar(sizes[child])} {self.convert_size(sizes[child])}"
+                                      f"  {ICONS['folder']} {name}  ({tree.files[child]} arquivos)")})
+            if view == 'size' and tree.files[node] - sum(tree.files[child] for child in tree.children[node]):
+                # Arquivos soltos diretamente nesta pasta
+                own = sizes[node] - sum(sizes[child] for child in tree.children[node])
+                rows.append({'key': None, 'text': f"{bar(own)} {self.convert_size(own)}  (arquivos nesta pasta)"})
+        self.content_frame.set_rows(rows)
+    
+    def toggle_disk_usage_option(self, option, path, view):
+        if option == 'metric':
+            # Os dois tamanhos já foram somados na varredura: só troca a visão
+            self.disk_usage_metric = 'allocated' if self.disk_usage_metric == 'apparent' else 'apparent'
+            self.show_disk_usage(path, view)
+        else:
+            self.disk_usage_one_filesystem = not self.disk_usage_one_filesystem
+            self.analyze_disk_usage(self.disk_usage_tree.root)
+    
+    def search_result_row(self, entry, base_path):
+        """Linha de resultado de pesquisa recursiva, com a subpasta onde o item está"""
+        self.entry_row(entry, truncate=False)
+        parent = os.path.dirname(entry['path'])
+        if parent != str(base_path):
+            entry['text'] += f"  em {os.path.relpath(parent, base_path)}"
+        return entry
     
     def go_back(self):
         if self.history_index > 0:
@@ -826,6 +4583,34 @@ class FileManager(ctk.CTk):
         self.back_btn.configure(state="normal" if self.history_index > 0 else "disabled")
         self.forward_btn.configure(state="normal" if self.history_index + 1 < len(self.history) else "disabled")
     
+    def on_row_click(self, event, row):
+        if 'member_info' in row:
+            self.select_archive_item(event, row['member_info'])
+        elif row.get('path'):
+            self.select_item(event, row['path'])
+    
+    def on_row_double_click(self, event, row):
+        if 'member_info' in row:
+            self.on_archive_double_click(event, row['member_info'])
+        elif row.get('path'):
+            self.on_double_click(event, row['path'])
+    
+    def on_row_context_menu(self, event, row):
+        if 'member_info' in row:
+            self.show_archive_context_menu(event, row['member_info'])
+        elif row.get('path'):
+            self.show_context_menu(event, row['path'])
+    
+    def on_row_activate(self, row):
+        # Na análise de uso de disco, o clique troca a visão sem reler o disco
+        if 'usage_toggle' in row:
+            self.toggle_disk_usage_option(row['usage_toggle'], row['usage_path'], row.get('usage_view', 'size'))
+        elif 'usage_path' in row:
+            self.show_disk_usage(row['usage_path'], row.get('usage_view', 'size'))
+        # Clique simples em uma pasta (ou em "..") navega até ela
+        elif row.get('is_dir') and row.get('path'):
+            self.navigate_to(Path(row['path']))
+    
     def select_item(self, event, item_path):
         # Define o item selecionado
         self.selected_item = item_path
@@ -860,13 +4645,36 @@ class FileManager(ctk.CTk):
         
         self.selected_item = item_path if item_path else None
         current_path = Path(self.address_bar.get())
+        selection = self.selected_paths() if item_path else []
         
         # Cria um novo menu de contexto com o tema do CustomTkinter
         self.context_menu = tk.Menu(self, tearoff=0, 
                                   bg="#333" if ctk.get_appearance_mode() == "Dark" else "#EEE", 
                                   fg="#FFF" if ctk.get_appearance_mode() == "Dark" else "#000")
         
-        if self.selected_item:
+        if len(selection) > 1:
+            # Vários itens: só as operações em lote
+            self.context_menu.add_command(
+                label=f"Copiar {len(selection)} itens", 
+                command=self.copy_selected_item)
+            self.context_menu.add_command(
+                label=f"Recortar {len(selection)} itens", 
+                command=self.cut_selected_item)
+            self.context_menu.add_separator()
+            self.context_menu.add_command(
+                label="Mover para Lixeira", 
+                command=lambda: self.move_to_trash(selection))
+            self.context_menu.add_command(
+                label="Excluir Permanentemente", 
+                command=lambda: self.delete_items(selection))
+            self.context_menu.add_separator()
+            self.context_menu.add_command(
+                label="Calcular Hashes", 
+                command=lambda: self.show_selection_hashes(selection))
+            self.context_menu.add_command(
+                label="Propriedades", 
+                command=lambda: self.show_properties(selection))
+        elif self.selected_item:
             path = Path(self.selected_item)
             
             # Itens do menu para arquivos/pastas selecionados
@@ -911,7 +4719,11 @@ class FileManager(ctk.CTk):
             
             self.context_menu.add_command(
                 label="Mover para Lixeira", 
-                command=lambda: self.move_to_trash(self.selected_item))
+                command=lambda: self.move_to_trash([self.selected_item]))
+            
+            self.context_menu.add_command(
+                label="Excluir Permanentemente", 
+                command=lambda: self.delete_items([self.selected_item]))
             
             self.context_menu.add_separator()
             
@@ -929,7 +4741,36 @@ class FileManager(ctk.CTk):
             label="Novo Arquivo", 
             command=lambda: self.create_new_item(current_path, "file"))
         
-        if self.selected_item:
+        if current_path.is_dir():
+            self.context_menu.add_command(
+                label="Analisar Uso de Disco", 
+                command=lambda: self.analyze_disk_usage(
+                    self.selected_item if self.selected_item and Path(self.selected_item).is_dir() else current_path))
+            self.context_menu.add_command(
+                label="Localizar Duplicados", 
+                command=lambda: self.find_duplicates(
+                    self.selected_item if self.selected_item and Path(self.selected_item).is_dir() else current_path))
+        
+        if self.clipboard["items"] and self.clipboard["operation"]:
+            self.context_menu.add_command(
+                label="Colar", 
+                command=self.paste_item)
+            self.context_menu.add_command(
+                label="Colar com Verificação", 
+                command=lambda: self.paste_item(verify=True))
+        
+        # Índice de pesquisa recursiva da pasta atual
+        if self.filename_indexes is not None and current_path.is_dir():
+            if str(current_path) in self.filename_indexes.indexes:
+                self.context_menu.add_command(
+                    label="Remover Índice de Pesquisa", 
+                    command=lambda: self.filename_indexes.remove_root(current_path))
+            elif self.filename_indexes.index_for(current_path, include_incomplete=True) is None:
+                self.context_menu.add_command(
+                    label="Indexar Pasta para Pesquisa", 
+                    command=lambda: self.filename_indexes.add_root(current_path))
+        
+        if self.selected_item and len(selection) <= 1:
             self.context_menu.add_separator()
             self.context_menu.add_command(
                 label="Copiar Caminho", 
@@ -981,37 +4822,42 @@ class FileManager(ctk.CTk):
         
         if new_name and new_name != path.name:
             try:
-                # Desativa o observer temporariamente
-                if self.observer is not None and self.observer.is_alive():
-                    self.observer.unschedule_all()
-                
                 new_path = parent / new_name
-                path.rename(new_path)
+                # Os eventos do watchdog desta operação são ignorados e a listagem é atualizada aqui
+                with self.watch_service.suppressed([path, new_path]):
+                    path.rename(new_path)
+                self.invalidate_folder_sizes(path)
                 
-                # Reativa o observer após um pequeno delay
-                self.after(1000, self.reactivate_observer)
-                
-                self.navigate_to(parent)  # Atualiza a visualização
+                self.apply_directory_changes({str(path), str(new_path)})  # Atualiza a visualização
             except Exception as e:
                 messagebox.showerror("Erro", f"Não foi possível renomear: {str(e)}")
-                # Reativa o observer em caso de erro
-                self.after(1000, self.reactivate_observer)
     
-    def move_to_trash(self, item_path):
-        try:
-            # Desativa o observer temporariamente
-            if self.observer is not None and self.observer.is_alive():
-                self.observer.unschedule_all()
-            
-            # Usando a shell do Windows para mover para a lixeira
-            shell = Dispatch("Shell.Application")
-            shell.Namespace(0).ParseName(str(Path(item_path).absolute())).InvokeVerb("delete")
-            
-            # Reativa o observer após um pequeno delay
-            self.after(1000, self.reactivate_observer)
-        except Exception as e:
-            messagebox.showerror("Erro", f"Não foi possível mover para a lixeira: {str(e)}")
-            self.reactivate_observer()
+    def move_to_trash(self, item_paths):
+        """Move os itens para a lixeira num único job em segundo plano"""
+        if not item_paths:
+            return
+        question = (f"Mover '{Path(item_paths[0]).name}' para a lixeira?" if len(item_paths) == 1
+                    else f"Mover {len(item_paths)} itens para a lixeira?")
+        if messagebox.askyesno("Mover para Lixeira", question):
+            self.remove_items('trash', item_paths)
+    
+    def delete_items(self, item_paths):
+        """Exclui os itens permanentemente num único job em segundo plano"""
+        if not item_paths:
+            return
+        question = (f"Excluir '{Path(item_paths[0]).name}' permanentemente?" if len(item_paths) == 1
+                    else f"Excluir {len(item_paths)} itens permanentemente?")
+        if messagebox.askyesno("Excluir", question + "\nEsta ação não pode ser desfeita.", icon="warning"):
+            self.remove_items('delete', item_paths)
+    
+    def remove_items(self, operation, item_paths):
+        affected = [Path(item_path) for item_path in item_paths]
+        job = FileOperationJob(operation, [(item_path, None) for item_path in affected])
+        def on_done(job):
+            self.after(0, lambda: self.finish_file_operation(job, affected))
+        # Um só período de supressão do watchdog e uma só atualização ao final, para o lote inteiro
+        self.file_operations.submit(job, on_done, self.watch_service.suppressed(affected))
+        self.show_file_operations().add_job(job)
     
     def create_new_item(self, current_path, item_type):
         dialog = ctk.CTkInputDialog(
@@ -1021,93 +4867,161 @@ class FileManager(ctk.CTk):
         name = dialog.get_input()
         if name:
             try:
-                # Desativa o observer temporariamente
-                if self.observer is not None and self.observer.is_alive():
-                    self.observer.unschedule_all()
-                
                 new_path = current_path / name
-                if item_type == "folder":
-                    new_path.mkdir(exist_ok=False)
-                else:
-                    new_path.touch(exist_ok=False)
+                with self.watch_service.suppressed([new_path]):
+                    if item_type == "folder":
+                        new_path.mkdir(exist_ok=False)
+                    else:
+                        new_path.touch(exist_ok=False)
+                self.invalidate_folder_sizes(new_path)
 
-                # Reativa o observer após um pequeno delay
-                self.after(1000, self.reactivate_observer)
-                self.navigate_to(current_path)  # Atualiza a visualização
+                self.apply_directory_changes({str(new_path)})  # Atualiza a visualização
             except FileExistsError:
                 messagebox.showerror("Erro", f"Já existe um item com o nome '{name}'.")
-                self.reactivate_observer()
             except Exception as e:
                 messagebox.showerror("Erro", f"Não foi possível criar o item: {str(e)}")
-                self.reactivate_observer()
     
     def copy_to_clipboard(self, item_path):
         self.clipboard_clear()
         self.clipboard_append(str(Path(item_path).absolute()))
         self.update()  # Necessário para o clipboard funcionar
     
+    def selected_paths(self):
+        """Caminhos dos itens selecionados na listagem (não inclui '..' nem itens de arquivos compactados)"""
+        paths = [row['path'] for row in self.content_frame.selected_rows()
+                 if row.get('path') and row.get('key') != '..' and 'member_info' not in row and 'usage_toggle' not in row]
+        if not paths and isinstance(self.selected_item, str):
+            paths = [self.selected_item]
+        return paths
+    
+    def typing(self, event):
+        return isinstance(event.widget, tk.Entry)
+    
+    def set_clipboard_items(self, operation):
+        items = self.selected_paths()
+        if items:
+            self.clipboard["items"] = set(items)
+            self.clipboard["operation"] = operation
+            self.clipboard_clear()
+            self.clipboard_append("\n".join(str(Path(item).absolute()) for item in items))
+            self.update()  # Necessário para o clipboard funcionar
+    
     def copy_selected_item(self):
-        if self.selected_item:
-            # Desativa o observer temporariamente
-            if self.observer is not None and self.observer.is_alive():
-                self.observer.unschedule_all()
-            
-            self.clipboard["items"] = {self.selected_item}
-            self.clipboard["operation"] = "copy"
-            self.copy_to_clipboard(self.selected_item)
-            
-            # Reativa o observer após um pequeno delay
-            self.after(1000, self.reactivate_observer)
+        self.set_clipboard_items("copy")
     
     def cut_selected_item(self):
-        if self.selected_item:
-            # Desativa o observer temporariamente
-            if self.observer is not None and self.observer.is_alive():
-                self.observer.unschedule_all()
-            
-            self.clipboard["items"] = {self.selected_item}
-            self.clipboard["operation"] = "move"
-            self.copy_to_clipboard(self.selected_item)
-            
-            # Reativa o observer após um pequeno delay
-            self.after(1000, self.reactivate_observer)
+        self.set_clipboard_items("move")
     
-    def paste_item(self):
+    def paste_item(self, verify=False):
         if not self.clipboard["items"] or not self.clipboard["operation"]:
             return
         
+        operation = self.clipboard["operation"]
         current_path = Path(self.address_bar.get())
-        try:
-            # Desativa o observer temporariamente
-            if self.observer is not None and self.observer.is_alive():
-                self.observer.unschedule_all()
-            
-            for item_path in self.clipboard["items"]:
-                source = Path(item_path)
-                destination = current_path / source.name
-                
-                if self.clipboard["operation"] == "copy":
-                    if source.is_dir():
-                        shutil.copytree(source, destination)
-                    else:
-                        shutil.copy2(source, destination)
-                else:  # move
-                    shutil.move(source, destination)
-            
-            # Se foi uma operação de mover, limpa a área de transferência
-            if self.clipboard["operation"] == "move":
-                self.clipboard["items"].clear()
-                self.clipboard["operation"] = None
-            
-            # Reativa o observer após um pequeno delay
-            self.after(1000, self.reactivate_observer)
-            
-            # Atualiza a visualização
-            self.navigate_to(current_path)
-        except Exception as e:
-            messagebox.showerror("Erro", f"Não foi possível {self.clipboard['operation']} o item: {str(e)}")
-            # Reativa o observer em caso de erro
-            self.after(1000, self.reactivate_observer)
+        sources = [Path(item_path) for item_path in self.clipboard["items"]]
+        for source in sources:
+            if source.is_dir() and (current_path == source or source in current_path.parents):
+                messagebox.showerror("Erro", f"Não é possível colar '{source.name}' dentro dela mesma.")
+                return
+        
+        # Colar na própria pasta de origem: cópia ganha outro nome, movimentação não faz nada
+        pairs = []
+        conflicts = []
+        for source in sources:
+            destination = current_path / source.name
+            if destination == source:
+                if operation == 'move':
+                    continue
+                pairs.append((source, self.unique_destination(destination)))
+            else:
+                pairs.append((source, destination))
+                if destination.exists() or destination.is_symlink():
+                    conflicts.append(destination.name)
+        if not pairs:
+            return
+        
+        policy = 'overwrite'
+        if conflicts:
+            policy = self.ask_conflict_policy(conflicts)
+            if policy is None:
+                return
+            if policy == 'rename':
+                pairs = [(source, destination if destination.name not in conflicts else self.unique_destination(destination))
+                         for source, destination in pairs]
+                policy = 'overwrite'
+        
+        job = FileOperationJob(operation, pairs, policy, verify=verify)
+        affected = [destination for _, destination in pairs]
+        if job.manifest_path is not None:
+            affected += [job.manifest_path, job.manifest_path.with_name(job.manifest_path.name + '.part')]
+        if operation == 'move':
+            affected += [source for source, _ in pairs]
+            # Os itens recortados já estão a caminho; não podem ser colados de novo
+            self.clipboard["items"] = set()
+            self.clipboard["operation"] = None
+        
+        def on_done(job):
+            self.after(0, lambda: self.finish_file_operation(job, affected))
+        # Os eventos do watchdog do job são ignorados, inclusive os dos '<destino>.part' das
+        # cópias grandes; a listagem é atualizada ao final
+        partials = [destination.with_name(destination.name + '.part') for _, destination in pairs]
+        self.file_operations.submit(job, on_done, self.watch_service.suppressed(affected + partials))
+        self.show_file_operations().add_job(job)
+    
+    def unique_destination(self, destination):
+        """'nome (2).ext', 'nome (3).ext'... o primeiro que ainda não existe"""
+        counter = 2
+        while True:
+            candidate = destination.with_name(f"{destination.stem} ({counter}){destination.suffix}")
+            if not candidate.exists() and not candidate.is_symlink():
+                return candidate
+            counter += 1
+    
+    def ask_conflict_policy(self, names):
+        """Pergunta o que fazer com itens que já existem no destino; None se cancelado"""
+        dialog = ctk.CTkToplevel(self)
+        dialog.title("Itens já existem")
+        dialog.geometry("420x200")
+        dialog.attributes('-topmost', True)
+        dialog.transient(self)
+        choice = {'policy': None}
+        listed = ", ".join(names[:3]) + (f" e mais {len(names) - 3}" if len(names) > 3 else "")
+        ctk.CTkLabel(dialog, text=f"Já existe no destino: {listed}", wraplength=380).pack(pady=(20, 10), padx=20)
+        btn_frame = ctk.CTkFrame(dialog, fg_color="transparent")
+        btn_frame.pack(pady=10)
+        def choose(policy):
+            choice['policy'] = policy
+            dialog.destroy()
+        for text, policy in (("Substituir", 'overwrite'), ("Manter ambos", 'rename'), ("Pular", 'skip')):
+            ctk.CTkButton(btn_frame, text=text, width=100, command=lambda p=policy: choose(p)).pack(side="left", padx=5)
+        ctk.CTkButton(dialog, text="Cancelar", width=100, command=dialog.destroy).pack(pady=(0, 10))
+        dialog.grab_set()
+        self.wait_window(dialog)
+        return choice['policy']
+    
+    def show_file_operations(self):
+        if self.operations_window is None or not self.operations_window.winfo_exists():
+            self.operations_window = FileOperationsWindow(self)
+        return self.operations_window
+    
+    def finish_file_operation(self, job, affected):
+        for item_path in affected:
+            self.invalidate_folder_sizes(item_path)
+        # Atualiza a visualização, inclusive após uma colagem parcial ou cancelada
+        self.apply_directory_changes({str(p) for p in affected})
+        if job.state == 'failed':
+            verb = {'copy': "copiar", 'move': "mover", 'delete': "excluir",
+                    'trash': "mover para a lixeira"}[job.operation]
+            messagebox.showerror("Erro", f"Não foi possível {verb} o item: {str(job.error)}")
+        elif job.state == 'done' and job.manifest_path is not None:
+            messagebox.showinfo("Verificação", f"{len(job.manifest)} arquivos copiados e verificados.\nManifesto: {job.manifest_path}")
+        elif job.state == 'done' and job.verify:
+            messagebox.showinfo("Verificação", "Os itens foram movidos por renomeação na mesma unidade; nenhum dado foi copiado, então não há o que verificar.")
+    
+    def invalidate_folder_sizes(self, item_path):
+        """Invalida os tamanhos em cache afetados por uma operação feita pelo próprio programa"""
+        if self.size_cache is not None:
+            self.size_cache.invalidate_tree(item_path)
     
     def convert_size(self, size_bytes):
         if size_bytes == 0:
@@ -1119,30 +5033,17 @@ class FileManager(ctk.CTk):
              i = len(units) - 1
         return f"{size_bytes / (1024 ** i):.2f} {units[i]}"
     
-    def calculate_file_hashes(self, file_path):
-        """Calculates SHA256 and MD5 hashes of a file."""
-        sha256_hash = hashlib.sha256()
-        md5_hash = hashlib.md5()
-        try:
-            with open(file_path, "rb") as f:
-                # Read and update hash string value in blocks of 4K
-                for byte_block in iter(lambda: f.read(4096),b""):
-                    sha256_hash.update(byte_block)
-                    md5_hash.update(byte_block)
-            return sha256_hash.hexdigest(), md5_hash.hexdigest()
-        except Exception as e:
-            # print(f"Error calculating hashes for {file_path}: {e}") # Keep for debugging
-            return None, None
-
     def show_properties(self, item_path, is_archive_member=False, member_info=None):
-        """Mostra uma janela com as propriedades do arquivo/pasta"""
-        path = Path(item_path)
+        """Mostra uma janela com as propriedades do arquivo/pasta (ou de vários itens, se item_path for uma lista)"""
+        multiple = isinstance(item_path, (list, tuple, set))
+        paths = [Path(p) for p in item_path] if multiple else [Path(item_path)]
+        path = paths[0]
         dialog = ctk.CTkToplevel(self)
         dialog.title("Propriedades")
         dialog.transient(self)
         dialog.lift()
         dialog.resizable(False, False)
-        dialog.geometry("500x400")
+        dialog.geometry("500x460")
         
         # Frame principal
         frame = ctk.CTkFrame(dialog)
@@ -1152,13 +5053,14 @@ class FileManager(ctk.CTk):
         header_frame = ctk.CTkFrame(frame)
         header_frame.pack(fill="x", padx=10, pady=10)
         
-        icon = self.get_file_icon(path)
-        if is_archive_member:
-            name = Path(member_info['member_path']).name # Get just the name for display
+        if multiple:
+            header = f"{ICONS['default']} {len(paths)} itens selecionados"
+        elif is_archive_member:
+            header = f"{self.get_file_icon(path)} {Path(member_info['member_path']).name}" # Get just the name for display
         else:
-            name = path.name
+            header = f"{self.get_file_icon(path)} {path.name}"
         
-        ctk.CTkLabel(header_frame, text=f"{icon} {name}", font=("Arial", 14, "bold")).pack(anchor="w")
+        ctk.CTkLabel(header_frame, text=header, font=("Arial", 14, "bold")).pack(anchor="w")
         
         # Frame de conteúdo
         content_frame = ctk.CTkFrame(frame)
@@ -1170,136 +5072,209 @@ class FileManager(ctk.CTk):
                            fg="#FFF" if ctk.get_appearance_mode() == "Dark" else "#000")
         info_text.pack(fill="both", expand=True, padx=5, pady=5)
         
-        # Adiciona as informações ao texto
-        # Add full name
-        if is_archive_member:
-            full_name = member_info['member_path']
-        else:
-            full_name = path.name
-        info_text.insert("end", f"Nome: {full_name}\n")
-
-        info_text.insert("end", f"Tipo: {'Pasta' if path.is_dir() and not is_archive_member else 'Arquivo'}\n") # Differentiate type
-
         if is_archive_member:
+            info_text.insert("end", f"Nome: {member_info['member_path']}\n")
+            info_text.insert("end", f"Tipo: {'Pasta' if member_info['is_dir'] else 'Arquivo'}\n")
             info_text.insert("end", f"Localização do arquivo: {member_info['archive_path']}\n")
             info_text.insert("end", f"Caminho dentro do arquivo: {member_info['member_path']}\n")
-        else:
+            # Size is included in member_info from get_archive_members
+            info_text.insert("end", f"Tamanho: {self.convert_size(member_info.get('size') or 0)}\n")
+            info_text.configure(state="disabled")
+            ctk.CTkButton(frame, text="Fechar", command=dialog.destroy).pack(pady=10)
+            return
+        
+        # Um único stat do item; o conteúdo de pastas é somado em segundo plano
+        st = None
+        if not multiple:
+            try:
+                st = path.lstat() if path.is_symlink() else path.stat()
+            except OSError:
+                st = None
+            is_dir = st is not None and stat.S_ISDIR(st.st_mode)
+            info_text.insert("end", f"Nome: {path.name}\n")
+            info_text.insert("end", f"Tipo: {'Pasta' if is_dir else 'Arquivo'}\n") # Differentiate type
             info_text.insert("end", f"Localização: {path.parent}\n")
             info_text.insert("end", f"Caminho completo: {path.absolute()}\n")
+        else:
+            is_dir = True
+            info_text.insert("end", f"Localização: {path.parent}\n")
         
-        # For files or archive members, show size
-        if not path.is_dir() or is_archive_member:
-            try:
-                if is_archive_member:
-                    # Size is included in member_info from get_archive_members
-                    size_bytes = member_info.get('size', 0)
-                else:
-                    size_bytes = path.stat().st_size
-                
-                info_text.insert("end", f"Tamanho: {self.convert_size(size_bytes)}\n")
-            except Exception as e:
-                info_text.insert("end", f"Tamanho: Não disponível\n")
-        elif path.is_dir() and not is_archive_member:
-            # For folders, calculate size and display
-            info_text.insert("end", "Tamanho: Calculando...\n")
-            # Create a temporary tag to identify this size line
-            size_tag = f"size_{id(info_text)}"
-            info_text.tag_add(size_tag, "end-2l", "end-1l") # Tag the "Tamanho: Calculando..." line
-
-            def update_size_text(calculated_size):
-                 size_str = self.convert_size(calculated_size)
-                 # Remove the old line and insert the new one
-                 try:
-                     # Enable text widget to allow update
-                     info_text.configure(state="normal")
-
-                     # Find the start and end of the tagged line
-                     start = info_text.tag_ranges(size_tag)[0]
-                     end = info_text.tag_ranges(size_tag)[1]
-                     info_text.delete(start, end)
-                     info_text.insert(start, f"Tamanho: {size_str}\n")
-                 except Exception as update_e:
-                      # Fallback if tag somehow fails or update causes error
-                      print(f"Error updating size text: {update_e}") # Log error for debugging
-                      try:
-                           # Try to just append if update fails
-                           info_text.insert("end", f"Tamanho: {size_str} (Erro na atualização)\n")
-                      except:
-                           pass # Give up if even appending fails
-                 finally:
-                     # Disable text widget again
-                     info_text.configure(state="disabled")
-
-
-            # Calculate folder size in a separate thread
-            threading.Thread(target=lambda: self.after(0, update_size_text, self.calculate_folder_size_sync(path))).start()
-
-
-        # Add hash information for .exe files - Keep this as requested earlier
-        if path.is_file() and path.suffix.lower() == '.exe' and not is_archive_member:
-            sha256_hash, md5_hash = self.calculate_file_hashes(path)
-            if sha256_hash and md5_hash:
-                info_text.insert("end", f"SHA256: {sha256_hash}\n")
-                info_text.insert("end", f"MD5: {md5_hash}\n")
-        
-        # Data de criação e modificação
-        try:
-            if not is_archive_member:
-                created = datetime.datetime.fromtimestamp(path.stat().st_ctime)
-                modified = datetime.datetime.fromtimestamp(path.stat().st_mtime)
-                
-                info_text.insert("end", f"Criado em: {created.strftime('%d/%m/%Y %H:%M:%S')}\n")
-                info_text.insert("end", f"Modificado em: {modified.strftime('%d/%m/%Y %H:%M:%S')}\n")
-                # For folders, display total items count
-                if path.is_dir() and not is_archive_member:
-                     info_text.insert("end", f"Quantia total de itens: {len(list(path.rglob('*')))}\n")
-
-        except Exception as e:
+        if st is not None and not is_dir:
+            on_disk = getattr(st, 'st_blocks', None)
+            info_text.insert("end", f"Tamanho: {self.convert_size(st.st_size)}\n")
+            if on_disk is not None:
+                info_text.insert("end", f"Tamanho em disco: {self.convert_size(on_disk * 512)}\n")
+        
+        if st is not None:
+            # Data de criação e modificação
+            created = datetime.datetime.fromtimestamp(st.st_ctime)
+            modified = datetime.datetime.fromtimestamp(st.st_mtime)
+            info_text.insert("end", f"Criado em: {created.strftime('%d/%m/%Y %H:%M:%S')}\n")
+            info_text.insert("end", f"Modificado em: {modified.strftime('%d/%m/%Y %H:%M:%S')}\n")
+            # Permissões
+            perms = []
+            perms.append('R' if st.st_mode & 0o400 else '-')
+            perms.append('W' if st.st_mode & 0o200 else '-')
+            perms.append('X' if st.st_mode & 0o100 else '-')
+            info_text.insert("end", f"Permissões: {''.join(perms)}\n")
+        elif not multiple:
             info_text.insert("end", "Datas: Não disponíveis\n")
         
-        # Permissões
-        try:
-            if not is_archive_member:
-                mode = path.stat().st_mode
-                perms = []
-                perms.append('R' if mode & 0o400 else '-')
-                perms.append('W' if mode & 0o200 else '-')
-                perms.append('X' if mode & 0o100 else '-')
-                info_text.insert("end", f"Permissões: {''.join(perms)}\n")
-        except Exception as e:
-            info_text.insert("end", "Permissões: Não disponíveis\n")
+        if is_dir:
+            # Conteúdo de pastas (ou da seleção) chega aos poucos; fechar a janela interrompe a contagem
+            stats_tag = f"stats_{id(info_text)}"
+            info_text.insert("end", "Conteúdo: Calculando...\n", stats_tag)
+            self.show_tree_stats(dialog, info_text, stats_tag, paths)
+        elif st is not None:
+            # Hashes de qualquer arquivo, calculados em segundo plano
+            self.show_file_hashes(dialog, info_text, path)
         
         info_text.configure(state="disabled")
         
         # Botão de fechar
         ctk.CTkButton(frame, text="Fechar", command=dialog.destroy).pack(pady=10)
 
+    def show_tree_stats(self, dialog, info_text, tag, paths):
+        """Preenche o bloco de estatísticas do diálogo conforme o TreeStats publica resultados"""
+        job = TreeStats(paths)
+        dialog.bind("<Destroy>", lambda e: job.cancel() if e.widget is dialog else None, add="+")
+        def show(snapshot, finished):
+            if job.cancelled.is_set():
+                return
+            lines = []
+            suffix = "" if finished else " (contando...)"
+            lines.append(f"Tamanho: {self.convert_size(snapshot['bytes'])}{suffix}")
+            lines.append(f"Tamanho em disco: {self.convert_size(snapshot['allocated'])}")
+            lines.append(f"Quantia total de itens: {snapshot['files']} arquivos, {snapshot['dirs']} pastas")
+            if snapshot['oldest'] is not None:
+                oldest = datetime.datetime.fromtimestamp(snapshot['oldest']).strftime('%d/%m/%Y %H:%M')
+                newest = datetime.datetime.fromtimestamp(snapshot['newest']).strftime('%d/%m/%Y %H:%M')
+                lines.append(f"Arquivos modificados entre {oldest} e {newest}")
+            if snapshot['errors']:
+                lines.append(f"Itens sem acesso: {snapshot['errors']}")
+            # As extensões que mais ocupam espaço
+            extensions = sorted(snapshot['extensions'].items(), key=lambda item: item[1][1], reverse=True)
+            if extensions:
+                lines.append("Por extensão:")
+                for ext, (count, nbytes) in extensions[:8]:
+                    lines.append(f"  {ext}: {count} arquivos, {self.convert_size(nbytes)}")
+                if len(extensions) > 8:
+                    lines.append(f"  ... e mais {len(extensions) - 8} extensões")
+            info_text.configure(state="normal")
+            start, end = info_text.tag_ranges(tag)
+            info_text.delete(start, end)
+            info_text.insert(start, "\n".join(lines) + "\n", tag)
+            info_text.configure(state="disabled")
+        job.start(lambda snapshot, finished: self.after(0, show, snapshot, finished))
+    
+    def show_file_hashes(self, dialog, info_text, path):
+        """Insere linhas 'Calculando...' dos hashes e as preenche quando o HashService terminar"""
+        labels = {'md5': "MD5", 'sha256': "SHA256", 'blake2b': "BLAKE2b"}
+        tags = {}
+        for algorithm, label in labels.items():
+            tags[algorithm] = f"hash_{algorithm}_{id(info_text)}"
+            info_text.insert("end", f"{label}: Calculando...\n", tags[algorithm])
+        # Fechar a janela interrompe a leitura
+        closed = threading.Event()
+        dialog.bind("<Destroy>", lambda e: closed.set() if e.widget is dialog else None, add="+")
+        def show(digests, error):
+            if closed.is_set():
+                return
+            info_text.configure(state="normal")
+            for algorithm, label in labels.items():
+                start, end = info_text.tag_ranges(tags[algorithm])
+                info_text.delete(start, end)
+                value = digests[algorithm] if digests else f"Não disponível ({error})"
+                info_text.insert(start, f"{label}: {value}\n", tags[algorithm])
+            info_text.configure(state="disabled")
+        self.hash_service.submit(
+            [path], lambda _, digests, error: self.after(0, show, digests, error),
+            tuple(labels), closed.is_set)
+    
+    def show_selection_hashes(self, item_paths):
+        """Janela com os hashes dos arquivos selecionados, preenchida conforme o HashService termina cada um"""
+        files = [Path(p) for p in item_paths if os.path.isfile(p)]
+        ignored = len(item_paths) - len(files)
+        dialog = ctk.CTkToplevel(self)
+        dialog.title("Hashes")
+        dialog.transient(self)
+        dialog.lift()
+        dialog.geometry("640x460")
+        
+        frame = ctk.CTkFrame(dialog)
+        frame.pack(fill="both", expand=True, padx=10, pady=10)
+        status = ctk.CTkLabel(frame, text=f"Calculando 0 de {len(files)} arquivos...", font=("Arial", 14, "bold"))
+        status.pack(anchor="w", padx=10, pady=10)
+        info_text = tk.Text(frame, wrap="none", borderwidth=0, highlightthickness=0,
+                           bg="#333" if ctk.get_appearance_mode() == "Dark" else "#F0F0F0",
+                           fg="#FFF" if ctk.get_appearance_mode() == "Dark" else "#000")
+        info_text.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+        if ignored:
+            info_text.insert("end", f"{ignored} pastas ou itens especiais ignorados\n\n")
+        info_text.configure(state="disabled")
+        ctk.CTkButton(frame, text="Fechar", command=dialog.destroy).pack(pady=10)
+        
+        labels = {'md5': "MD5", 'sha256': "SHA256", 'blake2b': "BLAKE2b"}
+        done = [0]
+        # Fechar a janela interrompe as leituras pendentes
+        closed = threading.Event()
+        dialog.bind("<Destroy>", lambda e: closed.set() if e.widget is dialog else None, add="+")
+        def show(path, digests, error):
+            if closed.is_set():
+                return
+            done[0] += 1
+            if digests:
+                lines = [f"  {label}: {digests[algorithm]}" for algorithm, label in labels.items()]
+            else:
+                lines = [f"  Não disponível ({error})"]
+            info_text.configure(state="normal")
+            info_text.insert("end", f"{path.name}\n" + "\n".join(lines) + "\n\n")
+            info_text.configure(state="disabled")
+            status.configure(text=f"Calculando {done[0]} de {len(files)} arquivos..." if done[0] < len(files)
+                             else f"{len(files)} arquivos")
+        if not files:
+            status.configure(text="Nenhum arquivo selecionado")
+            return
+        self.hash_service.submit(
+            files, lambda path, digests, error: self.after(0, show, path, digests, error),
+            tuple(labels), closed.is_set)
+    
     def on_close(self):
         """Método chamado quando a janela é fechada"""
-        if self.observer is not None and self.observer.is_alive():
-            self.observer.stop()
-            self.observer.join()
-        self.destroy()
-
-    def calculate_folder_size_sync(self, folder_path):
-        """Calculates the total size of a folder and its contents synchronously."""
-        total_size = 0
-        if not folder_path.is_dir():
-            return total_size
-        try:
-            for entry in os.scandir(folder_path):
-                if entry.is_file():
-                    total_size += entry.stat().st_size
-                elif entry.is_dir():
-                    total_size += self.calculate_folder_size_sync(Path(entry.path))
-        except PermissionError:
-            # Handle cases where access to a directory is denied
-            pass # Or log a warning
-        except Exception as e:
-            print(f"Error calculating size for {folder_path}: {e}") # Keep for debugging
-            return 0 # Return 0 on other errors
-        return total_size
+        # Os bancos SQLite só são fechados depois que os workers que gravam neles terminam.
+        # A espera roda numa thread: o loop do Tkinter precisa continuar atendendo os
+        # self.after() que esses workers ainda façam, senão eles e o fechamento travariam
+        self.withdraw()
+        self.search_engine.shutdown()
+        self.file_operations.shutdown()
+        closer = threading.Thread(target=self.shutdown_services, daemon=True)
+        closer.start()
+        deadline = time.monotonic() + 10
+        def finish():
+            if closer.is_alive() and time.monotonic() < deadline:
+                self.after(50, finish)
+            else:
+                self.destroy()
+        finish()
 
+    def shutdown_services(self):
+        """Cancela e aguarda os workers e o watchdog, e então fecha os caches"""
+        # O watchdog também grava (invalidação de tamanhos e índices de nomes)
+        self.watch_service.stop(wait=True)
+        services = (self.size_engine, self.duplicate_finder, self.hash_service, self.thumbnail_service)
+        # Primeiro todos são cancelados, depois cada um é aguardado
+        for service in services:
+            service.shutdown()
+        for service in services:
+            service.shutdown(wait=True)
+        if self.filename_indexes is not None:
+            self.filename_indexes.close()
+        if self.size_cache is not None:
+            self.size_cache.close()
+        if self.hash_cache is not None:
+            self.hash_cache.close()
+        if self.thumbnail_cache is not None:
+            self.thumbnail_cache.close()
 
 if __name__ == "__main__":
     # Verifica se foi passado um caminho como argumento
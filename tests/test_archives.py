@@ -0,0 +1,97 @@
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+import geren
+
+
+def add_tar_file(tar, name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = 1_000_000_000
+    tar.addfile(info, io.BytesIO(data))
+
+
+def add_tar_link(tar, name, target, kind=tarfile.SYMTYPE):
+    info = tarfile.TarInfo(name)
+    info.type = kind
+    info.linkname = target
+    tar.addfile(info)
+
+
+@pytest.fixture
+def extractor():
+    return geren.ArchiveExtractor(max_workers=2)
+
+
+def test_safe_member_target_refuses_unsafe_names(tmp_path):
+    assert geren.safe_member_target(tmp_path, "./a\\b/c.txt") == tmp_path / "a" / "b" / "c.txt"
+    for name in ("/etc/passwd", "\\windows\\x", "a/../../x", "..", "C:/x", ""):
+        with pytest.raises(ValueError):
+            geren.safe_member_target(tmp_path, name)
+
+
+def test_zip_skips_unsafe_members_and_extracts_the_rest(tmp_path, extractor):
+    archive = tmp_path / "a.zip"
+    with zipfile.ZipFile(archive, 'w') as zf:
+        zf.writestr("ok/um.txt", b"1")
+        zf.writestr("../fora.txt", b"x")
+        zf.writestr("/abs.txt", b"x")
+        zf.writestr("dois.txt", b"22")
+    dest = tmp_path / "out"
+    nbytes, nfiles, skipped = extractor.extract(archive, dest, cancelled=lambda: False)
+    assert (dest / "ok" / "um.txt").read_bytes() == b"1"
+    assert (dest / "dois.txt").read_bytes() == b"22"
+    assert (nbytes, nfiles) == (3, 2)
+    assert sorted(skipped) == ["../fora.txt", "/abs.txt"]
+    assert not (tmp_path / "fora.txt").exists()
+    assert not (dest / "abs.txt").exists()
+
+
+def make_link_attack(path):
+    with tarfile.open(path, 'w:gz') as tar:
+        add_tar_file(tar, "dados.txt", b"ok")
+        add_tar_link(tar, "fuga", "..")
+        add_tar_file(tar, "fuga/escapou.txt", b"x")
+        add_tar_link(tar, "senha", "/etc/passwd")
+        add_tar_link(tar, "duro", "/etc/passwd", tarfile.LNKTYPE)
+        add_tar_link(tar, "interno", "dados.txt")
+
+
+def test_tar_refuses_links_leaving_destination(tmp_path, extractor):
+    if not hasattr(tarfile, 'data_filter'):
+        pytest.skip("tarfile sem filtro 'data'")
+    archive = tmp_path / "a.tar.gz"
+    make_link_attack(archive)
+    dest = tmp_path / "out"
+    _, _, skipped = extractor.extract(archive, dest, cancelled=lambda: False)
+    assert (dest / "dados.txt").read_bytes() == b"ok"
+    assert not (tmp_path / "escapou.txt").exists()
+    assert {"fuga", "senha", "duro"} <= set(skipped)
+    assert os.readlink(dest / "interno") == "dados.txt"
+
+
+def test_tar_without_data_filter_skips_all_links(tmp_path, extractor, monkeypatch):
+    monkeypatch.delattr(tarfile, 'data_filter', raising=False)
+    archive = tmp_path / "a.tar.gz"
+    make_link_attack(archive)
+    dest = tmp_path / "out"
+    _, nfiles, skipped = extractor.extract(archive, dest, cancelled=lambda: False)
+    assert (dest / "dados.txt").read_bytes() == b"ok"
+    assert not (tmp_path / "escapou.txt").exists()
+    assert not os.path.lexists(dest / "fuga") or os.path.isdir(dest / "fuga")
+    for name in ("senha", "duro", "interno"):
+        assert name in skipped
+        assert not os.path.lexists(dest / name)
+
+
+def test_tar_keeps_mode_and_mtime(tmp_path, extractor):
+    archive = tmp_path / "a.tar"
+    with tarfile.open(archive, 'w') as tar:
+        add_tar_file(tar, "pasta/x.sh", b"#!/bin/sh\n")
+    dest = tmp_path / "out"
+    extractor.extract(archive, dest, cancelled=lambda: False)
+    assert os.stat(dest / "pasta" / "x.sh").st_mtime == 1_000_000_000
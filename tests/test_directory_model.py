@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+import geren
+
+
+@pytest.fixture
+def folder(tmp_path):
+    (tmp_path / "Zeta").mkdir()
+    (tmp_path / "alfa").mkdir()
+    (tmp_path / "b.TXT").write_bytes(b"x" * 30)
+    (tmp_path / "A.pdf").write_bytes(b"x" * 10)
+    (tmp_path / "c.txt").write_bytes(b"x" * 20)
+    os.utime(tmp_path / "b.TXT", (100, 100))
+    os.utime(tmp_path / "A.pdf", (300, 300))
+    os.utime(tmp_path / "c.txt", (200, 200))
+    return tmp_path
+
+
+def names(entries):
+    return [entry['name'] for entry in entries]
+
+
+def test_scan_lists_folders_first_by_name(folder):
+    entries = geren.DirectoryModel(folder).scan()
+    assert names(entries) == ["alfa", "Zeta", "A.pdf", "b.TXT", "c.txt"]
+
+
+def test_entries_carry_stat_data(folder):
+    entries = {entry['name']: entry for entry in geren.DirectoryModel(folder).scan()}
+    assert entries["b.TXT"]['size'] == 30
+    assert entries["b.TXT"]['ext'] == ".txt"
+    assert entries["b.TXT"]['lname'] == "b.txt"
+    assert entries["b.TXT"]['mtime'] == 100
+    assert entries["alfa"]['is_dir'] and entries["alfa"]['size'] is None
+    assert entries["alfa"]['kind'] == 'folder'
+
+
+@pytest.mark.parametrize("column, descending, expected", [
+    ('name', False, ["alfa", "Zeta", "A.pdf", "b.TXT", "c.txt"]),
+    ('name', True, ["Zeta", "alfa", "c.txt", "b.TXT", "A.pdf"]),
+    ('size', False, ["alfa", "Zeta", "A.pdf", "c.txt", "b.TXT"]),
+    ('size', True, ["Zeta", "alfa", "b.TXT", "c.txt", "A.pdf"]),
+    ('mtime', False, ["b.TXT", "c.txt", "A.pdf"]),
+    ('type', False, ["A.pdf", "b.TXT", "c.txt"]),
+])
+def test_sort_entries_keeps_folders_first(folder, column, descending, expected):
+    entries = geren.DirectoryModel(folder).scan()
+    result = names(geren.DirectoryModel.sort_entries(entries, column, descending))
+    if column in ('mtime', 'type'):
+        # Pastas também vêm primeiro; aqui só a ordem dos arquivos interessa
+        assert result[:2] in (["alfa", "Zeta"], ["Zeta", "alfa"])
+        result = result[2:]
+    assert result == expected
+
+
+def test_entry_for_path(folder):
+    assert geren.DirectoryModel.entry_for_path(str(folder / "c.txt"))['size'] == 20
+    assert geren.DirectoryModel.entry_for_path(str(folder / "alfa"))['is_dir']
+    assert geren.DirectoryModel.entry_for_path(str(folder / "sumiu")) is None
+
+
+def test_broken_link_is_listed_without_metadata(folder):
+    os.symlink(folder / "sumiu", folder / "quebrado")
+    entries = {entry['name']: entry for entry in geren.DirectoryModel(folder).scan()}
+    assert entries["quebrado"]['size'] is None and not entries["quebrado"]['is_dir']
+    assert geren.DirectoryModel.entry_for_path(str(folder / "quebrado"))['mtime'] is None
@@ -0,0 +1,202 @@
+import hashlib
+import os
+
+import pytest
+
+import geren
+
+
+def write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+def tree_contents(root):
+    result = {}
+    for folder, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(folder, name)
+            with open(path, 'rb') as f:
+                result[os.path.relpath(path, root)] = f.read()
+    return result
+
+
+@pytest.fixture(params=[False, True], ids=["inline", "pool"])
+def queue(request):
+    queue = geren.FileOperationQueue(small_file_workers=3 if request.param else 0)
+    yield queue
+    queue.shutdown()
+
+
+def run(queue, operation, pairs, policy='overwrite', verify=False):
+    job = geren.FileOperationJob(operation, pairs, policy, verify=verify)
+    job.executor = queue.small_files
+    job.run()
+    assert job.state == 'done', job.error
+    return job
+
+
+@pytest.fixture
+def source(tmp_path):
+    root = tmp_path / "src"
+    write(root / "small.txt", b"pequeno")
+    write(root / "empty", b"")
+    write(root / "sub" / "big.bin", os.urandom(geren.SMALL_FILE_SIZE + 12345))
+    write(root / "sub" / "deep" / "x.txt", b"x" * 100)
+    os.symlink("small.txt", root / "link")
+    return root
+
+
+def test_copy_tree(tmp_path, source, queue):
+    job = run(queue, 'copy', [(source, tmp_path / "dst")])
+    assert tree_contents(tmp_path / "dst") == tree_contents(source)
+    assert os.readlink(tmp_path / "dst" / "link") == "small.txt"
+    assert job.done_files == job.total_files == 5
+    assert job.done_bytes == job.total_bytes
+    assert not list((tmp_path / "dst").rglob("*.part"))
+
+
+def test_copy_keeps_mtime(tmp_path, source, queue):
+    os.utime(source / "small.txt", (1_000_000_000, 1_000_000_000))
+    run(queue, 'copy', [(source, tmp_path / "dst")])
+    assert os.stat(tmp_path / "dst" / "small.txt").st_mtime == 1_000_000_000
+
+
+def test_skip_keeps_existing_files(tmp_path, source, queue):
+    write(tmp_path / "dst" / "small.txt", b"antigo")
+    write(tmp_path / "dst" / "sub" / "big.bin", b"antigo grande")
+    job = run(queue, 'copy', [(source, tmp_path / "dst")], policy='skip')
+    assert (tmp_path / "dst" / "small.txt").read_bytes() == b"antigo"
+    assert (tmp_path / "dst" / "sub" / "big.bin").read_bytes() == b"antigo grande"
+    assert (tmp_path / "dst" / "sub" / "deep" / "x.txt").read_bytes() == b"x" * 100
+    assert job.done_files == job.total_files
+
+
+def test_overwrite_replaces_files_and_folders(tmp_path, source, queue):
+    write(tmp_path / "dst" / "small.txt" / "era uma pasta", b"")
+    write(tmp_path / "dst" / "sub" / "big.bin", b"antigo")
+    write(tmp_path / "dst" / "extra.txt", b"fica")
+    run(queue, 'copy', [(source, tmp_path / "dst")])
+    assert (tmp_path / "dst" / "small.txt").read_bytes() == b"pequeno"
+    assert (tmp_path / "dst" / "sub" / "big.bin").read_bytes() == (source / "sub" / "big.bin").read_bytes()
+    # Pastas são mescladas: o que só existia no destino permanece
+    assert (tmp_path / "dst" / "extra.txt").read_bytes() == b"fica"
+
+
+def test_overwrite_does_not_write_through_destination_symlink(tmp_path, source, queue):
+    write(tmp_path / "alvo.txt", b"intocado")
+    (tmp_path / "dst").mkdir()
+    os.symlink(tmp_path / "alvo.txt", tmp_path / "dst" / "small.txt")
+    run(queue, 'copy', [(source, tmp_path / "dst")])
+    assert (tmp_path / "alvo.txt").read_bytes() == b"intocado"
+    assert not (tmp_path / "dst" / "small.txt").is_symlink()
+    assert (tmp_path / "dst" / "small.txt").read_bytes() == b"pequeno"
+
+
+def test_move_on_same_device_renames(tmp_path, source, queue):
+    expected = tree_contents(source)
+    run(queue, 'move', [(source, tmp_path / "dst")])
+    assert not source.exists()
+    assert tree_contents(tmp_path / "dst") == expected
+
+
+def test_move_merges_into_existing_folder(tmp_path, source, queue):
+    expected = tree_contents(source)
+    write(tmp_path / "dst" / "sub" / "outro.txt", b"outro")
+    write(tmp_path / "dst" / "small.txt", b"antigo")
+    run(queue, 'move', [(source, tmp_path / "dst")], policy='skip')
+    assert (tmp_path / "dst" / "small.txt").read_bytes() == b"antigo"
+    assert (tmp_path / "dst" / "sub" / "outro.txt").read_bytes() == b"outro"
+    assert (tmp_path / "dst" / "sub" / "deep" / "x.txt").read_bytes() == expected[os.path.join("sub", "deep", "x.txt")]
+    # O item pulado continua na origem
+    assert (source / "small.txt").read_bytes() == b"pequeno"
+
+
+def test_move_across_devices_copies_then_removes(tmp_path, source, queue, monkeypatch):
+    expected = tree_contents(source)
+    monkeypatch.setattr(geren.FileOperationJob, "_move_by_rename", lambda self, s, d: False)
+    run(queue, 'move', [(source, tmp_path / "dst")])
+    assert tree_contents(tmp_path / "dst") == expected
+    assert not source.exists()
+
+
+def test_verified_copy_writes_manifest(tmp_path, source, queue):
+    job = run(queue, 'copy', [(source, tmp_path / "dst")], verify=True)
+    assert job.manifest_path is not None and job.manifest_path.parent == tmp_path
+    lines = job.manifest_path.read_text(encoding='utf-8').splitlines()
+    listed = {name: digest for digest, name in (line.split("  ", 1) for line in lines)}
+    copied = tree_contents(tmp_path / "dst")
+    # Links são recriados, não copiados: ficam fora do manifesto
+    del copied["link"]
+    assert len(listed) == len(copied)
+    for relative, data in copied.items():
+        assert listed["dst/" + relative.replace(os.sep, "/")] == hashlib.sha256(data).hexdigest()
+
+
+def test_verified_move_by_rename_writes_no_manifest(tmp_path, source, queue):
+    job = run(queue, 'move', [(source, tmp_path / "dst")], verify=True)
+    assert job.manifest_path is None
+    assert not list(tmp_path.glob("checksums-*"))
+
+
+def test_cancel_stops_job(tmp_path, source, queue):
+    job = geren.FileOperationJob('copy', [(source, tmp_path / "dst")])
+    job.executor = queue.small_files
+    job.cancel()
+    job.run()
+    assert job.state == 'cancelled'
+    assert not (tmp_path / "dst").exists()
+
+
+def test_copy_file_fast_large_and_small(tmp_path):
+    for size in (0, 10, geren.SMALL_FILE_SIZE, geren.SMALL_FILE_SIZE + 1, 3 * 1024 * 1024 + 7):
+        data = os.urandom(size)
+        write(tmp_path / f"in{size}", data)
+        digest = hashlib.sha256()
+        geren.copy_file_fast(tmp_path / f"in{size}", tmp_path / f"out{size}", chunk_size=1024 * 1024, digest=digest)
+        assert (tmp_path / f"out{size}").read_bytes() == data
+        assert digest.hexdigest() == hashlib.sha256(data).hexdigest()
+        geren.copy_file_fast(tmp_path / f"in{size}", tmp_path / f"plain{size}", chunk_size=1024 * 1024)
+        assert (tmp_path / f"plain{size}").read_bytes() == data
+
+
+def test_unsupported_kernel_copy_is_probed_once_per_device(tmp_path, monkeypatch):
+    calls = []
+    def ioctl(*args):
+        calls.append('ficlone')
+        raise OSError(geren.errno.EOPNOTSUPP, "sem reflink")
+    def copy_file_range(*args):
+        calls.append('copy_file_range')
+        raise OSError(geren.errno.EXDEV, "sem copy_file_range")
+    if geren.fcntl is not None:
+        monkeypatch.setattr(geren.fcntl, "ioctl", ioctl)
+    monkeypatch.setattr(os, "copy_file_range", copy_file_range, raising=False)
+    monkeypatch.setattr(geren, "_unsupported_copy", set())
+    data = os.urandom(geren.SMALL_FILE_SIZE + 1)
+    for i in range(3):
+        write(tmp_path / f"in{i}", data)
+        geren.copy_file_fast(tmp_path / f"in{i}", tmp_path / f"out{i}")
+        assert (tmp_path / f"out{i}").read_bytes() == data
+    assert calls.count('copy_file_range') == 1
+    assert calls.count('ficlone') == (1 if geren.fcntl is not None else 0)
+    # Arquivos pequenos nem chegam a sondar o kernel
+    calls.clear()
+    monkeypatch.setattr(geren, "_unsupported_copy", set())
+    write(tmp_path / "small", b"abc")
+    geren.copy_file_fast(tmp_path / "small", tmp_path / "small.out")
+    assert calls == []
+
+
+def test_manifests_of_jobs_finishing_together_do_not_collide(tmp_path, source, queue, monkeypatch):
+    class FrozenDatetime(geren.datetime.datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return cls(2026, 1, 2, 3, 4, 5)
+    monkeypatch.setattr(geren.datetime, "datetime", FrozenDatetime)
+    jobs = [run(queue, 'copy', [(source, tmp_path / f"dst{i}")], verify=True) for i in range(3)]
+    paths = [job.manifest_path for job in jobs]
+    assert [path.name for path in paths] == [
+        "checksums-20260102-030405.sha256", "checksums-20260102-030405-2.sha256", "checksums-20260102-030405-3.sha256"]
+    for i, path in enumerate(paths):
+        assert all(f"  dst{i}/" in line for line in path.read_text(encoding='utf-8').splitlines())
+    assert not list(tmp_path.glob("*.part"))
@@ -0,0 +1,111 @@
+import os
+
+import pytest
+
+import geren
+
+
+def make_tree(root, names):
+    for name in names:
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"")
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "root"
+    make_tree(root, [
+        "Relatorio_2024.pdf", "relatorio 2023.PDF", "notas.txt",
+        "docs/100%_pronto.txt", "docs/a_b.txt", "docs/axb.txt",
+        "docs/back\\slash.txt" if os.name != "nt" else "docs/backslash.txt",
+        "docs/sub/fundo.pdf", 'docs/aspas"duplas.txt' if os.name != "nt" else "docs/aspas.txt",
+    ])
+    return root
+
+
+@pytest.fixture
+def index(tmp_path, tree):
+    index = geren.FilenameIndex(str(tree), tmp_path / "index.db")
+    assert index.build()
+    yield index
+    index.close()
+
+
+def names(results):
+    return sorted(name for _, name, _ in results)
+
+
+def plan(index, term, scope=None):
+    sql, params = index._query(term, scope)
+    rows = index.conn.execute("EXPLAIN QUERY PLAN " + sql, params + [10]).fetchall()
+    return " | ".join(row[-1] for row in rows)
+
+
+def test_substring_is_case_insensitive(index):
+    assert names(index.search("RELATORIO")) == ["Relatorio_2024.pdf", "relatorio 2023.PDF"]
+
+
+def test_like_wildcards_are_literal(index):
+    assert names(index.search("a_b")) == ["a_b.txt"]
+    assert names(index.search("0%_")) == ["100%_pronto.txt"]
+
+
+@pytest.mark.skipif(os.name == "nt", reason="nomes com \\ e \" não existem no Windows")
+def test_backslash_and_quote_are_literal(index):
+    assert names(index.search("k\\s")) == ["back\\slash.txt"]
+    assert names(index.search('s"d')) == ['aspas"duplas.txt']
+
+
+def test_short_terms_fall_back_to_like(index):
+    assert names(index.search("_b")) == ["a_b.txt"]
+
+
+def test_extension_and_glob(index):
+    assert names(index.search("*.pdf")) == ["Relatorio_2024.pdf", "fundo.pdf", "relatorio 2023.PDF"]
+    assert names(index.search("rel*2024*")) == ["Relatorio_2024.pdf"]
+
+
+def test_scope_limits_results(index, tree):
+    assert names(index.search("*.pdf", scope=str(tree / "docs"))) == ["fundo.pdf"]
+    assert names(index.search(".txt", scope=str(tree / "docs" / "sub"))) == []
+
+
+def test_folders_come_first(index):
+    results = index.search("u")
+    assert results[0] == (str(index.root) + os.sep + "docs" + os.sep + "sub", "sub", True)
+
+
+def test_substring_search_uses_fts_index(index):
+    if not index.has_fts:
+        pytest.skip("SQLite sem FTS5/trigramas")
+    # Sem restrição no índice virtual ("INDEX 0:") o FTS5 percorre a tabela inteira
+    for term in ("relatorio", "a_b", "100%", "back\\slash"):
+        query_plan = plan(index, term)
+        assert "VIRTUAL TABLE INDEX 0:M" in query_plan, query_plan
+    assert "VIRTUAL TABLE INDEX 0:G" in plan(index, "rel*2024*")
+
+
+def test_events_update_index(index, tree):
+    (tree / "novo_relatorio.txt").write_bytes(b"")
+    index.apply_event('created', str(tree / "novo_relatorio.txt"))
+    assert "novo_relatorio.txt" in names(index.search("relatorio"))
+    os.rename(tree / "docs", tree / "papeis")
+    index.apply_event('moved', str(tree / "docs"), str(tree / "papeis"))
+    assert [path for path, _, _ in index.search("fundo")] == [str(tree / "papeis" / "sub" / "fundo.pdf")]
+    index.apply_event('deleted', str(tree / "papeis"))
+    assert index.search("fundo") == []
+
+
+def test_reconcile_picks_up_offline_changes(tmp_path, tree, index):
+    index.close()
+    (tree / "notas.txt").unlink()
+    make_tree(tree, ["docs/sub/recente.txt"])
+    reopened = geren.FilenameIndex(str(tree), tmp_path / "index.db")
+    try:
+        assert reopened.complete
+        assert reopened.reconcile()
+        assert reopened.search("notas") == []
+        assert names(reopened.search("recente")) == ["recente.txt"]
+    finally:
+        reopened.close()
@@ -0,0 +1,103 @@
+import os
+
+import pytest
+
+import geren
+
+
+@pytest.fixture
+def engine(tmp_path):
+    cache = geren.FolderSizeCache(tmp_path / "sizes.db")
+    yield geren.FolderSizeEngine(max_workers=1, cache=cache)
+    cache.close()
+
+
+def write(path, size):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+
+
+def test_size_walks_whole_tree(tmp_path, engine):
+    root = tmp_path / "a"
+    write(root / "f", 100)
+    write(root / "b" / "c" / "g", 900)
+    assert engine.folder_size(root) == 1000
+
+
+def test_change_deep_in_tree_invalidates_cached_total(tmp_path, engine):
+    root = tmp_path / "a"
+    write(root / "b" / "c" / "f", 1000)
+    assert engine.folder_size(root) == 1000
+    # Só o mtime de c muda; a e b continuam iguais
+    write(root / "b" / "c" / "g", 5000)
+    assert engine.folder_size(root) == 6000
+
+
+def test_new_folder_deep_in_tree_invalidates_cached_total(tmp_path, engine):
+    root = tmp_path / "a"
+    write(root / "b" / "c" / "f", 1000)
+    assert engine.folder_size(root) == 1000
+    write(root / "b" / "c" / "d" / "e" / "g", 24)
+    assert engine.folder_size(root) == 1024
+
+
+def test_removed_folder_is_dropped_from_total(tmp_path, engine):
+    root = tmp_path / "a"
+    write(root / "b" / "c" / "f", 1000)
+    write(root / "b" / "d" / "f", 10)
+    assert engine.folder_size(root) == 1010
+    (root / "b" / "d" / "f").unlink()
+    (root / "b" / "d").rmdir()
+    assert engine.folder_size(root) == 1000
+    # O total regravado volta a ser servido pelo cache
+    assert engine.cache.get(str(root), os.stat(root).st_mtime_ns) == 1000
+
+
+def test_file_grown_in_place_is_seen_after_max_age(tmp_path, engine):
+    root = tmp_path / "a"
+    write(root / "b" / "f", 1000)
+    assert engine.folder_size(root) == 1000
+    with open(root / "b" / "f", "ab") as f:
+        f.write(b"x" * 105000)
+    # Nenhum mtime de pasta mudou: dentro de max_age o total é o antigo
+    assert engine.folder_size(root) == 1000
+    engine.cache.max_age = 0
+    assert engine.folder_size(root) == 106000
+
+
+def test_cached_subtree_is_reused_when_unchanged(tmp_path, engine, monkeypatch):
+    root = tmp_path / "a"
+    write(root / "b" / "c" / "f", 1000)
+    assert engine.folder_size(root) == 1000
+    write(root / "g", 10)
+    scanned = []
+    real_scandir = os.scandir
+    def scandir(path):
+        scanned.append(str(path))
+        return real_scandir(path)
+    monkeypatch.setattr(os, "scandir", scandir)
+    assert engine.folder_size(root) == 1010
+    assert scanned == [str(root)]
+
+
+def test_cache_survives_reopen(tmp_path):
+    root = tmp_path / "a"
+    write(root / "b" / "f", 300)
+    cache = geren.FolderSizeCache(tmp_path / "sizes.db")
+    assert geren.FolderSizeEngine(max_workers=1, cache=cache).folder_size(root) == 300
+    cache.close()
+    write(root / "b" / "c" / "g", 5)
+    cache = geren.FolderSizeCache(tmp_path / "sizes.db")
+    try:
+        assert geren.FolderSizeEngine(max_workers=1, cache=cache).folder_size(root) == 305
+    finally:
+        cache.close()
+
+
+def test_invalidate_tree_forgets_descendants(tmp_path, engine):
+    root = tmp_path / "a"
+    write(root / "b" / "f", 7)
+    engine.folder_size(root)
+    engine.cache.invalidate_tree(root)
+    assert engine.cache.get(str(root / "b"), os.stat(root / "b").st_mtime_ns) is None
+    assert engine.cache.get(str(root), os.stat(root).st_mtime_ns) is None
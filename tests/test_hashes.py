@@ -0,0 +1,57 @@
+import hashlib
+import threading
+
+import pytest
+
+import geren
+
+
+@pytest.fixture
+def service(tmp_path):
+    cache = geren.HashCache(tmp_path / "hashes.db")
+    service = geren.HashService(max_workers=2, cache=cache, chunk_size=1024)
+    yield service
+    service.shutdown()
+    cache.close()
+
+
+def test_digests_in_one_read(tmp_path, service):
+    data = bytes(range(256)) * 50
+    (tmp_path / "f").write_bytes(data)
+    result = service.digests(tmp_path / "f")
+    assert result == {algorithm: hashlib.new(algorithm, data).hexdigest() for algorithm in geren.HashService.ALGORITHMS}
+
+
+def test_cached_digests_are_not_reread(tmp_path, service, monkeypatch):
+    (tmp_path / "f").write_bytes(b"abc")
+    first = service.digests(tmp_path / "f", ('sha256',))
+    monkeypatch.setattr(geren, "open", lambda *args: pytest.fail("arquivo relido"), raising=False)
+    assert service.digests(tmp_path / "f", ('sha256',)) == first
+
+
+def test_changed_file_is_hashed_again(tmp_path, service):
+    (tmp_path / "f").write_bytes(b"abc")
+    service.digests(tmp_path / "f", ('md5',))
+    (tmp_path / "f").write_bytes(b"abcd")
+    assert service.digests(tmp_path / "f", ('md5',))['md5'] == hashlib.md5(b"abcd").hexdigest()
+
+
+def test_submit_reports_each_file_and_errors(tmp_path, service):
+    paths = []
+    for i in range(5):
+        paths.append(tmp_path / f"f{i}")
+        paths[-1].write_bytes(str(i).encode())
+    paths.append(tmp_path / "inexistente")
+    results = {}
+    finished = threading.Event()
+    lock = threading.Lock()
+    def callback(path, digests, error):
+        with lock:
+            results[path] = (digests, error)
+            if len(results) == len(paths):
+                finished.set()
+    service.submit(paths, callback, ('sha256',))
+    assert finished.wait(10)
+    for i in range(5):
+        assert results[paths[i]][0]['sha256'] == hashlib.sha256(str(i).encode()).hexdigest()
+    assert results[paths[-1]][0] is None and isinstance(results[paths[-1]][1], OSError)
@@ -0,0 +1,162 @@
+import bz2
+import gzip
+import io
+import os
+import random
+import tarfile
+
+import pytest
+
+import geren
+
+
+SPACING = 64 * 1024
+
+
+def member_data():
+    rng = random.Random(1234)
+    # Dados sem compressão possível, para que os pontos de retomada apareçam logo
+    return {
+        'a.bin': rng.randbytes(300 * 1024),
+        'pasta/b.bin': rng.randbytes(5 * 1024),
+        'pasta/vazio.txt': b'',
+        'c.bin': rng.randbytes(200 * 1024),
+    }
+
+
+def write_tar(path, files, mode):
+    with tarfile.open(path, mode) as tar:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = 1_000_000_000
+            tar.addfile(info, io.BytesIO(data))
+
+
+def scan_offsets(index, path, archive_type):
+    """Mesma passada sequencial do FileManager.read_archive_members"""
+    offsets = {}
+    with index.open_stream(path, archive_type) as stream:
+        with tarfile.open(fileobj=stream, mode='r|') as tar:
+            for member in tar:
+                if member.isfile():
+                    offsets[member.name] = (member.offset_data, member.size)
+    return offsets
+
+
+@pytest.mark.parametrize('archive_type, suffix, mode', [
+    ('tar', '.tar', 'w'),
+    ('tar.gz', '.tar.gz', 'w:gz'),
+    ('tar.bz2', '.tar.bz2', 'w:bz2'),
+])
+def test_open_member_reads_from_offset(tmp_path, archive_type, suffix, mode):
+    files = member_data()
+    path = tmp_path / ('arquivo' + suffix)
+    write_tar(path, files, mode)
+    index = geren.TarSeekIndex(spacing=SPACING)
+
+    offsets = scan_offsets(index, path, archive_type)
+    assert set(offsets) == set(files)
+    # Ordem inversa: cada leitura precisa achar o próprio ponto de retomada
+    for name in reversed(list(files)):
+        offset, size = offsets[name]
+        with geren.open_archive_member(path, name, offset, size, index) as member_file:
+            assert member_file.read() == files[name]
+
+
+def test_gzip_scan_records_checkpoints(tmp_path):
+    files = member_data()
+    path = tmp_path / 'arquivo.tar.gz'
+    write_tar(path, files, 'w:gz')
+    index = geren.TarSeekIndex(spacing=SPACING)
+
+    scan_offsets(index, path, 'tar.gz')
+    checkpoints = index._checkpoints(path)
+    assert len(checkpoints) > 3
+    upos = [point[0] for point in checkpoints]
+    assert upos == sorted(upos)
+    assert all(b - a >= SPACING for a, b in zip(upos[1:], upos[2:]))
+
+
+def test_gzip_reader_resumes_from_checkpoint(tmp_path):
+    data = random.Random(5).randbytes(600 * 1024)
+    path = tmp_path / 'dados.gz'
+    path.write_bytes(gzip.compress(data))
+    checkpoints = [(0, 0, None)]
+    with geren.GzipSeekReader(path, checkpoints, SPACING) as reader:
+        assert reader.read() == data
+    assert len(checkpoints) > 3
+
+    point = checkpoints[len(checkpoints) // 2]
+    target = point[0] + 10
+    with geren.GzipSeekReader(path, checkpoints, SPACING, target) as reader:
+        # Começa no ponto anterior em vez de descompactar desde o início
+        assert reader.file.tell() >= point[1] > 0
+        assert reader.pos == target
+        assert reader.read(1000) == data[target:target + 1000]
+    # Ler de novo não duplica pontos já registrados
+    assert [point[0] for point in checkpoints] == sorted({point[0] for point in checkpoints})
+
+    # O descompressor guardado não é alterado pelas leituras
+    with geren.GzipSeekReader(path, checkpoints, SPACING, target) as reader:
+        assert reader.read(1000) == data[target:target + 1000]
+
+
+def test_gzip_reader_handles_concatenated_members_and_padding(tmp_path):
+    first = random.Random(1).randbytes(100 * 1024)
+    second = random.Random(2).randbytes(100 * 1024)
+    path = tmp_path / 'dados.gz'
+    path.write_bytes(gzip.compress(first) + gzip.compress(second) + b'\0' * 512)
+    with geren.GzipSeekReader(path, [(0, 0, None)], SPACING) as reader:
+        assert reader.read() == first + second
+        assert reader.read(10) == b''
+
+
+def test_checkpoints_reset_when_archive_changes(tmp_path):
+    files = member_data()
+    path = tmp_path / 'arquivo.tar.gz'
+    write_tar(path, files, 'w:gz')
+    index = geren.TarSeekIndex(spacing=SPACING)
+    scan_offsets(index, path, 'tar.gz')
+    assert len(index._checkpoints(path)) > 1
+
+    files['a.bin'] = random.Random(99).randbytes(100 * 1024)
+    write_tar(path, files, 'w:gz')
+    os.utime(path, ns=(1, 1))
+    assert index._checkpoints(path) == [(0, 0, None)]
+
+    offsets = scan_offsets(index, path, 'tar.gz')
+    offset, size = offsets['c.bin']
+    with geren.open_archive_member(path, 'c.bin', offset, size, index) as member_file:
+        assert member_file.read() == files['c.bin']
+
+
+def test_index_keeps_only_recent_archives(tmp_path):
+    index = geren.TarSeekIndex(max_archives=2, spacing=SPACING)
+    paths = []
+    for i in range(3):
+        path = tmp_path / f'{i}.tar.gz'
+        write_tar(path, {'x': b'x'}, 'w:gz')
+        paths.append(path)
+        index._checkpoints(path)
+    assert list(index.entries) == [str(p) for p in paths[1:]]
+    index._checkpoints(paths[1])
+    assert list(index.entries) == [str(paths[2]), str(paths[1])]
+
+
+def test_bounded_reader_stops_at_size():
+    stream = io.BytesIO(b'0123456789')
+    with geren.BoundedReader(stream, 4) as reader:
+        assert reader.read(3) == b'012'
+        assert reader.read(10) == b'3'
+        assert reader.read() == b''
+    assert stream.closed
+
+
+def test_bz2_stream_is_plain_sequential(tmp_path):
+    path = tmp_path / 'arquivo.tar.bz2'
+    write_tar(path, {'x': b'conteudo'}, 'w:bz2')
+    index = geren.TarSeekIndex()
+    with index.open_stream(path, 'tar.bz2') as stream:
+        assert isinstance(stream, bz2.BZ2File)
+    assert not index.entries
@@ -0,0 +1,77 @@
+import threading
+import time
+
+import pytest
+
+import geren
+
+
+@pytest.fixture
+def watch_service():
+    service = geren.WatchService()
+    yield service
+    service.stop(wait=True)
+
+
+def test_suppression_lasts_for_the_grace_period(watch_service, tmp_path):
+    path = str(tmp_path / 'a')
+    assert not watch_service.is_suppressed(path)
+    with watch_service.suppressed([tmp_path / 'a'], grace=0.2):
+        assert watch_service.is_suppressed(path)
+    assert watch_service.is_suppressed(path)
+    time.sleep(0.3)
+    assert not watch_service.is_suppressed(path)
+
+
+def test_nested_suppression_is_counted(watch_service, tmp_path):
+    path = str(tmp_path / 'a')
+    outer = watch_service.suppressed([path], grace=0.0)
+    inner = watch_service.suppressed([path], grace=0.0)
+    outer.__enter__()
+    inner.__enter__()
+    inner.__exit__(None, None, None)
+    time.sleep(0.01)
+    # A operação de fora ainda está ativa
+    assert watch_service.is_suppressed(path)
+    outer.__exit__(None, None, None)
+    time.sleep(0.01)
+    assert not watch_service.is_suppressed(path)
+
+
+def test_late_finish_does_not_shorten_grace(watch_service, tmp_path):
+    path = str(tmp_path / 'a')
+    with watch_service.suppressed([path], grace=0.5):
+        pass
+    with watch_service.suppressed([path], grace=0.0):
+        pass
+    time.sleep(0.05)
+    assert watch_service.is_suppressed(path)
+
+
+def test_concurrent_operations_on_the_same_path(watch_service, tmp_path):
+    path = str(tmp_path / 'a')
+    entered = threading.Barrier(3)
+    release = threading.Event()
+
+    def operation():
+        with watch_service.suppressed([path], grace=0.0):
+            entered.wait()
+            release.wait()
+
+    threads = [threading.Thread(target=operation) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    entered.wait()
+    assert watch_service._suppressed[path][0] == 2
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert watch_service._suppressed[path][0] == 0
+
+
+def test_expired_entries_are_dropped(watch_service, tmp_path):
+    with watch_service.suppressed([tmp_path / 'a'], grace=0.0):
+        pass
+    time.sleep(0.01)
+    with watch_service.suppressed([tmp_path / 'b'], grace=0.0):
+        assert str(tmp_path / 'a') not in watch_service._suppressed